@@ -3,29 +3,491 @@ AI-Powered Content Relevance Scoring Module
 Analyzes content quality, readability, and relevance using OpenAI
 """
 
+import io
 import json
+import asyncio
+import bisect
+import hashlib
+import importlib.util
 import os
+import re
+import time
 import logging
-from typing import Dict, List, Optional
-from openai import OpenAI
-from models import Content
+import threading
+import struct
+import zlib
+from collections import deque
+from functools import cache
+from types import MappingProxyType
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import httpx
+from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
+from models import db, Content
+from cache_utils import result_cache
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson parses and serializes several times faster than the stdlib json module
+if orjson is not None:
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+else:
+    _json_loads = json.loads
+
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
+
+# HTTP connection pooling for the OpenAI clients: keep-alive connections are
+# reused across requests, over HTTP/2 when the h2 package is installed
+OPENAI_HTTP2 = importlib.util.find_spec('h2') is not None
+OPENAI_CONNECTION_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50)
+OPENAI_TIMEOUT = httpx.Timeout(60, connect=5)
 
 # Initialize OpenAI client
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
+openai_client = OpenAI(
+    api_key=OPENAI_API_KEY,
+    http_client=DefaultHttpxClient(
+        http2=OPENAI_HTTP2, limits=OPENAI_CONNECTION_LIMITS, timeout=OPENAI_TIMEOUT
+    )
+)
+
+# the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
+# do not change this unless explicitly requested by the user
+RELEVANCE_MODEL = "gpt-4o"
+
+RELEVANCE_SYSTEM_PROMPT = """You are a content quality analyst. Analyze the provided content and score it on multiple criteria. 
+                        Return scores from 1-10 for each criterion and provide brief explanations.
+                        
+                        Scoring criteria:
+                        - clarity: How clear and understandable is the content? (1-10)
+                        - depth: How comprehensive and detailed is the information? (1-10)
+                        - engagement: How likely is this content to engage readers? (1-10)
+                        - relevance: How relevant is this content to its category and topic? (1-10)
+                        - structure: How well-organized and structured is the content? (1-10)
+                        - originality: How original and unique is the content? (1-10)
+                        
+                        Respond with JSON in this exact format:
+                        {
+                            "clarity": {"score": number, "explanation": "brief explanation"},
+                            "depth": {"score": number, "explanation": "brief explanation"},
+                            "engagement": {"score": number, "explanation": "brief explanation"},
+                            "relevance": {"score": number, "explanation": "brief explanation"},
+                            "structure": {"score": number, "explanation": "brief explanation"},
+                            "originality": {"score": number, "explanation": "brief explanation"}
+                        }"""
+
+# Bump when RELEVANCE_SYSTEM_PROMPT changes so cached scores are not reused
+RELEVANCE_PROMPT_VERSION = 1
+RELEVANCE_CACHE_TTL = 7 * 24 * 3600
+
+def _relevance_cache_key(content_text: str, category: str) -> str:
+    """Cache key for AI scores of one exact piece of content under the current model and prompt"""
+    digest = hashlib.sha256(
+        f"{RELEVANCE_MODEL}|{RELEVANCE_PROMPT_VERSION}|{category}|{content_text}".encode()
+    ).hexdigest()
+    return f"relevance:{digest}"
+
+# Near-duplicate reuse: scores of previously analyzed content are reused for
+# text whose 64-bit SimHash is within SIMHASH_MAX_DISTANCE bits and whose
+# shingle sets overlap by at least SIMHASH_MIN_JACCARD, provided the category
+# and tags are identical. Fingerprints are kept per process.
+SIMHASH_MAX_DISTANCE = 3
+SIMHASH_MIN_JACCARD = 0.95
+SIMHASH_SHINGLE_SIZE = 3
+SIMHASH_INDEX_SIZE = 4096
+# Function words and the analysis template's labels carry no signal about
+# what a text says, so they are left out of its shingles
+SIMHASH_STOP_WORDS = frozenset({
+    'a', 'about', 'after', 'all', 'also', 'an', 'and', 'any', 'are', 'as', 'at', 'be', 'been',
+    'but', 'by', 'can', 'could', 'do', 'does', 'for', 'from', 'had', 'has', 'have', 'he', 'her',
+    'his', 'how', 'i', 'if', 'in', 'into', 'is', 'it', 'its', 'just', 'more', 'most', 'my', 'no',
+    'not', 'of', 'on', 'one', 'only', 'or', 'other', 'our', 'out', 'over', 'she', 'so', 'some',
+    'such', 'than', 'that', 'the', 'their', 'them', 'then', 'there', 'these', 'they', 'this',
+    'those', 'to', 'up', 'very', 'was', 'we', 'were', 'what', 'when', 'which', 'who', 'will',
+    'with', 'would', 'you', 'your',
+    'title', 'category', 'tags', 'content'
+})
+SIMHASH_TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+_SIMHASH_BITS = np.arange(64, dtype=np.uint64)
+_simhash_index = {}
+_simhash_order = deque()
+_simhash_lock = threading.Lock()
+
+def simhash_shingles(text: str) -> np.ndarray:
+    """Sorted, distinct 64-bit hashes of the text's word shingles, stop words removed"""
+    tokens = [token for token in SIMHASH_TOKEN_PATTERN.findall(text.lower()) if token not in SIMHASH_STOP_WORDS]
+    if len(tokens) > SIMHASH_SHINGLE_SIZE:
+        tokens = [' '.join(tokens[i:i + SIMHASH_SHINGLE_SIZE]) for i in range(len(tokens) - SIMHASH_SHINGLE_SIZE + 1)]
+    elif tokens:
+        tokens = [' '.join(tokens)]
+    return np.unique(np.fromiter(
+        (int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), 'little') for token in tokens),
+        dtype=np.uint64, count=len(tokens)
+    ))
+
+def simhash(shingles: np.ndarray) -> int:
+    """64-bit SimHash over distinct shingle hashes (see simhash_shingles)"""
+    if not len(shingles):
+        return 0
+    votes = ((shingles[:, np.newaxis] >> _SIMHASH_BITS) & np.uint64(1)).sum(axis=0, dtype=np.int64)
+    return int(np.bitwise_or.reduce(np.uint64(1) << _SIMHASH_BITS[votes * 2 > len(shingles)], initial=np.uint64(0)))
+
+def shingle_jaccard(left: np.ndarray, right: np.ndarray) -> float:
+    """Jaccard similarity of two sorted, distinct shingle hash arrays"""
+    if not len(left) and not len(right):
+        return 1.0
+    shared = len(np.intersect1d(left, right, assume_unique=True))
+    return shared / (len(left) + len(right) - shared)
+
+def _simhash_group(category: str, tags) -> tuple:
+    return (category, tuple(tags) if isinstance(tags, (list, tuple)) else (tags or ''))
+
+def _remember_simhash(content_text: str, category: str, tags, cache_key: str):
+    """Record a scored text so near-duplicates can reuse its cached scores"""
+    group = _simhash_group(category, tags)
+    shingles = simhash_shingles(content_text)
+    fingerprint = simhash(shingles)
+    with _simhash_lock:
+        entries = _simhash_index.setdefault(group, {})
+        if fingerprint not in entries:
+            _simhash_order.append((group, fingerprint))
+        entries[fingerprint] = (cache_key, shingles)
+        while len(_simhash_order) > SIMHASH_INDEX_SIZE:
+            old_group, old_fingerprint = _simhash_order.popleft()
+            old_entries = _simhash_index.get(old_group)
+            if old_entries is not None:
+                old_entries.pop(old_fingerprint, None)
+                if not old_entries:
+                    del _simhash_index[old_group]
+
+def _near_duplicate_scores(content_text: str, category: str, tags) -> Optional[Dict]:
+    """Cached scores of the closest previously analyzed near-duplicate, if any
+    
+    A close fingerprint only nominates a candidate; its shingles must also
+    overlap the text's by SIMHASH_MIN_JACCARD before its scores are reused.
+    """
+    with _simhash_lock:
+        entries = _simhash_index.get(_simhash_group(category, tags))
+        if not entries:
+            return None
+        fingerprints = np.fromiter(entries, dtype=np.uint64, count=len(entries))
+        candidates = list(entries.values())
+    shingles = simhash_shingles(content_text)
+    distances = np.bitwise_count(fingerprints ^ np.uint64(simhash(shingles)))
+    close = np.flatnonzero(distances <= SIMHASH_MAX_DISTANCE)
+    for index in close[np.argsort(distances[close], kind='stable')]:
+        cache_key, candidate_shingles = candidates[index]
+        if shingle_jaccard(shingles, candidate_shingles) >= SIMHASH_MIN_JACCARD:
+            return result_cache.get(cache_key)
+    return None
+
+# Cached scores are packed as one byte per criterion (score x 10, so one
+# decimal survives; SCORE_MISSING when absent) followed by the explanations,
+# JSON-encoded and zlib-compressed
+_PACKED_SCORES = struct.Struct('<6B')
+SCORE_MISSING = 255
+
+def _pack_relevance_scores(scores: Dict) -> bytes:
+    """Compact cache payload for a criterion -> {score, explanation} dict"""
+    quantized = []
+    explanations = []
+    for criterion in SCORING_CRITERIA:
+        data = scores.get(criterion)
+        if isinstance(data, dict) and 'score' in data:
+            quantized.append(min(max(round(float(data['score']) * 10), 0), 100))
+            explanations.append(data.get('explanation', ''))
+        else:
+            quantized.append(SCORE_MISSING)
+            explanations.append(None)
+    return _PACKED_SCORES.pack(*quantized) + zlib.compress(_json_dumps(explanations))
+
+def _unpack_relevance_scores(payload: bytes) -> Dict:
+    """Inverse of _pack_relevance_scores"""
+    quantized = _PACKED_SCORES.unpack_from(payload)
+    explanations = _json_loads(zlib.decompress(payload[_PACKED_SCORES.size:]))
+    return {
+        criterion: {
+            'score': value // 10 if value % 10 == 0 else value / 10,
+            'explanation': explanation
+        }
+        for criterion, value, explanation in zip(SCORING_CRITERIA, quantized, explanations)
+        if value != SCORE_MISSING
+    }
+
+def _cached_relevance_scores(content_text: str, category: str, tags) -> Optional[Dict]:
+    """Scores for this exact text, else for a near-duplicate, else None"""
+    cached = result_cache.get(_relevance_cache_key(content_text, category))
+    if cached is None:
+        cached = _near_duplicate_scores(content_text, category, tags)
+    if isinstance(cached, bytes):
+        try:
+            return _unpack_relevance_scores(cached)
+        except Exception as e:
+            logging.error(f"Error unpacking cached relevance scores: {e}")
+            return None
+    return cached
+
+def _store_relevance_scores(content_text: str, category: str, tags, scores: Dict):
+    """Cache freshly computed scores for exact and near-duplicate lookups"""
+    cache_key = _relevance_cache_key(content_text, category)
+    try:
+        payload = _pack_relevance_scores(scores)
+    except Exception as e:
+        logging.error(f"Error packing relevance scores, caching them unpacked: {e}")
+        payload = scores
+    result_cache.set(cache_key, payload, ttl=RELEVANCE_CACHE_TTL)
+    _remember_simhash(content_text, category, tags, cache_key)
+
+# Batch API jobs: how often analyze_content_batch polls, and how long it waits
+# before cancelling the job and scoring whatever is still outstanding directly
+BATCH_POLL_INTERVAL = 10
+BATCH_WAIT_TIMEOUT = 600
+
+# Upper bound on in-flight OpenAI requests when analyzing several items at once
+MAX_CONCURRENT_ANALYSES = 20
+
+# Items scored per request when analyzing several at once; the system prompt
+# is sent once per request rather than once per item
+RELEVANCE_ITEMS_PER_REQUEST = 10
+RELEVANCE_MAX_TOKENS_PER_ITEM = 600
+
+MULTI_RELEVANCE_SYSTEM_PROMPT = RELEVANCE_SYSTEM_PROMPT + """
+                        
+                        You will receive several items, each introduced by "Item <id>".
+                        Score every item and respond with JSON in this format instead:
+                        {"results": [{"id": <id>, "clarity": {...}, "depth": {...}, ...}, ...]}"""
+
+SCORING_CRITERIA = MappingProxyType({
+    'clarity': 'How clear and understandable is the content?',
+    'depth': 'How comprehensive and detailed is the information?',
+    'engagement': 'How likely is this content to engage readers?',
+    'relevance': 'How relevant is this content to its category and topic?',
+    'structure': 'How well-organized and structured is the content?',
+    'originality': 'How original and unique is the content?'
+})
+
+# Structured output schemas: the model must return every criterion as
+# {"score", "explanation"}, so responses always parse and nothing needs retrying
+_CRITERION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "score": {"type": "integer", "minimum": 1, "maximum": 10},
+        "explanation": {"type": "string"}
+    },
+    "required": ["score", "explanation"],
+    "additionalProperties": False
+}
+
+RELEVANCE_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "relevance_scores",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {criterion: _CRITERION_SCHEMA for criterion in SCORING_CRITERIA},
+            "required": list(SCORING_CRITERIA),
+            "additionalProperties": False
+        }
+    }
+}
+
+MULTI_RELEVANCE_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "relevance_scores_multi",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "results": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "id": {"type": "integer"},
+                            **{criterion: _CRITERION_SCHEMA for criterion in SCORING_CRITERIA}
+                        },
+                        "required": ["id", *SCORING_CRITERIA],
+                        "additionalProperties": False
+                    }
+                }
+            },
+            "required": ["results"],
+            "additionalProperties": False
+        }
+    }
+}
+
+# Weight of each criterion in the overall score
+SCORE_WEIGHTS = MappingProxyType({
+    'clarity': 0.20,
+    'depth': 0.18,
+    'engagement': 0.18,
+    'relevance': 0.22,
+    'structure': 0.12,
+    'originality': 0.10
+})
+
+# Recommendation offered for each criterion scoring below 6
+IMPROVEMENT_RECOMMENDATIONS = MappingProxyType({
+    'clarity': "Consider simplifying complex sentences and using clearer language",
+    'depth': "Add more detailed information and examples",
+    'engagement': "Include more interactive elements, questions, or compelling hooks",
+    'relevance': "Ensure content closely matches the category and target audience",
+    'structure': "Improve organization with headers, bullet points, and logical flow",
+    'originality': "Add unique perspectives, personal insights, or fresh angles"
+})
+
+# Overall-score explanations: SCORE_EXPLANATIONS[i] applies from
+# SCORE_EXPLANATION_BANDS[i - 1] up to (not including) SCORE_EXPLANATION_BANDS[i]
+SCORE_EXPLANATION_BANDS = (4, 5, 6, 7, 8, 9)
+SCORE_EXPLANATIONS = (
+    "Content needs major improvements to meet quality standards",
+    "Below average content requiring significant enhancements",
+    "Average content with several areas needing improvement",
+    "Satisfactory content that meets basic standards",
+    "Good quality content with room for minor improvements",
+    "Excellent content that performs well in most areas",
+    "Outstanding content with exceptional quality across all criteria"
+)
+
+_WEIGHT_VECTOR = np.fromiter(SCORE_WEIGHTS.values(), dtype=np.float64)
+
+# Content bodies are cut to this many tokens before analysis so long posts
+# stay within the model's context and don't spend tokens past the point of use
+RELEVANCE_MAX_BODY_TOKENS = 3000
+# Characters per token assumed when tiktoken is unavailable
+APPROX_CHARS_PER_TOKEN = 4
+
+@cache
+def _get_token_encoding():
+    """Load the relevance model's tokenizer on first use; None when tiktoken is missing"""
+    try:
+        import tiktoken
+        return tiktoken.encoding_for_model(RELEVANCE_MODEL)
+    except ImportError:
+        return None
+    except Exception as e:
+        logging.error(f"Error loading tokenizer for {RELEVANCE_MODEL}, approximating token counts: {e}")
+        return None
+
+def truncate_to_token_budget(text: str, max_tokens: int = RELEVANCE_MAX_BODY_TOKENS) -> str:
+    """Cut text to at most max_tokens tokens of the relevance model"""
+    # Short text can't exceed the budget whatever the tokenizer (tokens are at least one character)
+    if len(text) <= max_tokens:
+        return text
+    encoding = _get_token_encoding()
+    if encoding is None:
+        return text[:max_tokens * APPROX_CHARS_PER_TOKEN]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+# Batches at least this large compute overall scores with the Numba kernel
+# (when numba is installed); below it compilation and thread startup dominate
+NUMBA_MIN_ITEMS = 1000
+
+@cache
+def _get_overall_score_kernel():
+    """Compile the Numba overall-score kernel on first use; None when numba is missing"""
+    try:
+        from numba import njit, prange
+    except ImportError:
+        return None
+    # The app logs at DEBUG; keep the compiler's bytecode dumps out of it
+    logging.getLogger('numba').setLevel(logging.WARNING)
+
+    # No fastmath: each row accumulates in criterion order, exactly like the numpy path
+    @njit(parallel=True, cache=True)
+    def overall_scores_numba(scores, weights, default):
+        overall = np.empty(scores.shape[0], dtype=np.float64)
+        for row in prange(scores.shape[0]):
+            weighted = 0.0
+            total = 0.0
+            for column in range(scores.shape[1]):
+                value = scores[row, column]
+                if not np.isnan(value):
+                    weighted += value * weights[column]
+                    total += weights[column]
+            overall[row] = weighted / total if total > 0 else default
+        return overall
+
+    return overall_scores_numba
+
+class _JsonObjectBuffer:
+    """
+    Accumulates a streamed JSON object and reports when its outermost braces close
+    
+    Braces inside string values are ignored, so explanations containing "{"
+    or "}" do not end the object early.
+    """
+    
+    def __init__(self):
+        self.parts = []
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.started = False
+    
+    def feed(self, text: str) -> bool:
+        """Append streamed text; True once a complete top-level object has been read"""
+        for index, char in enumerate(text):
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == '{':
+                self.depth += 1
+                self.started = True
+            elif char == '}':
+                self.depth -= 1
+                if self.started and self.depth == 0:
+                    self.parts.append(text[:index + 1])
+                    return True
+        self.parts.append(text)
+        return False
+    
+    def loads(self):
+        return _json_loads(''.join(self.parts))
+
+def _read_json_stream(stream):
+    """Read a streamed chat completion until its JSON object is complete, then close it"""
+    buffer = _JsonObjectBuffer()
+    try:
+        for chunk in stream:
+            if chunk.choices and buffer.feed(chunk.choices[0].delta.content or ''):
+                break
+    finally:
+        stream.close()
+    return buffer.loads()
+
+async def _read_json_stream_async(stream):
+    """Async counterpart of _read_json_stream"""
+    buffer = _JsonObjectBuffer()
+    try:
+        async for chunk in stream:
+            if chunk.choices and buffer.feed(chunk.choices[0].delta.content or ''):
+                break
+    finally:
+        await stream.close()
+    return buffer.loads()
 
 class ContentRelevanceAnalyzer:
     """AI-powered content analysis and scoring system"""
     
-    def __init__(self):
-        self.scoring_criteria = {
-            'clarity': 'How clear and understandable is the content?',
-            'depth': 'How comprehensive and detailed is the information?',
-            'engagement': 'How likely is this content to engage readers?',
-            'relevance': 'How relevant is this content to its category and topic?',
-            'structure': 'How well-organized and structured is the content?',
-            'originality': 'How original and unique is the content?'
-        }
+    scoring_criteria = SCORING_CRITERIA
     
     def analyze_content_relevance(self, content: Dict) -> Dict:
         """
@@ -42,30 +504,102 @@ class ContentRelevanceAnalyzer:
             analysis_text = self._prepare_content_for_analysis(content)
             
             # Get AI analysis
-            ai_scores = self._get_ai_relevance_scores(analysis_text, content.get('category', ''))
-            
-            # Calculate overall relevance score
-            overall_score = self._calculate_overall_score(ai_scores)
-            
-            # Generate insights and recommendations
-            insights = self._generate_content_insights(ai_scores, content)
+            ai_scores = self._get_ai_relevance_scores(
+                analysis_text, content.get('category', ''), content.get('tags')
+            )
             
-            return {
-                'overall_score': overall_score,
-                'detailed_scores': ai_scores,
-                'insights': insights,
-                'recommendations': self._generate_recommendations(ai_scores),
-                'score_explanation': self._explain_score(overall_score)
-            }
+            return self.build_analysis(ai_scores, content)
             
         except Exception as e:
             logging.error(f"Error analyzing content relevance: {e}")
             return self._get_fallback_score()
     
+    def analyze_contents_relevance(self, contents: List[Dict]) -> List[Dict]:
+        """
+        Analyze several content items concurrently
+        
+        Args:
+            contents: List of content dictionaries
+            
+        Returns:
+            Analysis results in the same order as ``contents``
+        """
+        if not contents:
+            return []
+        return asyncio.run(self._analyze_contents_async(contents))
+    
+    async def _analyze_contents_async(self, contents: List[Dict]) -> List[Dict]:
+        """Score uncached items RELEVANCE_ITEMS_PER_REQUEST per request, requests in parallel"""
+        prepared = [
+            (self._prepare_content_for_analysis(content), content.get('category', ''), content.get('tags'))
+            for content in contents
+        ]
+        scores = [_cached_relevance_scores(*item) for item in prepared]
+        pending = [i for i, item_scores in enumerate(scores) if item_scores is None]
+        
+        if pending:
+            semaphore = asyncio.Semaphore(MAX_CONCURRENT_ANALYSES)
+            # One client per run: its connection pool is tied to this event loop
+            async with AsyncOpenAI(
+                api_key=OPENAI_API_KEY,
+                http_client=DefaultAsyncHttpxClient(
+                    http2=OPENAI_HTTP2, limits=OPENAI_CONNECTION_LIMITS, timeout=OPENAI_TIMEOUT
+                )
+            ) as client:
+                groups = [
+                    pending[start:start + RELEVANCE_ITEMS_PER_REQUEST]
+                    for start in range(0, len(pending), RELEVANCE_ITEMS_PER_REQUEST)
+                ]
+                group_scores = await asyncio.gather(*(
+                    self._get_ai_relevance_scores_multi(client, semaphore, [prepared[i] for i in group])
+                    for group in groups
+                ))
+                for group, results in zip(groups, group_scores):
+                    for i, item_scores in zip(group, results):
+                        scores[i] = item_scores
+                
+                # Items a multi-item response left out are retried on their own
+                missing = [i for i in pending if scores[i] is None]
+                if missing:
+                    async def score_single(item):
+                        async with semaphore:
+                            return await self._get_ai_relevance_scores_async(client, *item)
+                    for i, item_scores in zip(missing, await asyncio.gather(
+                        *(score_single(prepared[i]) for i in missing)
+                    )):
+                        scores[i] = item_scores
+        
+        overall_scores = self._calculate_overall_scores(scores)
+        analyses = []
+        for item_scores, content, overall_score in zip(scores, contents, overall_scores):
+            try:
+                analyses.append(self.build_analysis(item_scores, content, overall_score))
+            except Exception as e:
+                logging.error(f"Error analyzing content relevance: {e}")
+                analyses.append(self._get_fallback_score())
+        return analyses
+    
+    def build_analysis(self, ai_scores: Dict, content: Dict, overall_score: Optional[float] = None) -> Dict:
+        """Turn raw AI criterion scores into the full analysis result"""
+        # Calculate overall relevance score
+        if overall_score is None:
+            overall_score = self._calculate_overall_score(ai_scores)
+        
+        # Generate insights and recommendations
+        insights, recommendations = self._post_process(ai_scores)
+        
+        return {
+            'overall_score': overall_score,
+            'detailed_scores': ai_scores,
+            'insights': insights,
+            'recommendations': recommendations,
+            'score_explanation': self._explain_score(overall_score)
+        }
+    
     def _prepare_content_for_analysis(self, content: Dict) -> str:
         """Prepare content text for AI analysis"""
         title = content.get('title', '')
-        body = content.get('content', '')
+        body = truncate_to_token_budget(content.get('content') or '')
         tags = content.get('tags', '')
         category = content.get('category', '')
         
@@ -76,86 +610,152 @@ class ContentRelevanceAnalyzer:
         Content: {body}
         """
     
-    def _get_ai_relevance_scores(self, content_text: str, category: str) -> Dict:
+    def build_relevance_request(self, content_text: str, category: str) -> Dict:
+        """Build the chat completion request body used to score one content item"""
+        return {
+            'model': RELEVANCE_MODEL,
+            'messages': [
+                {
+                    "role": "system",
+                    "content": RELEVANCE_SYSTEM_PROMPT
+                },
+                {
+                    "role": "user",
+                    "content": f"Please analyze this {category} content:\n\n{content_text}"
+                }
+            ],
+            'response_format': RELEVANCE_RESPONSE_FORMAT,
+            'max_tokens': 1000
+        }
+    
+    def _get_ai_relevance_scores(self, content_text: str, category: str, tags=None) -> Dict:
         """Get AI-powered relevance scores using OpenAI"""
+        cached = _cached_relevance_scores(content_text, category, tags)
+        if cached is not None:
+            return cached
         try:
-            # the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
-            # do not change this unless explicitly requested by the user
-            response = openai_client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": """You are a content quality analyst. Analyze the provided content and score it on multiple criteria. 
-                        Return scores from 1-10 for each criterion and provide brief explanations.
-                        
-                        Scoring criteria:
-                        - clarity: How clear and understandable is the content? (1-10)
-                        - depth: How comprehensive and detailed is the information? (1-10)
-                        - engagement: How likely is this content to engage readers? (1-10)
-                        - relevance: How relevant is this content to its category and topic? (1-10)
-                        - structure: How well-organized and structured is the content? (1-10)
-                        - originality: How original and unique is the content? (1-10)
-                        
-                        Respond with JSON in this exact format:
-                        {
-                            "clarity": {"score": number, "explanation": "brief explanation"},
-                            "depth": {"score": number, "explanation": "brief explanation"},
-                            "engagement": {"score": number, "explanation": "brief explanation"},
-                            "relevance": {"score": number, "explanation": "brief explanation"},
-                            "structure": {"score": number, "explanation": "brief explanation"},
-                            "originality": {"score": number, "explanation": "brief explanation"}
-                        }"""
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Please analyze this {category} content:\n\n{content_text}"
-                    }
-                ],
-                response_format={"type": "json_object"},
-                max_tokens=1000
+            stream = openai_client.chat.completions.create(
+                **self.build_relevance_request(content_text, category), stream=True
             )
             
-            result = json.loads(response.choices[0].message.content)
+            result = _read_json_stream(stream)
+            _store_relevance_scores(content_text, category, tags, result)
             return result
             
         except Exception as e:
             logging.error(f"Error getting AI relevance scores: {e}")
             return self._get_default_scores()
     
-    def _calculate_overall_score(self, ai_scores: Dict) -> float:
-        """Calculate weighted overall relevance score"""
+    async def _get_ai_relevance_scores_async(self, client: AsyncOpenAI, content_text: str, category: str, tags=None) -> Dict:
+        """Async counterpart of _get_ai_relevance_scores"""
+        cached = _cached_relevance_scores(content_text, category, tags)
+        if cached is not None:
+            return cached
         try:
-            weights = {
-                'clarity': 0.20,
-                'depth': 0.18,
-                'engagement': 0.18,
-                'relevance': 0.22,
-                'structure': 0.12,
-                'originality': 0.10
-            }
-            
-            total_score = 0
-            total_weight = 0
+            stream = await client.chat.completions.create(
+                **self.build_relevance_request(content_text, category), stream=True
+            )
             
-            for criterion, weight in weights.items():
-                if criterion in ai_scores and 'score' in ai_scores[criterion]:
-                    score = ai_scores[criterion]['score']
-                    total_score += score * weight
-                    total_weight += weight
+            result = await _read_json_stream_async(stream)
+            _store_relevance_scores(content_text, category, tags, result)
+            return result
             
-            if total_weight > 0:
-                return round(total_score / total_weight, 1)
-            else:
-                return 5.0
-                
         except Exception as e:
-            logging.error(f"Error calculating overall score: {e}")
-            return 5.0
+            logging.error(f"Error getting AI relevance scores: {e}")
+            return self._get_default_scores()
+    
+    async def _get_ai_relevance_scores_multi(self, client: AsyncOpenAI, semaphore: asyncio.Semaphore,
+                                             items: List[tuple]) -> List[Optional[Dict]]:
+        """
+        Score several (content_text, category, tags) items with a single request
+        
+        Returns:
+            Scores per item in input order; None for items missing from the response
+        """
+        if len(items) == 1:
+            async with semaphore:
+                return [await self._get_ai_relevance_scores_async(client, *items[0])]
+        
+        user_message = "Please analyze these items:\n\n" + "\n\n".join(
+            f"Item {index} ({category} content):\n{content_text}"
+            for index, (content_text, category, _) in enumerate(items)
+        )
+        try:
+            async with semaphore:
+                stream = await client.chat.completions.create(
+                    model=RELEVANCE_MODEL,
+                    messages=[
+                        {"role": "system", "content": MULTI_RELEVANCE_SYSTEM_PROMPT},
+                        {"role": "user", "content": user_message}
+                    ],
+                    response_format=MULTI_RELEVANCE_RESPONSE_FORMAT,
+                    max_tokens=RELEVANCE_MAX_TOKENS_PER_ITEM * len(items),
+                    stream=True
+                )
+                entries = (await _read_json_stream_async(stream)).get('results', [])
+        except Exception as e:
+            logging.error(f"Error getting AI relevance scores for {len(items)} items: {e}")
+            return [None] * len(items)
+        
+        results = [None] * len(items)
+        for entry in entries:
+            try:
+                index = int(entry.pop('id'))
+            except (AttributeError, KeyError, TypeError, ValueError):
+                continue
+            if 0 <= index < len(items) and any(criterion in entry for criterion in SCORING_CRITERIA):
+                results[index] = entry
+                _store_relevance_scores(*items[index], entry)
+        return results
+    
+    def _calculate_overall_score(self, ai_scores: Dict) -> float:
+        """Calculate weighted overall relevance score"""
+        return self._calculate_overall_scores([ai_scores])[0]
+    
+    def _calculate_overall_scores(self, ai_scores_list: List[Dict]) -> List[float]:
+        """
+        Weighted overall scores for many items in one vectorized pass
+        
+        Criteria missing from an item are left out of its weighted average;
+        items with no usable scores get 5.0.
+        """
+        scores = np.full((len(ai_scores_list), len(_WEIGHT_VECTOR)), np.nan)
+        for row, ai_scores in enumerate(ai_scores_list):
+            try:
+                for column, criterion in enumerate(SCORE_WEIGHTS):
+                    if criterion in ai_scores and 'score' in ai_scores[criterion]:
+                        scores[row, column] = float(ai_scores[criterion]['score'])
+            except Exception as e:
+                logging.error(f"Error calculating overall score: {e}")
+                scores[row] = np.nan
+        
+        overall = None
+        if len(ai_scores_list) >= NUMBA_MIN_ITEMS:
+            kernel = _get_overall_score_kernel()
+            if kernel is not None:
+                try:
+                    overall = kernel(scores, _WEIGHT_VECTOR, 5.0)
+                except Exception as e:
+                    logging.error(f"Numba overall score kernel failed, using numpy: {e}")
+        if overall is None:
+            present = ~np.isnan(scores)
+            # Row sums over the six criteria accumulate in criterion order, so
+            # results match the per-item sum exactly
+            total_weights = np.where(present, _WEIGHT_VECTOR, 0.0).sum(axis=1)
+            weighted = (np.where(present, scores, 0.0) * _WEIGHT_VECTOR).sum(axis=1)
+            overall = np.divide(weighted, total_weights, out=np.full(len(ai_scores_list), 5.0), where=total_weights > 0)
+        # Python's round() on each value, matching the scores produced so far
+        return [round(score, 1) for score in overall.tolist()]
     
-    def _generate_content_insights(self, scores: Dict, content: Dict) -> List[str]:
-        """Generate actionable insights based on scores"""
+    def _post_process(self, scores: Dict) -> Tuple[List[str], List[str]]:
+        """
+        Generate insights and improvement recommendations in one pass over the scores
+        
+        Returns:
+            (insights, recommendations), limited to 6 and 4 entries
+        """
         insights = []
+        recommendations = []
         
         try:
             for criterion, data in scores.items():
@@ -170,56 +770,19 @@ class ContentRelevanceAnalyzer:
                     else:
                         insights.append(f"⚠ Needs improvement in {criterion}: {explanation}")
                         
+                        recommendation = IMPROVEMENT_RECOMMENDATIONS.get(criterion)
+                        if recommendation is not None:
+                            recommendations.append(recommendation)
+                        
         except Exception as e:
             logging.error(f"Error generating insights: {e}")
             insights.append("Analysis completed - check individual scores for details")
         
-        return insights[:6]  # Limit to 6 insights
-    
-    def _generate_recommendations(self, scores: Dict) -> List[str]:
-        """Generate improvement recommendations based on scores"""
-        recommendations = []
-        
-        try:
-            for criterion, data in scores.items():
-                if isinstance(data, dict) and 'score' in data:
-                    score = data['score']
-                    
-                    if score < 6:
-                        if criterion == 'clarity':
-                            recommendations.append("Consider simplifying complex sentences and using clearer language")
-                        elif criterion == 'depth':
-                            recommendations.append("Add more detailed information and examples")
-                        elif criterion == 'engagement':
-                            recommendations.append("Include more interactive elements, questions, or compelling hooks")
-                        elif criterion == 'relevance':
-                            recommendations.append("Ensure content closely matches the category and target audience")
-                        elif criterion == 'structure':
-                            recommendations.append("Improve organization with headers, bullet points, and logical flow")
-                        elif criterion == 'originality':
-                            recommendations.append("Add unique perspectives, personal insights, or fresh angles")
-                            
-        except Exception:
-            pass
-        
-        return recommendations[:4]  # Limit to 4 recommendations
+        return insights[:6], recommendations[:4]  # Limit to 6 insights and 4 recommendations
     
     def _explain_score(self, score: float) -> str:
         """Provide human-readable explanation of the overall score"""
-        if score >= 9:
-            return "Outstanding content with exceptional quality across all criteria"
-        elif score >= 8:
-            return "Excellent content that performs well in most areas"
-        elif score >= 7:
-            return "Good quality content with room for minor improvements"
-        elif score >= 6:
-            return "Satisfactory content that meets basic standards"
-        elif score >= 5:
-            return "Average content with several areas needing improvement"
-        elif score >= 4:
-            return "Below average content requiring significant enhancements"
-        else:
-            return "Content needs major improvements to meet quality standards"
+        return SCORE_EXPLANATIONS[bisect.bisect_right(SCORE_EXPLANATION_BANDS, score)]
     
     def _get_default_scores(self) -> Dict:
         """Return default scores when AI analysis fails"""
@@ -242,27 +805,197 @@ class ContentRelevanceAnalyzer:
             'score_explanation': 'Good quality content with standard performance'
         }
 
-def analyze_content_batch(content_ids: List[int]) -> Dict[int, Dict]:
+# Global analyzer instance
+relevance_analyzer = ContentRelevanceAnalyzer()
+
+# Per-process memo of analysis fields keyed by (content id, updated_at), so
+# repeated batches over unchanged content skip fetching and truncating bodies.
+# An edit bumps updated_at, which makes the old entry unreachable.
+ANALYSIS_CONTENT_CACHE_SIZE = 1024
+_analysis_content_cache = {}
+_analysis_content_lock = threading.Lock()
+
+def _load_contents_for_analysis(content_ids) -> List[Dict]:
+    """
+    Fetch the fields relevance analysis reads for the given content IDs
+    
+    Returned as plain dictionaries shaped like Content.to_dict(), bodies
+    already cut to the token budget. Only content not memoized at its current
+    updated_at is read in full, in one query over just those columns.
+    """
+    versions = db.session.query(Content.id, Content.updated_at).filter(
+        Content.id.in_(list(content_ids))
+    ).all()
+    
+    contents = {}
+    with _analysis_content_lock:
+        for content_id, updated_at in versions:
+            cached = _analysis_content_cache.get((content_id, updated_at))
+            if cached is not None:
+                contents[content_id] = dict(cached)
+    
+    missing = [content_id for content_id, _ in versions if content_id not in contents]
+    if missing:
+        rows = db.session.query(
+            Content.id, Content.updated_at, Content.title, Content.content, Content.category, Content.tags
+        ).filter(Content.id.in_(missing)).all()
+        for content_id, updated_at, title, body, category, tags in rows:
+            content_dict = {
+                'id': content_id,
+                'title': title,
+                'content': truncate_to_token_budget(body or ''),
+                'category': category,
+                'tags': Content.parse_tags(tags)
+            }
+            contents[content_id] = dict(content_dict)
+            with _analysis_content_lock:
+                if len(_analysis_content_cache) >= ANALYSIS_CONTENT_CACHE_SIZE:
+                    _analysis_content_cache.pop(next(iter(_analysis_content_cache)), None)
+                _analysis_content_cache[(content_id, updated_at)] = content_dict
+    
+    return [contents[content_id] for content_id, _ in versions if content_id in contents]
+
+def submit_analysis_batch(content_ids: List[int]) -> Optional[str]:
+    """
+    Submit relevance analysis for multiple content items as one OpenAI Batch API job
+    
+    Args:
+        content_ids: List of content IDs to analyze
+        
+    Returns:
+        The batch job ID, or None if nothing was submitted
+    """
+    
+    try:
+        contents = _load_contents_for_analysis(content_ids)
+        if not contents:
+            return None
+        
+        lines = []
+        for content_dict in contents:
+            analysis_text = relevance_analyzer._prepare_content_for_analysis(content_dict)
+            if result_cache.get(_relevance_cache_key(analysis_text, content_dict.get('category', ''))) is not None:
+                continue  # Already scored; the direct path serves it from the cache
+            lines.append(_json_dumps({
+                'custom_id': str(content_dict['id']),
+                'method': 'POST',
+                'url': '/v1/chat/completions',
+                'body': relevance_analyzer.build_relevance_request(analysis_text, content_dict.get('category', ''))
+            }))
+        
+        if not lines:
+            return None
+        
+        batch_input = io.BytesIO(b'\n'.join(lines))
+        batch_input.name = 'relevance_batch.jsonl'
+        input_file = openai_client.files.create(file=batch_input, purpose='batch')
+        batch = openai_client.batches.create(
+            input_file_id=input_file.id,
+            endpoint='/v1/chat/completions',
+            completion_window='24h'
+        )
+        return batch.id
+        
+    except Exception as e:
+        logging.error(f"Error submitting analysis batch: {e}")
+        return None
+
+def collect_analysis_batch(batch_id: str) -> Optional[Dict[int, Dict]]:
+    """
+    Collect the results of a batch submitted with submit_analysis_batch
+    
+    Args:
+        batch_id: ID returned by submit_analysis_batch
+        
+    Returns:
+        Dictionary mapping content IDs to analysis results (items that failed
+        are left out), or None while the batch is still running
+    """
+    batch = openai_client.batches.retrieve(batch_id)
+    if batch.status not in ('completed', 'failed', 'expired', 'cancelled'):
+        return None
+    if not batch.output_file_id:
+        logging.error(f"Analysis batch {batch_id} ended with status {batch.status}")
+        return {}
+    
+    output = openai_client.files.content(batch.output_file_id).text
+    raw_scores = {}
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        record = _json_loads(line)
+        response = record.get('response') or {}
+        if record.get('error') or response.get('status_code') != 200:
+            logging.error(f"Batch analysis failed for content {record.get('custom_id')}: {record.get('error')}")
+            continue
+        try:
+            raw_scores[int(record['custom_id'])] = _json_loads(
+                response['body']['choices'][0]['message']['content']
+            )
+        except Exception as e:
+            logging.error(f"Error parsing batch analysis for content {record.get('custom_id')}: {e}")
+    
+    contents = _load_contents_for_analysis(raw_scores) if raw_scores else []
+    results = {}
+    for content_dict in contents:
+        content_id = content_dict['id']
+        analysis_text = relevance_analyzer._prepare_content_for_analysis(content_dict)
+        _store_relevance_scores(
+            analysis_text, content_dict.get('category', ''), content_dict.get('tags'), raw_scores[content_id]
+        )
+        results[content_id] = relevance_analyzer.build_analysis(raw_scores[content_id], content_dict)
+    return results
+
+def analyze_content_batch(content_ids: List[int], wait_timeout: float = BATCH_WAIT_TIMEOUT) -> Dict[int, Dict]:
     """
     Analyze multiple content items in batch
     
+    Submits one Batch API job and polls it for up to ``wait_timeout`` seconds;
+    if it hasn't finished by then it is cancelled, and items without a batch
+    result are analyzed concurrently.
+    
     Args:
         content_ids: List of content IDs to analyze
+        wait_timeout: Seconds to wait for the batch job
         
     Returns:
         Dictionary mapping content IDs to their analysis results
     """
-    analyzer = ContentRelevanceAnalyzer()
     results = {}
+    batch_id = None
+    collected = False
     
     try:
-        contents = Content.query.filter(Content.id.in_(content_ids)).all()
-        
-        for content in contents:
-            content_dict = content.to_dict()
-            analysis = analyzer.analyze_content_relevance(content_dict)
-            results[content.id] = analysis
-            
+        batch_id = submit_analysis_batch(content_ids)
+        if batch_id:
+            deadline = time.monotonic() + wait_timeout
+            while True:
+                batch_results = collect_analysis_batch(batch_id)
+                if batch_results is not None:
+                    results.update(batch_results)
+                    collected = True
+                    break
+                if time.monotonic() >= deadline:
+                    logging.warning(f"Analysis batch {batch_id} still running; analyzing remaining items directly")
+                    break
+                time.sleep(BATCH_POLL_INTERVAL)
+    except Exception as e:
+        logging.error(f"Error in batch analysis: {e}")
+    
+    if batch_id and not collected:
+        # The items are about to be scored directly, so the job must not go
+        # on to finish (and be billed) as well
+        try:
+            openai_client.batches.cancel(batch_id)
+        except Exception as e:
+            logging.error(f"Error cancelling analysis batch {batch_id}: {e}")
+    
+    try:
+        remaining = [content_id for content_id in content_ids if content_id not in results]
+        if remaining:
+            contents = _load_contents_for_analysis(remaining)
+            analyses = relevance_analyzer.analyze_contents_relevance(contents)
+            results.update(zip((content['id'] for content in contents), analyses))
     except Exception as e:
         logging.error(f"Error in batch analysis: {e}")
     
@@ -283,8 +1016,7 @@ def get_relevance_score_summary(content_id: int) -> Dict:
         if not content:
             return {'error': 'Content not found'}
         
-        analyzer = ContentRelevanceAnalyzer()
-        analysis = analyzer.analyze_content_relevance(content.to_dict())
+        analysis = relevance_analyzer.analyze_content_relevance(content.to_dict())
         
         return {
             'content_id': content_id,
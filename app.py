@@ -1,28 +1,51 @@
 import os
 import logging
 from datetime import datetime, timedelta
-from flask import Flask, render_template, request, redirect, url_for, flash, abort, send_from_directory, session, jsonify
+from flask import Flask, render_template, request, redirect, url_for, flash, abort, send_from_directory, session, jsonify, g, Response
 from forms import ContentForm, EditContentForm, ProductForm, AddToCartForm, UpdateCartForm, CheckoutForm
 from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.utils import secure_filename
+from werkzeug.security import safe_join
 import uuid
-from models import db, Content, UserInteraction, User, OAuth, File, Product, CartItem, Order, OrderItem, Story, Wishlist, ProductReview, Coupon, CouponUsage
-from database_utils import DatabaseManager, DatabaseHealthChecker
-from sqlalchemy import func
+import hashlib
+import gzip
+import shutil
+import mimetypes
+from models import db, Content, UserInteraction, UserItemScore, User, OAuth, File, Product, CartItem, Order, OrderItem, Story, Wishlist, ProductReview, Coupon, CouponUsage
+from database_utils import DatabaseManager, DatabaseHealthChecker, BACKUP_DIR
+from cache_utils import (
+    result_cache, INTERACTION_TOTAL_KEY, INTERACTION_USERS_KEY, INTERACTION_BY_USER_KEY,
+    INTERACTION_BY_CONTENT_KEY, INTERACTION_COUNTERS_SEEDED_KEY, INTERACTION_QUEUE_KEY, SEARCH_EPOCH_KEY
+)
+from similarity_kernels import BITSET_MAX_BYTES, pack_rows, bitset_cosine_similarities
+from sqlalchemy import func, event, inspect, bindparam
+from sqlalchemy.orm import Session as SessionBase, object_session
 import re
-from collections import Counter, defaultdict
+import threading
+import time
+import atexit
+import heapq
+from functools import wraps
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter, deque
 import numpy as np
 from replit_auth import make_replit_blueprint, require_login
 from flask_login import current_user
 from flask_wtf.csrf import CSRFProtect
 from recommendation_engine import recommendation_engine
-from ai_relevance import ContentRelevanceAnalyzer
+from ai_relevance import relevance_analyzer
 from user_type_classifier import UserTypeClassifier
 from translations import get_translation, get_available_languages
 from product_recommendation_engine import get_product_recommendations_for_user, get_similar_products
 import stripe
 import json
 
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 
 
 # Configure logging
@@ -40,6 +63,9 @@ if database_url:
     app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
         "pool_recycle": 300,
         "pool_pre_ping": True,
+        # Room for request handlers plus the parallel admin statistics queries
+        "pool_size": 10,
+        "max_overflow": 5,
     }
 else:
     # Fallback to SQLite for development
@@ -94,6 +120,18 @@ def load_user(user_id):
 # Register authentication blueprint
 app.register_blueprint(make_replit_blueprint(), url_prefix="/auth")
 
+# Users allowed to run admin-only operations (comma-separated user ids)
+ADMIN_USER_IDS = frozenset(filter(None, os.environ.get('ADMIN_USER_IDS', '').split(',')))
+
+def require_admin(f):
+    """Reject logged-in users who aren't listed in ADMIN_USER_IDS (use after require_login)"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if current_user.id not in ADMIN_USER_IDS:
+            abort(403)
+        return f(*args, **kwargs)
+    return decorated_function
+
 # Configure Stripe
 stripe.api_key = os.environ.get('STRIPE_SECRET_KEY')
 
@@ -118,13 +156,73 @@ def make_session_permanent():
 # Create database tables
 with app.app_context():
     db.create_all()
+    DatabaseManager.add_content_keywords_column()
+    DatabaseManager.ensure_user_item_scores()
 
 
 
-# Ensure upload directory exists
+# Ensure upload directories exist once at startup rather than per upload
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+os.makedirs(FILES_FOLDER, exist_ok=True)
+
+# Uploads are copied to disk in chunks of this many bytes
+UPLOAD_CHUNK_SIZE = 1 << 20
+# Bytes of hash (or randomness) in an uploaded file's name
+UPLOAD_DIGEST_SIZE = 8
+# Bulk uploads write this many files to disk at once
+UPLOAD_WORKERS = 8
+_upload_executor = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix='uploads')
+# Files listed per page of a file manager tab
+FILE_MANAGER_PAGE_SIZE = 24
+# Text-like uploads get .br/.gz copies written next to them, served to
+# clients that accept the encoding
+PRECOMPRESSED_EXTENSIONS = {'svg', 'txt', 'rtf', 'csv'}
+PRECOMPRESSED_ENCODINGS = (('br', '.br'), ('gzip', '.gz')) if brotli is not None else (('gzip', '.gz'),)
 
 # Helper functions for file handling
+def write_upload_stream(stream, file_path, digest=None):
+    """Copy an upload stream to file_path in fixed-size chunks and return the bytes written
+    
+    Each chunk is also fed to ``digest`` (a hashlib object) when one is given.
+    """
+    size = 0
+    with open(file_path, 'wb') as out:
+        while True:
+            chunk = stream.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            out.write(chunk)
+            if digest is not None:
+                digest.update(chunk)
+            size += len(chunk)
+    return size
+
+def write_precompressed_copies(file_path):
+    """Write .br/.gz copies of a stored file, keeping only those smaller than the original"""
+    original_size = os.path.getsize(file_path)
+    for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+        compressed_path = file_path + suffix
+        try:
+            with open(file_path, 'rb') as source, open(compressed_path, 'wb') as out:
+                if encoding == 'br':
+                    compressor = brotli.Compressor()
+                    while True:
+                        chunk = source.read(UPLOAD_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        out.write(compressor.process(chunk))
+                    out.write(compressor.finish())
+                else:
+                    # mtime=0 keeps the copy byte-identical for identical uploads
+                    with gzip.GzipFile(fileobj=out, mode='wb', mtime=0) as compressed:
+                        shutil.copyfileobj(source, compressed, UPLOAD_CHUNK_SIZE)
+            if os.path.getsize(compressed_path) >= original_size:
+                os.remove(compressed_path)
+        except Exception as e:
+            if os.path.exists(compressed_path):
+                os.remove(compressed_path)
+            app.logger.error(f'Error precompressing {file_path}: {e}')
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALL_ALLOWED_EXTENSIONS
 
@@ -144,178 +242,666 @@ def get_file_type(extension):
     else:
         return 'other'
 
-def save_uploaded_file(file, user_id, content_id=None, file_type='general'):
-    """Save uploaded file and create database record"""
-    if file and allowed_file(file.filename):
-        original_filename = secure_filename(file.filename)
-        name, ext = os.path.splitext(original_filename)
-        extension = ext[1:].lower()  # Remove the dot
-        
-        # Generate unique filename
-        unique_filename = f"{name}_{uuid.uuid4().hex[:8]}{ext}"
-        
-        # Determine file type and storage location
-        detected_file_type = get_file_type(extension)
-        
-        # Use different folders for images vs other files
-        if detected_file_type == 'image':
-            storage_folder = app.config['UPLOAD_FOLDER']
-        else:
-            storage_folder = app.config['FILES_FOLDER']
-            os.makedirs(storage_folder, exist_ok=True)
+def get_storage_folder(file_type):
+    """Images are served from the uploads folder, everything else from the files folder"""
+    return app.config['UPLOAD_FOLDER'] if file_type == 'image' else app.config['FILES_FOLDER']
+
+def store_upload(file, user_id, content_id=None):
+    """Write an upload to its content-addressed name on disk, without touching the database
+    
+    Returns ``(values, created)`` where ``values`` holds the File column
+    values and ``created`` is False when an identical file was already
+    stored under that name; None if the file is rejected or can't be written.
+    """
+    if not (file and allowed_file(file.filename)):
+        return None
+    original_filename = secure_filename(file.filename)
+    name, ext = os.path.splitext(original_filename)
+    extension = ext[1:].lower()  # Remove the dot
+    
+    # Determine file type and storage location
+    detected_file_type = get_file_type(extension)
+    storage_folder = get_storage_folder(detected_file_type)
+    
+    # The final name is only known once the bytes are hashed, so stream to
+    # a name private to this thread first
+    temp_path = os.path.join(storage_folder, f'.upload-{os.getpid()}-{threading.get_ident()}.part')
+    try:
+        # Stream file to disk, hashing and counting it as it is written.
+        # Owner and content are hashed too, so only a re-upload of the same
+        # bytes to the same place maps to an existing name.
+        digest = hashlib.blake2b(f'{user_id}:{content_id}:'.encode(), digest_size=UPLOAD_DIGEST_SIZE)
+        file_size = write_upload_stream(file.stream, temp_path, digest)
+        if not file_size:
+            # Empty files would fail the file_size > 0 check on insert
+            os.remove(temp_path)
+            return None
+        unique_filename = f"{name}_{digest.hexdigest()}{ext}"
         
         file_path = os.path.join(storage_folder, unique_filename)
-        
+        created = not os.path.exists(file_path)
+        if created:
+            os.replace(temp_path, file_path)
+            if extension in PRECOMPRESSED_EXTENSIONS:
+                write_precompressed_copies(file_path)
+        else:
+            os.remove(temp_path)
+    except Exception as e:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        app.logger.error(f'Error writing uploaded file: {e}')
+        return None
+    
+    values = {
+        'filename': unique_filename,
+        'original_filename': original_filename,
+        'file_type': detected_file_type,
+        'file_extension': extension,
+        'file_size': file_size,
+        'user_id': user_id,
+        'content_id': content_id
+    }
+    return values, created
+
+def remove_stored_upload(file_type, filename):
+    """Delete an uploaded file and its precompressed copies from disk, logging rather than raising on failure"""
+    file_path = os.path.join(get_storage_folder(file_type), filename)
+    for path in (file_path, file_path + '.br', file_path + '.gz'):
         try:
-            # Save file to disk
-            file.save(file_path)
-            
-            # Get file size
-            file_size = os.path.getsize(file_path)
-            
-            # Create database record
-            file_record = File(
-                filename=unique_filename,
-                original_filename=original_filename,
-                file_type=detected_file_type,
-                file_extension=extension,
-                file_size=file_size,
-                user_id=user_id,
-                content_id=content_id
-            )
-            
-            db.session.add(file_record)
+            if os.path.exists(path):
+                os.remove(path)
+        except OSError as e:
+            app.logger.error(f'Error removing uploaded file {path}: {e}')
+
+def save_uploaded_file(file, user_id, content_id=None, file_type='general', commit=True):
+    """Save uploaded file and create database record
+    
+    With commit=False the record is only added to the session, so a caller
+    saving several files commits them together (see discard_uploaded_files).
+    """
+    stored = store_upload(file, user_id, content_id)
+    if stored is None:
+        return None
+    values, created = stored
+    
+    try:
+        # A re-upload of a file already on record reuses that record
+        existing_record = File.query.filter_by(
+            filename=values['filename'], user_id=user_id, content_id=content_id
+        ).first()
+        if existing_record is not None:
+            return existing_record
+        
+        # Create database record
+        file_record = File(**values)
+        db.session.add(file_record)
+        if commit:
             db.session.commit()
-            
-            return file_record
-            
-        except Exception as e:
-            # Clean up file if database operation fails
-            if os.path.exists(file_path):
-                os.remove(file_path)
+        
+        return file_record
+        
+    except Exception as e:
+        # Clean up file if database operation fails
+        if created:
+            remove_stored_upload(values['file_type'], values['filename'])
+        if commit:
             db.session.rollback()
-            app.logger.error(f'Error saving file: {e}')
-            return None
-    return None
+        app.logger.error(f'Error saving file: {e}')
+        return None
+
+def discard_uploaded_files(file_records):
+    """Delete the stored files of records whose rows were rolled back
+    
+    Call after db.session.rollback(); records that were already committed
+    (e.g. reused re-uploads) stay persistent and keep their files.
+    """
+    for file_record in file_records:
+        if inspect(file_record).transient:
+            remove_stored_upload(file_record.file_type, file_record.filename)
 
 def save_image_file(file):
     """Legacy function for backward compatibility with image uploads"""
     if file and allowed_file(file.filename):
         filename = secure_filename(file.filename)
         name, ext = os.path.splitext(filename)
-        unique_filename = f"{name}_{uuid.uuid4().hex[:8]}{ext}"
+        unique_filename = f"{name}_{os.urandom(UPLOAD_DIGEST_SIZE).hex()}{ext}"
         file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-        file.save(file_path)
+        write_upload_stream(file.stream, file_path)
         return unique_filename
     return None
 
 
 
 # Recommendation system functions
+
+# Common stop words to exclude from keywords and TF-IDF features
+KEYWORD_STOP_WORDS = frozenset({
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by',
+    'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did',
+    'will', 'would', 'could', 'should', 'may', 'might', 'can', 'this', 'that', 'these', 'those',
+    'i', 'you', 'he', 'she', 'it', 'we', 'they', 'me', 'him', 'her', 'us', 'them', 'my', 'your',
+    'his', 'its', 'our', 'their', 'not', 'no', 'yes', 'if', 'when', 'where', 'why', 'how'
+})
+# HTML tags and special characters, stripped in one pass (tags match first at each position)
+KEYWORD_NOISE_PATTERN = re.compile(r'<[^>]+>|[^a-zA-Z0-9\s]')
+KEYWORD_HTML_PATTERN = re.compile(r'<[^>]+>')
+# ASCII characters KEYWORD_NOISE_PATTERN removes, for str.translate on ASCII text
+KEYWORD_SPECIAL_CHARS = str.maketrans('', '', ''.join(
+    chr(code) for code in range(128) if not chr(code).isalnum() and not chr(code).isspace()
+))
+KEYWORD_PATTERN = re.compile(r'[a-z0-9]{4,}')
+
+def clean_keyword_text(text):
+    """Lowercase text and strip HTML tags and special characters"""
+    if text.isascii():
+        # Only tags need the regex engine; the character strip is a C-level table lookup
+        return KEYWORD_HTML_PATTERN.sub('', text).lower().translate(KEYWORD_SPECIAL_CHARS)
+    return KEYWORD_NOISE_PATTERN.sub('', text.lower())
+
 def extract_keywords(text, num_keywords=10):
     """Extract important keywords from text content"""
     # Remove HTML tags and special characters
-    clean_text = re.sub(r'<[^>]+>', '', text.lower())
-    clean_text = re.sub(r'[^a-zA-Z0-9\s]', '', clean_text)
-    
-    # Common stop words to exclude
-    stop_words = {
-        'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by',
-        'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did',
-        'will', 'would', 'could', 'should', 'may', 'might', 'can', 'this', 'that', 'these', 'those',
-        'i', 'you', 'he', 'she', 'it', 'we', 'they', 'me', 'him', 'her', 'us', 'them', 'my', 'your',
-        'his', 'its', 'our', 'their', 'not', 'no', 'yes', 'if', 'when', 'where', 'why', 'how'
-    }
-    
+    clean_text = clean_keyword_text(text)
+
     # Extract words and count frequency
-    words = [word for word in clean_text.split() if len(word) > 3 and word not in stop_words]
+    words = (word for word in KEYWORD_PATTERN.findall(clean_text) if word not in KEYWORD_STOP_WORDS)
     word_freq = Counter(words)
     
     return [word for word, _ in word_freq.most_common(num_keywords)]
 
-def calculate_content_similarity(content1, content2):
-    """Calculate similarity between two content items"""
+# Keyword sets keyed by (content id, updated_at) so each revision is tokenized once
+KEYWORD_CACHE_SIZE = 4096
+_keyword_cache = {}
+
+def get_content_keywords(content):
+    """Return the keyword set for a content item, extracting it once per revision
+    
+    Uses the stored keywords column when present; rows not yet backfilled
+    are extracted on the fly.
+    """
+    cache_key = (content.id, content.updated_at)
+    keywords = _keyword_cache.get(cache_key)
+    if keywords is None:
+        keywords = Content.parse_keywords(getattr(content, 'keywords', None))
+        if keywords is None:
+            keywords = frozenset(extract_keywords(content.content))
+        if len(_keyword_cache) >= KEYWORD_CACHE_SIZE:
+            _keyword_cache.pop(next(iter(_keyword_cache)), None)
+        _keyword_cache[cache_key] = keywords
+    return keywords
+
+def get_similarity_features(content):
+    """Return the (category, sorted tags, author, content) tuple used for similarity scoring
+    
+    Accepts a Content object or a row with the same column names. Keywords
+    are looked up lazily from the content since scoring often doesn't need them.
+    """
+    return (
+        content.category,
+        tuple(sorted(set(Content.parse_tags(content.tags)))),
+        content.author,
+        content
+    )
+
+def _sorted_jaccard(items1, items2):
+    """Jaccard similarity of two sorted, duplicate-free sequences via a merge walk"""
+    i = j = shared = 0
+    len1, len2 = len(items1), len(items2)
+    while i < len1 and j < len2:
+        if items1[i] == items2[j]:
+            shared += 1
+            i += 1
+            j += 1
+        elif items1[i] < items2[j]:
+            i += 1
+        else:
+            j += 1
+    return shared / (len1 + len2 - shared)
+
+def calculate_content_similarity(features1, features2, threshold=0):
+    """Calculate similarity between two content items from their similarity features
+    
+    Keyword extraction is skipped when even a full keyword match couldn't
+    lift the score above ``threshold``.
+    """
+    category1, tags1, author1, content1 = features1
+    category2, tags2, author2, content2 = features2
     score = 0
     
     # Category match (high weight)
-    if content1.category == content2.category:
+    if category1 == category2:
         score += 0.4
     
     # Tag overlap (medium weight)
-    tags1 = set(content1.get_tags_list())
-    tags2 = set(content2.get_tags_list())
     if tags1 and tags2:
-        tag_overlap = len(tags1.intersection(tags2)) / len(tags1.union(tags2))
-        score += 0.3 * tag_overlap
+        score += 0.3 * _sorted_jaccard(tags1, tags2)
+    
+    # Author match (low weight)
+    if author1 == author2:
+        score += 0.1
+    
+    if score + 0.2 <= threshold:
+        return score
     
     # Content keyword similarity (medium weight)
-    keywords1 = set(extract_keywords(content1.content))
-    keywords2 = set(extract_keywords(content2.content))
+    keywords1 = get_content_keywords(content1)
+    keywords2 = get_content_keywords(content2)
     if keywords1 and keywords2:
-        keyword_overlap = len(keywords1.intersection(keywords2)) / len(keywords1.union(keywords2))
+        keyword_overlap = len(keywords1 & keywords2) / len(keywords1 | keywords2)
         score += 0.2 * keyword_overlap
     
+    return score
+
+# Vectorized similarity index over all published content. Rebuilt lazily when
+# the database-derived content version changes, so writes made by other
+# workers (or by COPY imports) are picked up too.
+_content_index = {'version': None, 'data': None}
+_content_index_lock = threading.Lock()
+
+@event.listens_for(Content, 'after_insert')
+@event.listens_for(Content, 'after_update')
+@event.listens_for(Content, 'after_delete')
+def _track_content_write(mapper, connection, target):
+    """Remember that the current session wrote content"""
+    session = object_session(target)
+    if session is not None:
+        session.info['content_written'] = True
+
+@event.listens_for(Content, 'before_insert')
+@event.listens_for(Content, 'before_update')
+def _store_content_keywords(mapper, connection, target):
+    """Keep content.keywords in step with the body so similarity scoring never re-extracts"""
+    if target.keywords is None or inspect(target).attrs.content.history.has_changes():
+        target.keywords = ','.join(extract_keywords(target.content or ''))
+
+KEYWORD_BACKFILL_BATCH_SIZE = 500
+
+def backfill_content_keywords():
+    """Fill content.keywords for rows written before it was maintained, returning the count"""
+    # updated_at is written back unchanged so the backfill doesn't look like an edit
+    statement = Content.__table__.update().where(
+        Content.__table__.c.id == bindparam('row_id')
+    ).values(keywords=bindparam('row_keywords'), updated_at=Content.__table__.c.updated_at)
+    updated = 0
+    while True:
+        rows = db.session.query(Content.id, Content.content).filter(
+            Content.keywords.is_(None)
+        ).limit(KEYWORD_BACKFILL_BATCH_SIZE).all()
+        if not rows:
+            return updated
+        db.session.execute(statement, [
+            {'row_id': content_id, 'row_keywords': ','.join(extract_keywords(body or ''))}
+            for content_id, body in rows
+        ])
+        db.session.commit()
+        updated += len(rows)
+
+@event.listens_for(Product, 'after_insert')
+@event.listens_for(Product, 'after_update')
+@event.listens_for(Product, 'after_delete')
+def _track_product_write(mapper, connection, target):
+    """Remember that the current session wrote products"""
+    session = object_session(target)
+    if session is not None:
+        session.info['products_written'] = True
+
+@event.listens_for(SessionBase, 'after_commit')
+def _invalidate_content_index(session):
+    """Mark the similarity index stale once content writes are committed"""
+    if session.info.pop('content_written', False):
+        _content_version['expires_at'] = 0
+        result_cache.incr(SEARCH_EPOCH_KEY)
+        result_cache.delete(HOMEPAGE_STATS_KEY)
+    if session.info.pop('products_written', False):
+        result_cache.delete(HOMEPAGE_STATS_KEY)
+        result_cache.delete(FEATURED_PRODUCTS_KEY)
+
+@event.listens_for(SessionBase, 'after_rollback')
+def _discard_content_writes(session):
+    session.info.pop('content_written', None)
+    session.info.pop('products_written', None)
+
+def _build_content_index():
+    """Build TF-IDF, tag, category and author features for all published content"""
+    # scipy/scikit-learn are imported on first use to keep worker start-up light
+    from scipy.sparse import csr_matrix
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    
+    # Plain column rows: only what scoring needs, no ORM hydration
+    contents = db.session.query(
+        Content.id, Content.category, Content.author, Content.tags, Content.content, Content.updated_at
+    ).filter(Content.status == 'Published').all()
+    num_rows = len(contents)
+    
+    categories = {}
+    authors = {}
+    tag_vocabulary = {}
+    tag_indices = []
+    tag_indptr = [0]
+    for content in contents:
+        for tag in set(Content.parse_tags(content.tags)):
+            tag_indices.append(tag_vocabulary.setdefault(tag, len(tag_vocabulary)))
+        tag_indptr.append(len(tag_indices))
+    
+    tag_matrix = csr_matrix(
+        (np.ones(len(tag_indices), dtype=np.float32), tag_indices, tag_indptr),
+        shape=(num_rows, len(tag_vocabulary))
+    )
+    
+    # TF-IDF over the same tokens extract_keywords() considers
+    vectorizer = TfidfVectorizer(
+        preprocessor=clean_keyword_text,
+        token_pattern=KEYWORD_PATTERN.pattern,
+        stop_words=sorted(KEYWORD_STOP_WORDS)
+    )
+    try:
+        tfidf_matrix = vectorizer.fit_transform([content.content for content in contents])
+    except ValueError:
+        # Empty corpus or no usable tokens
+        vectorizer, tfidf_matrix = None, None
+    
+    return {
+        'ids': np.fromiter((content.id for content in contents), dtype=np.int64, count=num_rows),
+        'row_by_id': {content.id: row for row, content in enumerate(contents)},
+        'revisions': [content.updated_at for content in contents],
+        'categories': categories,
+        'category_codes': np.fromiter(
+            (categories.setdefault(content.category, len(categories)) for content in contents),
+            dtype=np.int32, count=num_rows
+        ),
+        'authors': authors,
+        'author_codes': np.fromiter(
+            (authors.setdefault(content.author, len(authors)) for content in contents),
+            dtype=np.int32, count=num_rows
+        ),
+        'tag_vocabulary': tag_vocabulary,
+        'tag_matrix': tag_matrix,
+        'tag_counts': np.diff(tag_matrix.indptr),
+        'vectorizer': vectorizer,
+        'tfidf_matrix': tfidf_matrix
+    }
+
+def get_content_index():
+    """Return the cached similarity index, rebuilding it if content changed"""
+    # Callers that arrive during the very first build wait for it; later
+    # rebuilds keep serving the previous index until the new one is ready
+    version = get_content_version()
+    if _content_index['version'] != version or _content_index['data'] is None:
+        with _content_index_lock:
+            if _content_index['version'] != version or _content_index['data'] is None:
+                previous_version = _content_index['version']
+                _content_index['version'] = version
+                try:
+                    _content_index['data'] = _build_content_index()
+                except Exception:
+                    _content_index['version'] = previous_version
+                    raise
+    return _content_index['data']
+
+def score_content_similarity(index, content):
+    """Score every indexed item against one content item in a single vectorized pass"""
+    num_rows = len(index['ids'])
+    scores = np.zeros(num_rows)
+    if num_rows == 0:
+        return scores
+    
+    # Category match (high weight)
+    category_code = index['categories'].get(content.category)
+    if category_code is not None:
+        scores += 0.4 * (index['category_codes'] == category_code)
+    
+    # Tag overlap (medium weight): Jaccard via one sparse matrix-vector product
+    tags = set(content.get_tags_list())
+    tag_columns = [index['tag_vocabulary'][tag] for tag in tags if tag in index['tag_vocabulary']]
+    if tag_columns:
+        intersection = np.asarray(index['tag_matrix'][:, tag_columns].sum(axis=1)).ravel()
+        union = index['tag_counts'] + len(tags) - intersection
+        scores += 0.3 * np.divide(intersection, union, out=np.zeros(num_rows), where=union > 0)
+    
+    # Content keyword similarity (medium weight): TF-IDF cosine
+    if index['tfidf_matrix'] is not None:
+        row = index['row_by_id'].get(content.id)
+        if row is not None and index['revisions'][row] == content.updated_at:
+            target_vector = index['tfidf_matrix'][row]
+        else:
+            target_vector = index['vectorizer'].transform([content.content])
+        scores += 0.2 * (index['tfidf_matrix'] @ target_vector.T).toarray().ravel()
+    
     # Author match (low weight)
-    if content1.author == content2.author:
-        score += 0.1
+    author_code = index['authors'].get(content.author)
+    if author_code is not None:
+        scores += 0.1 * (index['author_codes'] == author_code)
     
-    return score
+    # Never recommend the item itself
+    row = index['row_by_id'].get(content.id)
+    if row is not None:
+        scores[row] = 0
+    
+    return scores
+
+# Content version (latest edit + row count) used in recommendation cache keys.
+# Re-read at most every CONTENT_VERSION_TTL seconds so other workers' edits show up.
+CONTENT_VERSION_TTL = 10
+RECOMMENDATION_CACHE_TTL = 300
+_content_version = {'expires_at': 0, 'value': None}
+
+def get_content_version():
+    """Return a token that changes whenever content is added, edited or removed"""
+    now = time.monotonic()
+    if _content_version['expires_at'] <= now:
+        latest_update, content_count = db.session.query(
+            func.max(Content.updated_at), func.count(Content.id)
+        ).one()
+        _content_version['value'] = f"{latest_update.isoformat() if latest_update else ''}:{content_count}"
+        _content_version['expires_at'] = now + CONTENT_VERSION_TTL
+    return _content_version['value']
+
+def _pack_recommendations(items):
+    """Replace Content objects with their ids so results can be cached"""
+    packed = []
+    for item in items:
+        if isinstance(item, Content):
+            packed.append((item.id, None))
+        else:
+            packed.append((item['content'].id, {key: value for key, value in item.items() if key != 'content'}))
+    return packed
+
+def _unpack_recommendations(packed):
+    """Re-fetch cached recommendation ids in one query, keeping their order"""
+    contents_by_id = {
+        content.id: content
+        for content in Content.query.filter(Content.id.in_([content_id for content_id, _ in packed])).all()
+    } if packed else {}
+    
+    items = []
+    for content_id, extras in packed:
+        content = contents_by_id.get(content_id)
+        if content is not None:
+            items.append(content if extras is None else dict(content=content, **extras))
+    return items
+
+def cache_recommendations(ttl=RECOMMENDATION_CACHE_TTL):
+    """Cache a recommendation function's (content id, score) output per content version"""
+    def decorator(func_to_cache):
+        @wraps(func_to_cache)
+        def wrapper(*args, **kwargs):
+            try:
+                cache_key = f"reco:{func_to_cache.__name__}:{args}:{sorted(kwargs.items())}:{get_content_version()}"
+                packed = result_cache.get(cache_key)
+                if packed is not None:
+                    return _unpack_recommendations(packed)
+            except Exception as e:
+                db.session.rollback()
+                app.logger.error(f"Error reading recommendation cache: {e}")
+                return func_to_cache(*args, **kwargs)
+            
+            items = func_to_cache(*args, **kwargs)
+            result_cache.set(cache_key, _pack_recommendations(items), ttl)
+            return items
+        return wrapper
+    return decorator
 
+@cache_recommendations()
 def get_content_recommendations(content_id, limit=5):
     """Get recommended content based on similarity to given content"""
     current_content = Content.query.get(content_id)
     if not current_content:
         return []
     
-    # Get all other published content
-    other_content = Content.query.filter(
-        Content.id != content_id,
-        Content.status == 'Published'
-    ).all()
+    try:
+        index = get_content_index()
+        scores = score_content_similarity(index, current_content)
+        
+        # Top-k selection without sorting the whole candidate set
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit)[:limit]]
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+        
+        ranked_ids = [int(item_id) for item_id in index['ids'][candidates]]
+        contents_by_id = {
+            content.id: content
+            for content in Content.query.filter(
+                Content.id.in_(ranked_ids),
+                Content.status == 'Published'
+            ).all()
+        }
+        
+        recommendations = []
+        for row, recommended_id in zip(candidates, ranked_ids):
+            if recommended_id in contents_by_id:
+                similarity = float(scores[row])
+                recommendations.append({
+                    'content': contents_by_id[recommended_id],
+                    'similarity': similarity,
+                    'score': similarity
+                })
+        return recommendations
+    except Exception as e:
+        app.logger.error(f"Error in vectorized content recommendations: {e}")
+        return get_pairwise_content_recommendations(current_content, limit)
+
+# Number of full-text matches reranked by the pairwise similarity fallback
+SIMILARITY_CANDIDATE_LIMIT = 50
+
+def get_pairwise_content_recommendations(current_content, limit=5):
+    """Score published content one pair at a time (fallback for the vectorized index)"""
+    if limit <= 0:
+        return []
     
-    # Calculate similarity scores
-    recommendations = []
-    for content in other_content:
-        similarity = calculate_content_similarity(current_content, content)
-        if similarity > 0:
-            recommendations.append({
-                'content': content,
+    # On PostgreSQL the whole ranking runs in SQL against the tag/keyword indexes
+    similar = DatabaseManager.find_similar_content(
+        current_content.id, current_content.category, current_content.author,
+        current_content.get_tags_list(), get_content_keywords(current_content), limit=limit
+    )
+    if similar is not None:
+        contents_by_id = {
+            content.id: content
+            for content in Content.query.filter(Content.id.in_([item_id for item_id, _ in similar])).all()
+        } if similar else {}
+        return [
+            {
+                'content': contents_by_id[item_id],
                 'similarity': similarity,
                 'score': similarity
-            })
+            }
+            for item_id, similarity in similar
+            if item_id in contents_by_id
+        ]
     
-    # Sort by similarity and return top recommendations
-    recommendations.sort(key=lambda x: x['similarity'], reverse=True)
-    return recommendations[:limit]
-
-def get_trending_content(limit=5):
-    """Get trending content based on recent creation and tags"""
-    # Get recently created content with the most common tags
-    recent_content = Content.query.filter(
-        Content.status == 'Published'
-    ).order_by(Content.created_at.desc()).limit(20).all()
+    # Let the full-text index shortlist candidates; scan everything only if it can't
+    other_content = DatabaseManager.find_similar_content_candidates(
+        current_content.id, sorted(get_content_keywords(current_content)),
+        limit=SIMILARITY_CANDIDATE_LIMIT
+    )
+    if not other_content:
+        # Only rows sharing a category, author, tag or keyword can score above
+        # zero. Substring matches over-select (tags and keywords are stored as
+        # comma-separated text), which is safe since every row is scored
+        # exactly below; rows whose keywords aren't stored yet are kept.
+        shared_terms = [
+            Content.tags.contains(tag, autoescape=True) for tag in current_content.get_tags_list()
+        ] + [
+            Content.keywords.contains(keyword, autoescape=True) for keyword in get_content_keywords(current_content)
+        ]
+        other_content = db.session.query(
+            Content.id, Content.category, Content.author, Content.tags, Content.content,
+            Content.keywords, Content.updated_at
+        ).filter(
+            Content.id != current_content.id,
+            Content.status == 'Published',
+            db.or_(
+                Content.category == current_content.category,
+                Content.author == current_content.author,
+                Content.keywords.is_(None),
+                *shared_terms
+            )
+        ).all()
     
-    # Count tag frequency
-    all_tags = []
-    for content in recent_content:
-        all_tags.extend(content.get_tags_list())
+    # Keep a min-heap of the best `limit` scores; its floor lets
+    # calculate_content_similarity() skip keyword work for hopeless candidates
+    current_features = get_similarity_features(current_content)
+    top_scores = []
+    for position, content in enumerate(other_content):
+        threshold = top_scores[0][0] if len(top_scores) >= limit else 0
+        similarity = calculate_content_similarity(
+            current_features, get_similarity_features(content), threshold
+        )
+        if similarity > threshold:
+            # Earlier rows win ties, matching a stable sort
+            entry = (similarity, -position, content.id)
+            if len(top_scores) < limit:
+                heapq.heappush(top_scores, entry)
+            else:
+                heapq.heapreplace(top_scores, entry)
     
-    popular_tags = [tag for tag, _ in Counter(all_tags).most_common(5)]
+    similarities = [(similarity, item_id) for similarity, _, item_id in sorted(top_scores, reverse=True)]
+    contents_by_id = {
+        content.id: content
+        for content in Content.query.filter(Content.id.in_([item_id for _, item_id in similarities])).all()
+    }
+    return [
+        {
+            'content': contents_by_id[item_id],
+            'similarity': similarity,
+            'score': similarity
+        }
+        for similarity, item_id in similarities
+        if item_id in contents_by_id
+    ]
+
+# Number of most recent published items considered for trending
+TRENDING_WINDOW = 20
+
+def rank_trending_content(recent_content, limit=5):
+    """Rank already-loaded recent content by how many popular tags it carries"""
+    # Parse each row's tags once and count tag frequency
+    rows_tags = [content.get_tags_list() for content in recent_content]
+    popular_tags = frozenset(tag for tag, _ in Counter(chain.from_iterable(rows_tags)).most_common(5))
     
     # Find content with popular tags
     trending = []
-    for content in recent_content:
-        content_tags = content.get_tags_list()
-        tag_score = sum(1 for tag in content_tags if tag in popular_tags)
+    for content, content_tags in zip(recent_content, rows_tags):
+        tag_score = len(popular_tags.intersection(content_tags))
         if tag_score > 0:
             trending.append({
                 'content': content,
                 'score': tag_score
             })
     
-    trending.sort(key=lambda x: x['score'], reverse=True)
-    return trending[:limit]
+    return heapq.nlargest(limit, trending, key=lambda x: x['score'])
+
+@cache_recommendations()
+def get_trending_content(limit=5):
+    """Get trending content based on recent creation and tags"""
+    # Get recently created content with the most common tags
+    recent_content = Content.query.filter(
+        Content.status == 'Published'
+    ).order_by(Content.created_at.desc()).limit(TRENDING_WINDOW).all()
+    
+    return rank_trending_content(recent_content, limit)
 
+@cache_recommendations()
 def get_category_recommendations(category, exclude_id=None, limit=5):
     """Get popular content from the same category"""
     try:
@@ -333,132 +919,434 @@ def get_category_recommendations(category, exclude_id=None, limit=5):
         app.logger.error(f"Error in get_category_recommendations: {e}")
         return []
 
+@cache_recommendations()
+def get_latest_published_content(limit=6):
+    """Most recently created published content, for the landing page preview"""
+    return Content.query.filter_by(status='Published').order_by(Content.created_at.desc()).limit(limit).all()
+
+# Homepage banner data shared by every visitor; dropped when content or
+# products are committed and otherwise refreshed every HOMEPAGE_CACHE_TTL seconds
+HOMEPAGE_CACHE_TTL = 60
+HOMEPAGE_STATS_KEY = 'homepage:stats'
+FEATURED_PRODUCTS_KEY = 'homepage:featured_products'
+FEATURED_PRODUCTS_LIMIT = 6
+
+def get_homepage_stats():
+    """Return the hero banner counts: active products, new arrivals this week, content"""
+    stats = result_cache.get(HOMEPAGE_STATS_KEY)
+    if stats is None:
+        week_ago = datetime.utcnow() - timedelta(days=7)
+        # One round trip: FILTER aggregates over products plus a scalar count of content
+        row = db.session.query(
+            func.count(Product.id).filter(Product.is_active == True).label('total_products'),
+            func.count(Product.id).filter(
+                Product.is_active == True,
+                Product.is_new_arrival == True,
+                Product.created_at >= week_ago
+            ).label('new_arrivals_count'),
+            db.session.query(func.count(Content.id)).scalar_subquery().label('total_content')
+        ).select_from(Product).one()
+        stats = row._asdict()
+        result_cache.set(HOMEPAGE_STATS_KEY, stats, HOMEPAGE_CACHE_TTL)
+    return stats
+
+def get_featured_products():
+    """Return the newest active products for the homepage banner"""
+    product_ids = result_cache.get(FEATURED_PRODUCTS_KEY)
+    if product_ids is None:
+        product_ids = [
+            product_id for product_id, in db.session.query(Product.id).filter_by(is_active=True).order_by(
+                Product.created_at.desc()
+            ).limit(FEATURED_PRODUCTS_LIMIT)
+        ]
+        result_cache.set(FEATURED_PRODUCTS_KEY, product_ids, HOMEPAGE_CACHE_TTL)
+    if not product_ids:
+        return []
+    
+    # Re-fetch by primary key; a product deactivated since caching is left out
+    products_by_id = {
+        product.id: product
+        for product in Product.query.filter(Product.id.in_(product_ids), Product.is_active == True).all()
+    }
+    return [products_by_id[product_id] for product_id in product_ids if product_id in products_by_id]
+
+# Per-user homepage recommendations, keyed by the logged-in user's id. The only
+# interactions written under that id are recommendation feedback, which drops
+# the entry; otherwise it is refreshed every HOMEPAGE_CACHE_TTL seconds
+HOMEPAGE_RECOMMENDATIONS_KEY = 'homepage:recommendations:{}'
+HOMEPAGE_RECOMMENDATIONS_LIMIT = 4
+
+def get_homepage_personalization(user_id):
+    """Return (hybrid recommendations, behavior analysis) for the homepage"""
+    cache_key = HOMEPAGE_RECOMMENDATIONS_KEY.format(user_id)
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        packed, user_preferences = cached
+        return _unpack_recommendations(packed), user_preferences
+    
+    recommendations = recommendation_engine.get_hybrid_recommendations(
+        user_id, num_recommendations=HOMEPAGE_RECOMMENDATIONS_LIMIT
+    )
+    user_preferences = recommendation_engine.analyze_user_behavior(user_id)
+    result_cache.set(cache_key, (_pack_recommendations(recommendations), user_preferences), HOMEPAGE_CACHE_TTL)
+    return recommendations, user_preferences
+
 def get_user_id():
-    """Get or create user ID for session tracking"""
-    if 'user_id' not in session:
-        session['user_id'] = str(uuid.uuid4())
-    return session['user_id']
+    """Get or create user ID for session tracking, resolved once per request"""
+    if 'user_id' not in g:
+        user_id = session.get('user_id')
+        if user_id is None:
+            # Only a brand-new visitor modifies the session cookie
+            user_id = session['user_id'] = str(uuid.uuid4())
+        g.user_id = user_id
+    return g.user_id
+
+# Interactions are queued and written in batches by a background thread so
+# page views don't wait on an INSERT + COMMIT. With Redis the queue is a
+# shared list any worker's flusher drains; otherwise it is in-process.
+INTERACTION_FLUSH_INTERVAL = 0.5
+INTERACTION_BATCH_SIZE = 500
+_interaction_queue = deque()
+_interaction_flusher = {'pid': None}
+_interaction_flusher_lock = threading.Lock()
+
+def _next_interaction_batch():
+    """Take up to INTERACTION_BATCH_SIZE queued rows, in-process ones first"""
+    batch = []
+    while _interaction_queue and len(batch) < INTERACTION_BATCH_SIZE:
+        batch.append(_interaction_queue.popleft())
+    if not batch:
+        batch = result_cache.pop_items(INTERACTION_QUEUE_KEY, INTERACTION_BATCH_SIZE)
+    return batch
+
+def _store_interactions(rows):
+    """Insert interaction rows and fold them into user_item_scores (caller commits)"""
+    db.session.execute(UserInteraction.__table__.insert(), rows)
+    UserItemScore.add_interactions(rows)
+
+def flush_user_interactions():
+    """Write queued interactions to the database, returning the number stored"""
+    stored = 0
+    while True:
+        batch = _next_interaction_batch()
+        if not batch:
+            break
+        try:
+            _store_interactions(batch)
+            db.session.commit()
+            stored_rows = batch
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error writing interaction batch, retrying rows individually: {e}")
+            # One invalid row shouldn't discard the rest of the batch
+            stored_rows = []
+            for row in batch:
+                try:
+                    _store_interactions([row])
+                    db.session.commit()
+                    stored_rows.append(row)
+                except Exception as e:
+                    db.session.rollback()
+                    logging.error(f"Error tracking interaction: {e}")
+        stored += len(stored_rows)
+        update_interaction_counters(stored_rows)
+    return stored
+
+# Analytics aggregates are kept as counters updated on each flush and
+# re-seeded from the database hourly (or after cleanup) to correct drift.
+# Without Redis the counters are per-process and miss other workers'
+# writes, so they are re-seeded every few seconds instead
+INTERACTION_COUNTERS_TTL = 3600
+INTERACTION_COUNTERS_LOCAL_TTL = 10
+
+def seed_interaction_counters():
+    """Rebuild the interaction counters from the user_interactions table"""
+    by_user = dict(db.session.query(
+        UserInteraction.user_id, func.count(UserInteraction.id)
+    ).group_by(UserInteraction.user_id).all())
+    by_content = dict(db.session.query(
+        UserInteraction.content_id, func.count(UserInteraction.id)
+    ).group_by(UserInteraction.content_id).all())
+    
+    result_cache.replace_counters(
+        counts={INTERACTION_TOTAL_KEY: sum(by_user.values())},
+        sets={INTERACTION_USERS_KEY: list(by_user)},
+        ranked={INTERACTION_BY_USER_KEY: by_user, INTERACTION_BY_CONTENT_KEY: by_content}
+    )
+    ttl = INTERACTION_COUNTERS_TTL if result_cache.redis_client is not None else INTERACTION_COUNTERS_LOCAL_TTL
+    result_cache.set(INTERACTION_COUNTERS_SEEDED_KEY, True, ttl)
+
+def ensure_interaction_counters():
+    """Seed the interaction counters if they are missing or due for a refresh"""
+    if result_cache.get(INTERACTION_COUNTERS_SEEDED_KEY) is None:
+        seed_interaction_counters()
+
+def update_interaction_counters(rows):
+    """Fold newly stored interactions into the counters"""
+    if not rows:
+        return
+    try:
+        # Until seeded, the next read rebuilds everything from the table anyway
+        if result_cache.get(INTERACTION_COUNTERS_SEEDED_KEY) is None:
+            return
+        result_cache.incr(INTERACTION_TOTAL_KEY, len(rows))
+        result_cache.add_members(INTERACTION_USERS_KEY, {row['user_id'] for row in rows})
+        result_cache.incr_members(INTERACTION_BY_USER_KEY, Counter(row['user_id'] for row in rows))
+        result_cache.incr_members(INTERACTION_BY_CONTENT_KEY, Counter(row['content_id'] for row in rows))
+    except Exception as e:
+        logging.error(f"Error updating interaction counters: {e}")
+
+def _flush_user_interactions_in_context():
+    with app.app_context():
+        flush_user_interactions()
+
+def _interaction_flush_loop():
+    while True:
+        time.sleep(INTERACTION_FLUSH_INTERVAL)
+        # The shared Redis queue may hold other workers' rows even when ours is empty
+        if _interaction_queue or result_cache.redis_client is not None:
+            try:
+                _flush_user_interactions_in_context()
+            except Exception as e:
+                logging.error(f"Error in interaction flush loop: {e}")
+
+def _ensure_interaction_flusher():
+    """Start the flush thread once per process (gunicorn workers fork after import)"""
+    if _interaction_flusher['pid'] == os.getpid():
+        return
+    with _interaction_flusher_lock:
+        if _interaction_flusher['pid'] != os.getpid():
+            threading.Thread(target=_interaction_flush_loop, name='interaction-flusher', daemon=True).start()
+            _interaction_flusher['pid'] = os.getpid()
 
-def track_user_interaction(content_id, interaction_type, score=1.0):
+atexit.register(_flush_user_interactions_in_context)
+
+def track_user_interaction(content_id, interaction_type, score=1.0, user_id=None):
     """Track user interaction for collaborative filtering"""
     try:
-        user_id = get_user_id()
-        interaction = UserInteraction(
-            user_id=user_id,
-            content_id=content_id,
-            interaction_type=interaction_type,
-            interaction_score=score
-        )
-        db.session.add(interaction)
-        db.session.commit()
+        row = {
+            'user_id': user_id or get_user_id(),
+            'content_id': content_id,
+            'interaction_type': interaction_type,
+            'interaction_score': score,
+            'timestamp': datetime.utcnow()
+        }
+        # Fall back to the in-process queue when Redis is unavailable
+        if not result_cache.push_items(INTERACTION_QUEUE_KEY, row):
+            _interaction_queue.append(row)
+        _ensure_interaction_flusher()
     except Exception as e:
         logging.error(f"Error tracking interaction: {e}")
-        db.session.rollback()
+
+# Sparse user-item matrix for collaborative filtering, reused until the
+# interaction window changes
+_user_item_cache = {'version': None, 'data': None}
+_user_item_cache_lock = threading.Lock()
+
+def _empty_user_item_data():
+    from scipy.sparse import csr_matrix
+    return {
+        'matrix': csr_matrix((0, 0), dtype=np.float32),
+        'normalized': csr_matrix((0, 0), dtype=np.float32),
+        'bits': None,
+        'row_counts': None,
+        'user_ids': [],
+        'item_ids': [],
+        'user_index': {},
+        'item_index': {}
+    }
 
 def build_user_item_matrix():
-    """Build user-item interaction matrix for collaborative filtering"""
+    """Build user-item interaction matrix for collaborative filtering
+    
+    Returns a dict holding the CSR ``matrix`` (users x items, summed
+    interaction scores), its L2 row-``normalized`` copy, packed ``bits`` when
+    every score is identical, the ``user_ids``/``item_ids`` lists mapping rows and
+    columns back to ids, and their inverse ``user_index``/``item_index`` dicts.
+    """
     try:
         # Get all interactions from the last 30 days
         cutoff_date = datetime.utcnow() - timedelta(days=30)
-        interactions = UserInteraction.query.filter(
-            UserInteraction.timestamp >= cutoff_date
-        ).all()
-        
-        # Build user-item matrix
-        user_item_matrix = defaultdict(dict)
-        users = set()
-        items = set()
-        
-        for interaction in interactions:
-            user_item_matrix[interaction.user_id][interaction.content_id] = interaction.interaction_score
-            users.add(interaction.user_id)
-            items.add(interaction.content_id)
         
-        return user_item_matrix, list(users), list(items)
+        # Read the per-day user_item_scores buckets, not raw interactions. The
+        # window starts at the cutoff day since buckets are whole days.
+        cutoff_day = cutoff_date.date()
+        
+        # Cheap version probe: reuse the cached matrix if nothing changed
+        interaction_count, latest_timestamp = db.session.query(
+            func.coalesce(func.sum(UserItemScore.interaction_count), 0),
+            func.max(UserItemScore.updated_at)
+        ).filter(UserItemScore.day >= cutoff_day).one()
+        version = (interaction_count, latest_timestamp, cutoff_day)
+        if _user_item_cache['version'] == version:
+            return _user_item_cache['data']
+        
+        with _user_item_cache_lock:
+            if _user_item_cache['version'] == version:
+                return _user_item_cache['data']
+            
+            from scipy.sparse import csr_matrix
+            from sklearn.preprocessing import normalize
+            
+            interactions = db.session.query(
+                UserItemScore.user_id,
+                UserItemScore.content_id,
+                UserItemScore.score
+            ).filter(
+                UserItemScore.day >= cutoff_day
+            ).yield_per(10000)
+            
+            # Factorize ids into contiguous row/column indices
+            user_index = {}
+            item_index = {}
+            user_rows = []
+            item_columns = []
+            scores = []
+            for user_id, content_id, score in interactions:
+                user_rows.append(user_index.setdefault(user_id, len(user_index)))
+                item_columns.append(item_index.setdefault(content_id, len(item_index)))
+                scores.append(score or 0.0)
+            
+            # Sum a pair's daily buckets: sort by (user, item), then
+            # reduce each run of equal pairs in one np.add.reduceat pass
+            num_users, num_items = len(user_index), len(item_index)
+            user_rows = np.asarray(user_rows, dtype=np.int64)
+            item_columns = np.asarray(item_columns, dtype=np.int64)
+            scores = np.asarray(scores, dtype=np.float32)
+            order = np.lexsort((item_columns, user_rows))
+            pair_keys = user_rows[order] * num_items + item_columns[order]
+            boundaries = np.flatnonzero(np.diff(pair_keys, prepend=-1))
+            summed_scores = np.add.reduceat(scores[order], boundaries) if len(boundaries) else scores
+            unique_rows = user_rows[order][boundaries]
+            indptr = np.zeros(num_users + 1, dtype=np.int32)
+            np.cumsum(np.bincount(unique_rows, minlength=num_users), out=indptr[1:])
+            matrix = csr_matrix(
+                (summed_scores, item_columns[order][boundaries].astype(np.int32), indptr),
+                shape=(num_users, num_items)
+            )
+            
+            # Uniform scores (e.g. view-only traffic) make cosine a pure set
+            # overlap, which packed bitsets answer with popcounts
+            bits = None
+            row_counts = None
+            is_binary = matrix.nnz > 0 and bool(np.all(matrix.data == matrix.data[0]))
+            if is_binary and matrix.shape[0] * ((matrix.shape[1] + 63) // 64) * 8 <= BITSET_MAX_BYTES:
+                bits = pack_rows(matrix)
+                row_counts = np.diff(matrix.indptr).astype(np.int64)
+            
+            data = {
+                'matrix': matrix,
+                'normalized': normalize(matrix, norm='l2', axis=1) if matrix.shape[0] else matrix,
+                'bits': bits,
+                'row_counts': row_counts,
+                'user_ids': list(user_index),
+                'item_ids': list(item_index),
+                'user_index': user_index,
+                'item_index': item_index
+            }
+            _user_item_cache['data'] = data
+            _user_item_cache['version'] = version
+            return data
     except Exception as e:
         db.session.rollback()
         app.logger.error(f"Error building user-item matrix: {e}")
-        return defaultdict(dict), [], []
+        return _empty_user_item_data()
 
-def calculate_user_similarity(user1_items, user2_items):
-    """Calculate cosine similarity between two users"""
-    # Find common items
-    common_items = set(user1_items.keys()) & set(user2_items.keys())
-    
-    if len(common_items) == 0:
-        return 0
-    
-    # Calculate cosine similarity
-    sum_squares1 = sum([user1_items[item] ** 2 for item in user1_items])
-    sum_squares2 = sum([user2_items[item] ** 2 for item in user2_items])
-    sum_products = sum([user1_items[item] * user2_items[item] for item in common_items])
+def get_published_content_map(content_ids):
+    """Map ids to published Content, reusing objects already in the session
     
-    denominator = (sum_squares1 * sum_squares2) ** 0.5
-    if denominator == 0:
-        return 0
+    Only ids missing from the session's identity map are fetched, in one query.
+    """
+    content_map = {}
+    missing = []
+    for content_id in content_ids:
+        content = db.session.identity_map.get(db.session.identity_key(Content, content_id))
+        if content is None:
+            missing.append(content_id)
+        elif content.status == 'Published':
+            content_map[content_id] = content
+    if missing:
+        content_map.update(
+            (content.id, content)
+            for content in Content.query.filter(Content.id.in_(missing), Content.status == 'Published').all()
+        )
+    return content_map
+
+def calculate_user_similarities(user_item_data, target_row):
+    """Calculate cosine similarity between one user and every user
     
-    return sum_products / denominator
+    Returns a dense array indexed like ``user_ids``; the target user's own
+    entry is zeroed.
+    """
+    if user_item_data['bits'] is not None:
+        similarities = bitset_cosine_similarities(
+            user_item_data['bits'], user_item_data['row_counts'], target_row
+        )
+    else:
+        normalized = user_item_data['normalized']
+        similarities = (normalized @ normalized[target_row].T).toarray().ravel()
+    similarities[target_row] = 0
+    return similarities
+
+def calculate_user_similarity(user_item_data, row1, row2):
+    """Calculate cosine similarity between two users"""
+    normalized = user_item_data['normalized']
+    return float(normalized[row1].multiply(normalized[row2]).sum())
 
 def get_collaborative_filtering_recommendations(target_user_id, limit=5):
     """Get recommendations using collaborative filtering"""
     try:
-        user_item_matrix, users, items = build_user_item_matrix()
+        user_item_data = build_user_item_matrix()
         
-        if target_user_id not in user_item_matrix:
+        target_row = user_item_data['user_index'].get(target_user_id)
+        if target_row is None:
             return []
         
-        target_user_items = user_item_matrix[target_user_id]
-        user_similarities = {}
-        
-        # Calculate similarity with other users
-        for user_id in users:
-            if user_id != target_user_id:
-                similarity = calculate_user_similarity(target_user_items, user_item_matrix[user_id])
-                if similarity > 0:
-                    user_similarities[user_id] = similarity
-        
-        # Get recommendations based on similar users
-        recommendations = defaultdict(float)
-        total_similarity = sum(user_similarities.values())
+        # Calculate similarity with other users in one sparse product
+        similarities = calculate_user_similarities(user_item_data, target_row)
+        similarities[similarities < 0] = 0
+        total_similarity = similarities.sum()
         
         if total_similarity == 0:
             return []
         
-        for user_id, similarity in user_similarities.items():
-            weight = similarity / total_similarity
-            for item_id, rating in user_item_matrix[user_id].items():
-                if item_id not in target_user_items:  # Don't recommend already interacted items
-                    recommendations[item_id] += weight * rating
+        # Similarity-weighted item scores: (weights @ M) as a single sparse product
+        matrix = user_item_data['matrix']
+        scores = np.asarray(matrix.T @ (similarities / total_similarity)).ravel()
         
-        # Sort and get top recommendations
-        sorted_recommendations = sorted(recommendations.items(), key=lambda x: x[1], reverse=True)
-        content_ids = [item_id for item_id, score in sorted_recommendations[:limit]]
+        # Don't recommend already interacted items
+        start, end = matrix.indptr[target_row], matrix.indptr[target_row + 1]
+        scores[matrix.indices[start:end]] = 0
         
-        # Fetch content objects
-        recommended_content = Content.query.filter(
-            Content.id.in_(content_ids),
-            Content.status == 'Published'
-        ).all()
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+        
+        item_ids = user_item_data['item_ids']
+        ranked = [(item_ids[column], float(scores[column])) for column in candidates]
+        
+        # Fetch content objects, walking the ranking rather than re-sorting
+        content_map = get_published_content_map([content_id for content_id, _ in ranked])
         
         # Return with scores
-        result = []
-        for content in recommended_content:
-            score = next((score for item_id, score in sorted_recommendations if item_id == content.id), 0)
-            result.append({
-                'content': content,
+        return [
+            {
+                'content': content_map[content_id],
                 'cf_score': round(score, 3)
-            })
-        
-        return result
+            }
+            for content_id, score in ranked
+            if content_id in content_map
+        ]
         
     except Exception as e:
         logging.error(f"Error in collaborative filtering: {e}")
         return []
 
-def get_hybrid_recommendations(content_id, limit=5):
+def get_hybrid_recommendations(content_id, limit=5, user_id=None):
     """Get hybrid recommendations combining content-based and collaborative filtering"""
     try:
-        user_id = get_user_id()
+        user_id = user_id or get_user_id()
         
         # Get content-based recommendations (existing function)
         content_based = get_content_recommendations(content_id, limit=limit//2 + 1)
@@ -491,19 +1379,70 @@ def get_hybrid_recommendations(content_id, limit=5):
                     'hybrid_score': rec['cf_score'] * 0.4
                 }
         
-        # Sort by hybrid score
-        sorted_recommendations = sorted(
-            all_recommendations.values(),
-            key=lambda x: x['hybrid_score'],
-            reverse=True
-        )
-        
-        return sorted_recommendations[:limit]
+        # Top recommendations by hybrid score
+        return heapq.nlargest(limit, all_recommendations.values(), key=lambda x: x['hybrid_score'])
         
     except Exception as e:
         logging.error(f"Error in hybrid recommendations: {e}")
         return get_content_recommendations(content_id, limit)
 
+# Hybrid recommendations are per (content, visitor); view_content serves them
+# from the cache and computes misses on a small background pool, which
+# /recommendations/<id> then waits on rather than computing them again
+CONTENT_RECOMMENDATION_LIMIT = 4
+RECOMMENDATION_WAIT_TIMEOUT = 10
+_recommendation_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='recommendations')
+_pending_recommendations = {}
+_pending_recommendations_lock = threading.Lock()
+
+def _hybrid_cache_key(content_id, user_id):
+    return f"reco:hybrid:{content_id}:{user_id}:{CONTENT_RECOMMENDATION_LIMIT}:{get_content_version()}"
+
+def get_cached_hybrid_recommendations(content_id, user_id):
+    """Return cached hybrid recommendations, or None if they haven't been computed"""
+    try:
+        packed = result_cache.get(_hybrid_cache_key(content_id, user_id))
+        return _unpack_recommendations(packed) if packed is not None else None
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error reading cached hybrid recommendations: {e}")
+        return None
+
+def store_hybrid_recommendations(content_id, user_id, recommendations):
+    """Cache hybrid recommendations for a content item and visitor"""
+    try:
+        result_cache.set(
+            _hybrid_cache_key(content_id, user_id),
+            _pack_recommendations(recommendations),
+            RECOMMENDATION_CACHE_TTL
+        )
+    except Exception as e:
+        app.logger.error(f"Error caching hybrid recommendations: {e}")
+
+def _compute_hybrid_recommendations(content_id, user_id):
+    try:
+        with app.app_context():
+            recommendations = get_hybrid_recommendations(
+                content_id, limit=CONTENT_RECOMMENDATION_LIMIT, user_id=user_id
+            )
+            store_hybrid_recommendations(content_id, user_id, recommendations)
+    except Exception as e:
+        logging.error(f"Error computing hybrid recommendations in background: {e}")
+    finally:
+        with _pending_recommendations_lock:
+            _pending_recommendations.pop((content_id, user_id), None)
+
+def schedule_hybrid_recommendations(content_id, user_id):
+    """Compute hybrid recommendations off the request path, returning the (possibly already pending) job's future"""
+    job = (content_id, user_id)
+    with _pending_recommendations_lock:
+        future = _pending_recommendations.get(job)
+        if future is None:
+            future = _pending_recommendations[job] = _recommendation_executor.submit(
+                _compute_hybrid_recommendations, *job
+            )
+    return future
+
 # Content categories
 CONTENT_CATEGORIES = [
     'Blog Post',
@@ -536,7 +1475,7 @@ def index():
     # If user is not authenticated, show landing page with stories
     if not current_user.is_authenticated:
         # Get some public content for preview
-        public_content = Content.query.filter_by(status='Published').order_by(Content.created_at.desc()).limit(6).all()
+        public_content = get_latest_published_content(limit=6)
         return render_template('landing.html', 
                              public_content=[c.to_dict() for c in public_content],
                              stories=stories)
@@ -557,10 +1496,12 @@ def index():
     if status_filter:
         query = query.filter(Content.status == status_filter)
     if search_query:
+        # lower(...) LIKE matches the idx_content_*_trgm trigram indexes; ILIKE wouldn't
+        pattern = f'%{search_query}%'
         query = query.filter(
             db.or_(
-                Content.title.ilike(f'%{search_query}%'),
-                Content.content.ilike(f'%{search_query}%')
+                func.lower(Content.title).like(pattern),
+                func.lower(Content.content).like(pattern)
             )
         )
     
@@ -571,51 +1512,34 @@ def index():
     user_preferences = {}
     if current_user.is_authenticated:
         try:
-            recommendations = recommendation_engine.get_hybrid_recommendations(current_user.id, num_recommendations=4)
-            user_preferences = recommendation_engine.analyze_user_behavior(current_user.id)
+            recommendations, user_preferences = get_homepage_personalization(current_user.id)
         except Exception as e:
             app.logger.error(f'Error getting recommendations for homepage: {e}')
     
     # Get featured products for the banner
     featured_products = []
-    total_products = 0
-    new_arrivals_count = 0
-    try:
-        from models import Product
-        # Get featured products (recent, highly rated, or new arrivals)
-        featured_products = Product.query.filter_by(is_active=True).order_by(
-            Product.created_at.desc()
-        ).limit(6).all()
-        
-        # Get product statistics
-        total_products = Product.query.filter_by(is_active=True).count()
-        new_arrivals_count = Product.query.filter(
-            Product.is_new_arrival == True,
-            Product.is_active == True
-        ).count()
+    try:
+        featured_products = get_featured_products()
     except Exception as e:
         app.logger.error(f'Error getting featured products: {e}')
     
-    # Convert to dictionary format for template compatibility
-    filtered_content = {content.id: content.to_dict() for content in content_list}
-    
-    # Get trending content for sidebar
-    trending = get_trending_content(limit=5)
+    # Get trending content for sidebar. Unfiltered, the list above already
+    # holds every published item, so rank those instead of querying again.
+    if not category_filter and not search_query and status_filter in ('', 'Published'):
+        recent_published = heapq.nlargest(
+            TRENDING_WINDOW,
+            (content for content in content_list if content.status == 'Published'),
+            key=lambda content: content.created_at
+        )
+        trending = rank_trending_content(recent_published, limit=5)
+    else:
+        trending = get_trending_content(limit=5)
     
     # Get statistics for hero banner
-    total_products = Product.query.filter(Product.is_active == True).count()
-    total_content = Content.query.count()
-    
-    # Get new arrivals count for this week
-    week_ago = datetime.utcnow() - timedelta(days=7)
-    new_arrivals_count = Product.query.filter(
-        Product.is_active == True,
-        Product.is_new_arrival == True,
-        Product.created_at >= week_ago
-    ).count()
+    stats = get_homepage_stats()
     
     return render_template('index.html', 
-                         content_store=filtered_content,
+                         content_store=content_list,
                          categories=CONTENT_CATEGORIES,
                          statuses=CONTENT_STATUS,
                          current_category=category_filter,
@@ -626,9 +1550,9 @@ def index():
                          recommendations=recommendations,
                          user_preferences=user_preferences,
                          featured_products=featured_products,
-                         total_products=total_products,
-                         total_content=total_content,
-                         new_arrivals_count=new_arrivals_count)
+                         total_products=stats['total_products'],
+                         total_content=stats['total_content'],
+                         new_arrivals_count=stats['new_arrivals_count'])
 
 @app.route('/create', methods=['GET', 'POST'])
 @require_login
@@ -665,12 +1589,12 @@ def create_content():
         )
         new_content.set_tags_list(tags_list)
         
+        uploaded_files = []
         try:
             db.session.add(new_content)
-            db.session.commit()
+            db.session.flush()
             
-            # Handle additional file uploads
-            uploaded_files = []
+            # Handle additional file uploads; content and files commit together
             if 'files' in request.files:
                 files = request.files.getlist('files')
                 for file in files:
@@ -678,13 +1602,16 @@ def create_content():
                         file_record = save_uploaded_file(
                             file, 
                             current_user.id if current_user.is_authenticated else 'anonymous',
-                            new_content.id
+                            new_content.id,
+                            commit=False
                         )
                         if file_record:
                             uploaded_files.append(file_record)
                         else:
                             flash(f'Failed to upload file: {file.filename}', 'warning')
             
+            db.session.commit()
+            
             # Track user interaction for collaborative filtering
             track_user_interaction(new_content.id, 'create', score=2.0)
             
@@ -695,6 +1622,7 @@ def create_content():
             return redirect(url_for('view_content', content_id=new_content.id))
         except Exception as e:
             db.session.rollback()
+            discard_uploaded_files(uploaded_files)
             flash('Error creating content. Please try again.', 'error')
             app.logger.error(f'Error creating content: {e}')
     
@@ -707,12 +1635,17 @@ def view_content(content_id):
     """View single content item with recommendations"""
     try:
         content = Content.query.get_or_404(content_id)
+        user_id = get_user_id()
         
         # Track user interaction
-        track_user_interaction(content_id, 'view', score=1.0)
-        
-        # Get hybrid recommendations (combines content-based and collaborative filtering)
-        recommendations = get_hybrid_recommendations(content_id, limit=4)
+        track_user_interaction(content_id, 'view', score=1.0, user_id=user_id)
+        
+        # Hybrid recommendations are computed in the background; until they are
+        # cached the page loads them from /recommendations/<id>
+        recommendations = get_cached_hybrid_recommendations(content_id, user_id)
+        if recommendations is None:
+            schedule_hybrid_recommendations(content_id, user_id)
+            recommendations = []
         category_suggestions = get_category_recommendations(content.category, exclude_id=content_id, limit=3)
         
         return render_template('view_content.html', 
@@ -779,7 +1712,8 @@ def edit_content(content_id):
                     file_record = save_uploaded_file(
                         file, 
                         current_user.id if current_user.is_authenticated else 'anonymous',
-                        content_id
+                        content_id,
+                        commit=False
                     )
                     if file_record:
                         uploaded_files.append(file_record)
@@ -799,6 +1733,7 @@ def edit_content(content_id):
             return redirect(url_for('view_content', content_id=content_id))
         except Exception as e:
             db.session.rollback()
+            discard_uploaded_files(uploaded_files)
             flash('Error updating content. Please try again.', 'error')
             app.logger.error(f'Error updating content: {e}')
     
@@ -863,26 +1798,51 @@ def update_content_status(content_id):
         app.logger.error(f'Error updating content status: {e}')
         abort(500)
 
+# Stored files are never rewritten under the same name (uploads are named by
+# their digest, product images randomly), so browsers may keep them for a year.
+# Behind nginx, USE_X_SENDFILE / X-Accel-Redirect lets the proxy send the bytes.
+STORED_FILE_MAX_AGE = 365 * 24 * 60 * 60
+
+def send_stored_file(folder, filename, **kwargs):
+    """send_from_directory with a strong filename ETag and a long-lived, immutable Cache-Control
+    
+    Text-like files are sent from their precompressed copy when the client
+    accepts its encoding and the copy exists.
+    """
+    compressible = filename.rpartition('.')[2].lower() in PRECOMPRESSED_EXTENSIONS
+    response = None
+    if compressible:
+        for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+            if request.accept_encodings[encoding] and os.path.isfile(safe_join(folder, filename + suffix) or ''):
+                response = send_from_directory(
+                    folder, filename + suffix,
+                    mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+                    etag=filename + suffix, max_age=STORED_FILE_MAX_AGE, **kwargs
+                )
+                response.content_encoding = encoding
+                break
+    if response is None:
+        response = send_from_directory(folder, filename, etag=filename, max_age=STORED_FILE_MAX_AGE, **kwargs)
+    if compressible:
+        response.vary.add('Accept-Encoding')
+    response.cache_control.immutable = True
+    return response
+
 @app.route('/uploads/<filename>')
 def uploaded_file(filename):
     """Serve uploaded images"""
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    return send_stored_file(app.config['UPLOAD_FOLDER'], filename)
 
 @app.route('/files/<filename>')
 def serve_file(filename):
     """Serve uploaded files (documents, videos, audio, archives)"""
-    return send_from_directory(app.config['FILES_FOLDER'], filename)
+    return send_stored_file(app.config['FILES_FOLDER'], filename)
 
 @app.route('/file/<int:file_id>')
 def download_file(file_id):
     """Download file by ID with proper headers"""
     file_record = File.query.get_or_404(file_id)
-    
-    # Determine storage location based on file type
-    if file_record.file_type == 'image':
-        storage_folder = app.config['UPLOAD_FOLDER']
-    else:
-        storage_folder = app.config['FILES_FOLDER']
+    storage_folder = get_storage_folder(file_record.file_type)
     
     file_path = os.path.join(storage_folder, file_record.filename)
     
@@ -893,11 +1853,14 @@ def download_file(file_id):
     # Track download interaction
     track_user_interaction(file_record.content_id, 'download', score=0.5)
     
+    # Downloads revalidate every time so each one is still tracked; repeats
+    # get a 304 against the stored filename's ETag
     return send_from_directory(
         storage_folder, 
         file_record.filename,
         as_attachment=True,
-        download_name=file_record.original_filename
+        download_name=file_record.original_filename,
+        etag=file_record.filename
     )
 
 @app.route('/content/<int:content_id>/files')
@@ -915,29 +1878,38 @@ def content_files(content_id):
 @require_login
 def file_manager():
     """File management dashboard for logged-in users"""
-    # Get all files for current user
-    user_files = File.query.filter_by(user_id=current_user.id).order_by(File.created_at.desc()).all()
-    
-    # Group files by type
-    files_by_type = {
-        'image': [],
-        'document': [],
-        'video': [],
-        'audio': [],
-        'archive': [],
-        'other': []
+    # Per-type counts and sizes come from one grouped query; only the
+    # selected type's files are loaded, a page at a time
+    type_summary = {
+        file_type: {'count': 0, 'size': 0}
+        for file_type in ('image', 'document', 'video', 'audio', 'archive', 'other')
     }
+    summary_rows = db.session.query(
+        File.file_type, func.count(File.id), func.coalesce(func.sum(File.file_size), 0)
+    ).filter(File.user_id == current_user.id).group_by(File.file_type).all()
+    for file_type, count, size in summary_rows:
+        stats = type_summary.setdefault(file_type, {'count': 0, 'size': 0})
+        stats['count'] = count
+        stats['size'] = int(size)
     
-    for file in user_files:
-        files_by_type[file.file_type].append(file)
+    available_types = [file_type for file_type, stats in type_summary.items() if stats['count']]
+    selected_type = request.args.get('type')
+    if selected_type not in available_types:
+        selected_type = available_types[0] if available_types else None
     
-    # Calculate total storage used
-    total_size = sum(file.file_size for file in user_files)
+    files = None
+    if selected_type:
+        page = request.args.get('page', 1, type=int)
+        files = File.query.filter_by(user_id=current_user.id, file_type=selected_type)\
+                          .order_by(File.created_at.desc())\
+                          .paginate(page=page, per_page=FILE_MANAGER_PAGE_SIZE, error_out=False)
     
     return render_template('file_manager.html', 
-                         files_by_type=files_by_type, 
-                         total_files=len(user_files),
-                         total_size=total_size)
+                         type_summary=type_summary,
+                         selected_type=selected_type,
+                         files=files,
+                         total_files=sum(stats['count'] for stats in type_summary.values()),
+                         total_size=sum(stats['size'] for stats in type_summary.values()))
 
 @app.route('/file/<int:file_id>/delete', methods=['POST'])
 @require_login
@@ -952,14 +1924,7 @@ def delete_file(file_id):
     
     try:
         # Delete physical file
-        if file_record.file_type == 'image':
-            storage_folder = app.config['UPLOAD_FOLDER']
-        else:
-            storage_folder = app.config['FILES_FOLDER']
-        
-        file_path = os.path.join(storage_folder, file_record.filename)
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        remove_stored_upload(file_record.file_type, file_record.filename)
         
         # Delete database record
         db.session.delete(file_record)
@@ -988,22 +1953,53 @@ def bulk_upload():
         
         uploaded_files = []
         failed_files = []
+        created_files = []
+        
+        # Disk writes release the GIL, so files are streamed in parallel.
+        # Bulk uploads are not associated with specific content.
+        user_id = current_user.id
+        valid_files = [file for file in files if file and file.filename != '']
+        results = _upload_executor.map(lambda file: store_upload(file, user_id, content_id=None), valid_files)
+        for file, stored in zip(valid_files, results):
+            if stored is None:
+                failed_files.append(file.filename)
+                continue
+            values, created = stored
+            uploaded_files.append(values)
+            if created:
+                created_files.append(values)
         
-        for file in files:
-            if file and file.filename != '':
-                file_record = save_uploaded_file(
-                    file, 
-                    current_user.id,
-                    content_id=None  # Bulk uploads are not associated with specific content
+        try:
+            # Re-uploads of files already on record (or repeated within the
+            # batch) keep their existing row; the rest go in one multi-row INSERT
+            filenames = {values['filename'] for values in uploaded_files}
+            recorded = {
+                filename for filename, in db.session.query(File.filename).filter(
+                    File.filename.in_(filenames),
+                    File.user_id == current_user.id,
+                    File.content_id.is_(None)
                 )
-                if file_record:
-                    uploaded_files.append(file_record)
-                else:
-                    failed_files.append(file.filename)
+            } if filenames else set()
+            new_rows = []
+            for values in uploaded_files:
+                if values['filename'] not in recorded:
+                    recorded.add(values['filename'])
+                    new_rows.append(values)
+            
+            if new_rows:
+                db.session.execute(File.__table__.insert(), new_rows)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            for values in created_files:
+                remove_stored_upload(values['file_type'], values['filename'])
+            app.logger.error(f'Error saving bulk upload: {e}')
+            failed_files = [file.filename for file in files if file and file.filename != '']
+            uploaded_files = []
         
         # Create success message
         if uploaded_files:
-            total_size = sum(file.file_size for file in uploaded_files)
+            total_size = sum(values['file_size'] for values in uploaded_files)
             size_str = format_file_size(total_size)
             flash(f'Successfully uploaded {len(uploaded_files)} files ({size_str})', 'success')
         
@@ -1014,16 +2010,18 @@ def bulk_upload():
     
     return render_template('bulk_upload.html')
 
+# (divisor, format) per 2**10 step, indexed by the size's bit length
+_FILE_SIZE_UNITS = (
+    (1, "{} B"),
+    (1024, "{:.1f} KB"),
+    (1024**2, "{:.1f} MB"),
+    (1024**3, "{:.1f} GB"),
+)
+
 def format_file_size(bytes_size):
     """Helper function to format file size"""
-    if bytes_size < 1024:
-        return f"{bytes_size} B"
-    elif bytes_size < 1024*1024:
-        return f"{bytes_size/1024:.1f} KB"
-    elif bytes_size < 1024*1024*1024:
-        return f"{bytes_size/(1024*1024):.1f} MB"
-    else:
-        return f"{bytes_size/(1024*1024*1024):.1f} GB"
+    divisor, fmt = _FILE_SIZE_UNITS[min((max(int(bytes_size), 1).bit_length() - 1) // 10, 3)]
+    return fmt.format(bytes_size / divisor if divisor > 1 else bytes_size)
 
 @app.context_processor
 def inject_translation_functions():
@@ -1034,27 +2032,32 @@ def inject_translation_functions():
         current_language=session.get('language', 'en')
     )
 
+# Shared classifier for the gallery's automatic user type classification
+_user_type_classifier = UserTypeClassifier()
+GALLERY_USER_TYPE_UPDATE = Content.__table__.update().where(
+    Content.__table__.c.id == bindparam('row_id')
+).values(user_type=bindparam('row_user_type'), updated_at=Content.__table__.c.updated_at)
+
 @app.route('/gallery')
 def image_gallery():
     """Display all images in a gallery view with user type filtering"""
     content_with_images = Content.query.filter(Content.image != None).order_by(Content.created_at.desc()).all()
     
-    # Initialize classifier for automatic classification
-    classifier = UserTypeClassifier()
-    
     images = []
+    user_type_updates = []
     for content in content_with_images:
+        user_type = content.user_type
         # Auto-classify if not already classified
-        if not content.user_type or content.user_type == 'mixed':
+        if not user_type or user_type == 'mixed':
             tags_list = content.get_tags_list() if hasattr(content, 'get_tags_list') else []
-            user_type = classifier.classify_content(
+            user_type = _user_type_classifier.classify_content(
                 content.title,
                 content.content,
                 content.category,
                 tags_list
             )
-            content.user_type = user_type
-            db.session.add(content)
+            if user_type != content.user_type:
+                user_type_updates.append({'row_id': content.id, 'row_user_type': user_type})
         
         images.append({
             'filename': content.image,
@@ -1062,10 +2065,18 @@ def image_gallery():
             'content_id': content.id,
             'created_at': content.created_at,
             'author': content.author,
-            'user_type': content.user_type or 'mixed'
+            'user_type': user_type or 'mixed'
         })
     
-    db.session.commit()
+    if user_type_updates:
+        # One executemany UPDATE for the newly classified rows; updated_at is
+        # written back unchanged since classification isn't an edit
+        try:
+            db.session.execute(GALLERY_USER_TYPE_UPDATE, user_type_updates)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error saving gallery classifications: {e}")
     return render_template('gallery.html', images=images)
 
 @app.route('/trending')
@@ -1080,32 +2091,42 @@ def cf_analytics():
     try:
         user_id = get_user_id()
         
-        # Get user interaction statistics
-        total_interactions = UserInteraction.query.count()
-        unique_users = UserInteraction.query.with_entities(UserInteraction.user_id).distinct().count()
-        user_interactions = UserInteraction.query.filter_by(user_id=user_id).count()
+        # Get user interaction statistics from the maintained counters
+        ensure_interaction_counters()
+        total_interactions = result_cache.get_count(INTERACTION_TOTAL_KEY) or 0
+        unique_users = result_cache.set_size(INTERACTION_USERS_KEY)
+        user_interactions = result_cache.member_count(INTERACTION_BY_USER_KEY, user_id)
         
-        # Get recent interactions
-        recent_interactions = UserInteraction.query.order_by(
+        # Get recent interactions (the template shows each one's content title)
+        recent_interactions = UserInteraction.query.options(
+            db.joinedload(UserInteraction.content)
+        ).order_by(
             UserInteraction.timestamp.desc()
         ).limit(10).all()
         
         # Get most popular content
-        popular_content = db.session.query(
-            Content.id, Content.title, func.count(UserInteraction.id).label('interaction_count')
-        ).join(UserInteraction).group_by(Content.id, Content.title).order_by(
-            func.count(UserInteraction.id).desc()
-        ).limit(5).all()
+        top_content = [
+            (int(content_id), count)
+            for content_id, count in result_cache.top_members(INTERACTION_BY_CONTENT_KEY, 5)
+        ]
+        titles = dict(db.session.query(Content.id, Content.title).filter(
+            Content.id.in_([content_id for content_id, _ in top_content])
+        ).all()) if top_content else {}
+        popular_content = [
+            {'id': content_id, 'title': titles[content_id], 'interaction_count': count}
+            for content_id, count in top_content
+            if content_id in titles
+        ]
         
         # Get user similarity data (if enough data exists)
         similar_users = []
         try:
-            user_item_matrix, users, items = build_user_item_matrix()
-            if user_id in user_item_matrix and len(users) > 1:
-                target_user_items = user_item_matrix[user_id]
-                for other_user in users[:5]:  # Check top 5 users
-                    if other_user != user_id:
-                        similarity = calculate_user_similarity(target_user_items, user_item_matrix[other_user])
+            user_item_data = build_user_item_matrix()
+            target_row = user_item_data['user_index'].get(user_id)
+            if target_row is not None and len(user_item_data['user_ids']) > 1:
+                for row, other_user in enumerate(user_item_data['user_ids'][:5]):  # Check top 5 users
+                    if row != target_row:
+                        similarity = calculate_user_similarity(user_item_data, target_row, row)
                         if similarity > 0:
                             similar_users.append({
                                 'user_id': other_user[:8] + '...',  # Truncate for privacy
@@ -1138,7 +2159,19 @@ def cf_visual():
 @app.route('/recommendations/<int:content_id>')
 def content_recommendations(content_id):
     """API endpoint for getting content recommendations"""
-    recommendations = get_hybrid_recommendations(content_id, limit=6)
+    user_id = get_user_id()
+    recommendations = get_cached_hybrid_recommendations(content_id, user_id)
+    if recommendations is None:
+        # Wait for the job view_content scheduled (or start one), and only
+        # compute inline if it fails or doesn't finish in time
+        try:
+            schedule_hybrid_recommendations(content_id, user_id).result(timeout=RECOMMENDATION_WAIT_TIMEOUT)
+        except Exception as e:
+            app.logger.error(f"Error waiting for hybrid recommendations: {e}")
+        recommendations = get_cached_hybrid_recommendations(content_id, user_id)
+    if recommendations is None:
+        recommendations = get_hybrid_recommendations(content_id, limit=CONTENT_RECOMMENDATION_LIMIT, user_id=user_id)
+        store_hybrid_recommendations(content_id, user_id, recommendations)
     return {
         'recommendations': [
             {
@@ -1159,16 +2192,8 @@ def content_recommendations(content_id):
 def database_admin():
     """Database administration dashboard"""
     try:
-        # Get health status
-        connection_ok, connection_msg = DatabaseHealthChecker.check_connection()
-        integrity_ok, integrity_issues = DatabaseHealthChecker.check_table_integrity()
-        
-        health_status = {
-            'connection': connection_ok,
-            'integrity': integrity_ok,
-            'connection_msg': connection_msg,
-            'integrity_issues': integrity_issues
-        }
+        # Get health status (shared with the /admin/db/health poll)
+        health_status = DatabaseHealthChecker.get_health_status()
         
         # Get database statistics
         stats = DatabaseManager.get_database_statistics()
@@ -1206,17 +2231,127 @@ def create_database_backup():
         logging.error(f"Database backup error: {e}")
         return {'success': False, 'error': str(e)}
 
+@app.route('/admin/db/backup/incremental', methods=['POST'])
+def create_incremental_backup():
+    """Export interactions added since ?since= (ISO timestamp; default last 24 hours)"""
+    try:
+        since_arg = request.args.get('since')
+        since = datetime.fromisoformat(since_arg) if since_arg else datetime.utcnow() - timedelta(days=1)
+        filename = f"interactions_{since.strftime('%Y%m%d_%H%M%S')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.copy"
+        with open(os.path.join(BACKUP_DIR, filename), 'wb') as out_stream:
+            success, result = DatabaseManager.incremental_backup(since, out_stream)
+        return {'success': success, 'filename': filename if success else None,
+                'rows': result if success else 0, 'error': result if not success else None}
+    except Exception as e:
+        logging.error(f"Incremental backup error: {e}")
+        return {'success': False, 'error': str(e)}
+
 @app.route('/admin/db/update-search', methods=['POST'])
 def update_search_vectors():
-    """Update full-text search vectors"""
+    """Migrate full-text search to the expression index and refresh the search view"""
     try:
-        DatabaseManager.create_full_text_search_triggers()
-        success = DatabaseManager.update_all_search_vectors()
+        success = DatabaseManager.migrate_search_vector_to_expression_index()
+        if success and DatabaseManager.search_view_exists():
+            success = DatabaseManager.refresh_search_view()
         return {'success': success}
     except Exception as e:
         logging.error(f"Search vector update error: {e}")
         return {'success': False, 'error': str(e)}
 
+@app.route('/admin/db/backfill-keywords', methods=['POST'])
+def backfill_keywords():
+    """Compute stored keywords for content written before the column was maintained"""
+    try:
+        updated = backfill_content_keywords()
+        return {'success': True, 'updated': updated}
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Keyword backfill error: {e}")
+        return {'success': False, 'error': str(e)}
+
+@app.route('/admin/db/search-view', methods=['POST'])
+def create_search_view():
+    """Create the published content search view"""
+    try:
+        success = DatabaseManager.create_search_view()
+        return {'success': success}
+    except Exception as e:
+        logging.error(f"Search view creation error: {e}")
+        return {'success': False, 'error': str(e)}
+
+@app.route('/admin/db/search-view/refresh', methods=['POST'])
+def refresh_search_view():
+    """Refresh the published content search view (intended for a scheduled job)"""
+    try:
+        success = DatabaseManager.refresh_search_view()
+        return {'success': success}
+    except Exception as e:
+        logging.error(f"Search view refresh error: {e}")
+        return {'success': False, 'error': str(e)}
+
+@app.route('/admin/db/stats-views', methods=['POST'])
+def create_stats_views():
+    """Create the aggregated statistics views"""
+    try:
+        success = DatabaseManager.create_stats_views()
+        return {'success': success}
+    except Exception as e:
+        logging.error(f"Statistics view creation error: {e}")
+        return {'success': False, 'error': str(e)}
+
+@app.route('/admin/db/stats-views/refresh', methods=['POST'])
+def refresh_stats_views():
+    """Refresh the aggregated statistics views (intended for a scheduled job)"""
+    try:
+        success = DatabaseManager.refresh_stats_views()
+        return {'success': success}
+    except Exception as e:
+        logging.error(f"Statistics view refresh error: {e}")
+        return {'success': False, 'error': str(e)}
+
+@app.route('/admin/db/analytics-views', methods=['POST'])
+def create_analytics_views():
+    """Create the trending tag and popular content views"""
+    try:
+        success = DatabaseManager.create_analytics_views()
+        return {'success': success}
+    except Exception as e:
+        logging.error(f"Analytics view creation error: {e}")
+        return {'success': False, 'error': str(e)}
+
+@app.route('/admin/db/analytics-views/refresh', methods=['POST'])
+def refresh_analytics_views():
+    """Refresh the trending tag and popular content views (intended for a scheduled job)"""
+    try:
+        success = DatabaseManager.refresh_analytics_views()
+        return {'success': success}
+    except Exception as e:
+        logging.error(f"Analytics view refresh error: {e}")
+        return {'success': False, 'error': str(e)}
+
+@app.route('/admin/db/import-content', methods=['POST'])
+@require_login
+@require_admin
+def import_content():
+    """Bulk-load content from an uploaded CSV (title, content, category, status, author, tags)"""
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return {'success': False, 'error': 'No CSV file provided'}
+    try:
+        success, result = DatabaseManager.copy_bulk_load_content(
+            upload.stream, current_user.id, keywords_for=extract_keywords
+        )
+        if success:
+            # COPY bypasses the ORM, so the session events never see these
+            # rows; re-read the content version now rather than after its TTL
+            _content_version['expires_at'] = 0
+            if DatabaseManager.search_view_exists():
+                DatabaseManager.refresh_search_view()
+        return {'success': success, 'loaded': result if success else 0, 'error': result if not success else None}
+    except Exception as e:
+        logging.error(f"Content import error: {e}")
+        return {'success': False, 'error': str(e)}
+
 @app.route('/admin/db/create-indexes', methods=['POST'])
 def create_database_indexes():
     """Create additional database indexes"""
@@ -1227,6 +2362,26 @@ def create_database_indexes():
         logging.error(f"Index creation error: {e}")
         return {'success': False, 'error': str(e)}
 
+@app.route('/admin/db/partition-interactions', methods=['POST'])
+def partition_user_interactions():
+    """Convert user interactions to monthly partitions"""
+    try:
+        success = DatabaseManager.partition_user_interactions()
+        return {'success': success}
+    except Exception as e:
+        logging.error(f"Interaction partitioning error: {e}")
+        return {'success': False, 'error': str(e)}
+
+@app.route('/admin/db/interaction-partitions', methods=['POST'])
+def ensure_interaction_partitions():
+    """Pre-create upcoming interaction partitions (intended for a scheduled job)"""
+    try:
+        success = DatabaseManager.ensure_interaction_partitions()
+        return {'success': success}
+    except Exception as e:
+        logging.error(f"Interaction partition creation error: {e}")
+        return {'success': False, 'error': str(e)}
+
 @app.route('/admin/db/cleanup', methods=['POST'])
 def cleanup_old_data():
     """Clean up old user interactions"""
@@ -1237,18 +2392,27 @@ def cleanup_old_data():
         logging.error(f"Data cleanup error: {e}")
         return {'success': False, 'error': str(e)}
 
+@app.route('/admin/db/rebuild-user-item-scores', methods=['POST'])
+def rebuild_user_item_scores():
+    """Recompute the collaborative filtering aggregates from raw interactions"""
+    try:
+        success = DatabaseManager.rebuild_user_item_scores()
+        return {'success': success}
+    except Exception as e:
+        logging.error(f"User item score rebuild error: {e}")
+        return {'success': False, 'error': str(e)}
+
 @app.route('/admin/db/health')
 def database_health():
     """Get database health status"""
     try:
-        connection_ok, connection_msg = DatabaseHealthChecker.check_connection()
-        integrity_ok, integrity_issues = DatabaseHealthChecker.check_table_integrity()
+        health_status = DatabaseHealthChecker.get_health_status()
         
         return {
-            'connection': connection_ok,
-            'integrity': integrity_ok,
-            'connection_msg': connection_msg,
-            'issues': integrity_issues if not integrity_ok else []
+            'connection': health_status['connection'],
+            'integrity': health_status['integrity'],
+            'connection_msg': health_status['connection_msg'],
+            'issues': health_status['integrity_issues'] if not health_status['integrity'] else []
         }
     except Exception as e:
         logging.error(f"Health check error: {e}")
@@ -1257,28 +2421,20 @@ def database_health():
 @app.route('/admin/db/search')
 def full_text_search():
     """Full-text search endpoint"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return {'results': []}
+    
     try:
-        query = request.args.get('q', '').strip()
-        if not query:
-            return {'results': []}
-        
         results = DatabaseManager.full_text_search(query)
-        formatted_results = []
-        
-        for row in results:
-            formatted_results.append({
-                'id': row.id,
-                'title': row.title,
-                'content': row.content,
-                'category': row.category,
-                'author': row.author,
-                'rank': float(row.rank)
-            })
-        
-        return {'results': formatted_results}
+        if not results:
+            # Partial words ("jac") never match a stemmed tsquery; try trigrams
+            results = DatabaseManager.fuzzy_search(query)
     except Exception as e:
         logging.error(f"Full-text search error: {e}")
         return {'results': [], 'error': str(e)}
+    
+    return {'results': [dict(row, rank=float(row['rank'])) for row in results]}
 
 @app.route('/personalized-recommendations')
 @require_login
@@ -1333,9 +2489,12 @@ def recommendation_feedback():
         if not content_id or not action:
             return {'error': 'Missing content_id or action'}, 400
         
-        recommendation_engine.track_recommendation_feedback(
+        created = recommendation_engine.track_recommendation_feedback(
             current_user.id, content_id, action
         )
+        if created:
+            update_interaction_counters([created])
+        result_cache.delete(HOMEPAGE_RECOMMENDATIONS_KEY.format(current_user.id))
         
         return {'status': 'success'}
         
@@ -1348,43 +2507,39 @@ def recommendation_feedback():
 def trading_view():
     """Trading-style analytics dashboard for content performance"""
     try:
-        # Get content statistics
-        total_content = Content.query.count()
-        
-        # Calculate total views from user interactions
-        total_views = db.session.query(db.func.count(UserInteraction.id))\
-            .filter(UserInteraction.interaction_type == 'view').scalar() or 0
-        
-        # Get active users (users who interacted in last 30 days)
+        # Content count, total views, active users (interacted in the last
+        # 30 days) and total interactions in one round trip
         thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        active_users = db.session.query(db.func.count(db.distinct(UserInteraction.user_id)))\
-            .filter(UserInteraction.timestamp >= thirty_days_ago).scalar() or 0
+        total_content, total_views, active_users, total_interactions = db.session.query(
+            db.session.query(func.count(Content.id)).scalar_subquery(),
+            func.count(UserInteraction.id).filter(UserInteraction.interaction_type == 'view'),
+            func.count(db.distinct(UserInteraction.user_id)).filter(UserInteraction.timestamp >= thirty_days_ago),
+            func.count(UserInteraction.id)
+        ).select_from(UserInteraction).one()
         
         # Calculate engagement rate
-        total_interactions = UserInteraction.query.count()
         engagement_rate = round((total_interactions / max(total_content, 1)) * 100, 1)
         
-        # Get top performing content (by interaction count)
-        top_content = db.session.query(
-            Content,
-            db.func.count(UserInteraction.id).label('view_count')
-        ).outerjoin(UserInteraction)\
-         .group_by(Content.id)\
-         .order_by(db.desc('view_count'))\
-         .limit(10).all()
+        # Get top performing content (by interaction count), precomputed in
+        # mv_popular_content when the analytics views exist
+        popular = DatabaseManager.get_popular_content_ids(limit=10)
+        if popular is not None:
+            contents_by_id = {
+                content.id: content
+                for content in Content.query.filter(Content.id.in_([content_id for content_id, _ in popular])).all()
+            } if popular else {}
+            top_content = [contents_by_id[content_id] for content_id, _ in popular if content_id in contents_by_id]
+        else:
+            top_content = [content for content, _ in db.session.query(
+                Content,
+                db.func.count(UserInteraction.id).label('view_count')
+            ).outerjoin(UserInteraction)\
+             .group_by(Content.id)\
+             .order_by(db.desc('view_count'))\
+             .limit(10).all()]
         
         # Get trending tags
-        trending_tags_data = db.session.query(
-            db.func.unnest(db.func.string_to_array(Content.tags, ',')).label('tag'),
-            db.func.count().label('count')
-        ).filter(Content.tags.isnot(None))\
-         .filter(Content.tags != '')\
-         .group_by('tag')\
-         .order_by(db.desc('count'))\
-         .limit(10).all()
-        
-        trending_tags = [{'name': tag.strip(), 'count': count} 
-                        for tag, count in trending_tags_data if tag and tag.strip()]
+        trending_tags = DatabaseManager.get_trending_tags(limit=10)
         
         # Get recent activities
         recent_activities = db.session.query(
@@ -1421,7 +2576,7 @@ def trading_view():
                              total_views=total_views,
                              active_users=active_users,
                              engagement_rate=engagement_rate,
-                             top_content=[content for content, _ in top_content],
+                             top_content=top_content,
                              trending_tags=trending_tags,
                              recent_activities=formatted_activities,
                              current_user=current_user)
@@ -1437,7 +2592,6 @@ def trading_view():
 def get_content_relevance_score(content_id):
     """Get AI-powered relevance score for a specific content item"""
     try:
-        analyzer = ContentRelevanceAnalyzer()
         content = Content.query.get_or_404(content_id)
         content_data = {
             'title': content.title,
@@ -1445,7 +2599,7 @@ def get_content_relevance_score(content_id):
             'category': content.category,
             'tags': content.get_tags_list()
         }
-        result = analyzer.analyze_content_relevance(content_data)
+        result = relevance_analyzer.analyze_content_relevance(content_data)
         return result
     except Exception as e:
         app.logger.error(f"Error getting relevance score: {e}")
@@ -1461,23 +2615,17 @@ def get_batch_relevance_scores():
         if not content_ids:
             return {'error': 'No content IDs provided'}, 400
         
-        analyzer = ContentRelevanceAnalyzer()
-        results = {}
-        for content_id in content_ids[:10]:  # Limit to 10 items
-            try:
-                content = Content.query.get(content_id)
-                if content:
-                    content_data = {
-                        'title': content.title,
-                        'content': content.content,
-                        'category': content.category,
-                        'tags': content.get_tags_list()
-                    }
-                    analysis = analyzer.analyze_content_relevance(content_data)
-                    results[content_id] = analysis
-            except Exception as e:
-                app.logger.error(f"Error analyzing content {content_id}: {e}")
-                continue
+        contents = Content.query.filter(Content.id.in_(content_ids[:10])).all()  # Limit to 10 items
+        analyses = relevance_analyzer.analyze_contents_relevance([
+            {
+                'title': content.title,
+                'content': content.content,
+                'category': content.category,
+                'tags': content.get_tags_list()
+            }
+            for content in contents
+        ])
+        results = dict(zip((content.id for content in contents), analyses))
         return {'results': results}
     except Exception as e:
         app.logger.error(f"Error in batch relevance scoring: {e}")
@@ -1494,8 +2642,7 @@ def detailed_ai_analysis(content_id):
         if content.user_id != current_user.id and content.status != 'Published':
             abort(403)
         
-        analyzer = ContentRelevanceAnalyzer()
-        analysis = analyzer.analyze_content_relevance(content.to_dict())
+        analysis = relevance_analyzer.analyze_content_relevance(content.to_dict())
         
         return render_template('ai_analysis.html', 
                              content=content.to_dict(),
@@ -1511,38 +2658,34 @@ def detailed_ai_analysis(content_id):
 def ai_content_insights():
     """Dashboard showing AI insights for user's content"""
     try:
-        # Get user's content
-        user_content = Content.query.filter_by(user_id=current_user.id).all()
+        # Get the user's 20 most recent items and their total count in one query
+        rows = db.session.query(Content, func.count(Content.id).over()).filter(
+            Content.user_id == current_user.id
+        ).order_by(Content.created_at.desc()).limit(20).all()
         
-        if not user_content:
+        if not rows:
             return render_template('ai_insights.html', 
                                  content_analyses=[], 
                                  summary_stats={})
         
         # Analyze user's content
-        content_ids = [c.id for c in user_content[:20]]  # Limit to 20 most recent
-        analyzer = ContentRelevanceAnalyzer()
-        analyses = {}
-        for content_id in content_ids:
-            try:
-                content = Content.query.get(content_id)
-                if content:
-                    content_data = {
-                        'title': content.title,
-                        'content': content.content,
-                        'category': content.category,
-                        'tags': content.get_tags_list()
-                    }
-                    analysis = analyzer.analyze_content_relevance(content_data)
-                    analyses[content_id] = analysis
-            except Exception as e:
-                app.logger.error(f"Error analyzing content {content_id}: {e}")
-                continue
+        recent_content = [content for content, _ in rows]
+        total_content = rows[0][1]
+        content_analyses_list = relevance_analyzer.analyze_contents_relevance([
+            {
+                'title': content.title,
+                'content': content.content,
+                'category': content.category,
+                'tags': content.get_tags_list()
+            }
+            for content in recent_content
+        ])
+        analyses = dict(zip((content.id for content in recent_content), content_analyses_list))
         
         # Calculate summary statistics
         scores = [analysis['overall_score'] for analysis in analyses.values() if 'overall_score' in analysis]
         summary_stats = {
-            'total_content': len(user_content),
+            'total_content': total_content,
             'analyzed_content': len(scores),
             'average_score': round(sum(scores) / len(scores), 1) if scores else 0,
             'excellent_content': len([s for s in scores if s >= 8]),
@@ -1551,7 +2694,7 @@ def ai_content_insights():
         
         # Combine content with analyses
         content_analyses = []
-        for content in user_content[:20]:
+        for content in recent_content:
             analysis = analyses.get(content.id, {})
             content_analyses.append({
                 'content': content.to_dict(),
@@ -1722,9 +2865,6 @@ def create_product():
                 
                 if allowed_file(image_file.filename):
                     try:
-                        # Ensure upload directory exists
-                        os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-                        
                         # Generate unique filename
                         filename = str(uuid.uuid4()) + '_' + secure_filename(image_file.filename)
                         file_path = os.path.join(UPLOAD_FOLDER, filename)
@@ -1860,9 +3000,6 @@ def edit_product(product_id):
                 
                 if allowed_file(image_file.filename):
                     try:
-                        # Ensure upload directory exists
-                        os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-                        
                         # Generate unique filename
                         filename = str(uuid.uuid4()) + '_' + secure_filename(image_file.filename)
                         file_path = os.path.join(UPLOAD_FOLDER, filename)
@@ -3176,17 +4313,35 @@ def api_new_arrivals_stats():
         return jsonify({'success': False, 'error': str(e)})
 
 
+# Error pages as seen by anonymous visitors (mostly bots and scanners), rendered
+# once per status and language. The pages otherwise depend on the logged-in
+# user, pending flashes and the CSRF token, so those requests render normally.
+_anonymous_error_pages = {}
+
+def render_error_page(status, template, **context):
+    """Render an error page, reusing the cached anonymous rendering when possible"""
+    if current_user.is_authenticated or '_flashes' in session:
+        return render_template(template, **context), status
+    
+    cache_key = (status, session.get('language', 'en'))
+    body = _anonymous_error_pages.get(cache_key)
+    if body is None:
+        # A blank CSRF meta tag keeps one visitor's token out of the shared copy
+        body = render_template(template, csrf_token=lambda: '', **context)
+        _anonymous_error_pages[cache_key] = body
+    return Response(body, status=status, mimetype='text/html')
+
 @app.errorhandler(403)
 def forbidden_error(error):
     """Handle 403 errors"""
-    return render_template('403.html'), 403
+    return render_error_page(403, '403.html')
 
 @app.errorhandler(404)
 def not_found_error(error):
     """Handle 404 errors"""
-    return render_template('base.html', 
-                         error_message="Content not found",
-                         error_description="The content you're looking for doesn't exist."), 404
+    return render_error_page(404, 'base.html',
+                             error_message="Content not found",
+                             error_description="The content you're looking for doesn't exist.")
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,245 @@
+"""
+Shared result cache: Redis when REDIS_URL is configured, in-process otherwise
+"""
+import os
+import time
+import pickle
+import logging
+import threading
+from collections import Counter
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+LOCAL_CACHE_SIZE = 1024
+
+# Interaction aggregates maintained on write (see app.flush_user_interactions)
+INTERACTION_TOTAL_KEY = 'counter:interactions:total'
+INTERACTION_USERS_KEY = 'counter:users'
+INTERACTION_BY_USER_KEY = 'counter:interactions:by_user'
+INTERACTION_BY_CONTENT_KEY = 'counter:interactions:by_content'
+INTERACTION_COUNTERS_SEEDED_KEY = 'counter:interactions:seeded'
+
+# Pending interaction rows shared by all workers (see app.track_user_interaction)
+INTERACTION_QUEUE_KEY = 'queue:interactions'
+
+# Bumped whenever searchable content changes; part of every search cache key
+SEARCH_EPOCH_KEY = 'counter:search:epoch'
+
+class ResultCache:
+    """Small TTL cache for computed results shared across workers via Redis"""
+
+    def __init__(self, redis_url=None, local_size=LOCAL_CACHE_SIZE):
+        self.redis_client = None
+        if redis_url and redis is not None:
+            try:
+                self.redis_client = redis.Redis.from_url(redis_url)
+            except Exception as e:
+                logging.error(f"Error connecting to Redis, using in-process cache: {e}")
+        elif redis_url:
+            logging.warning("REDIS_URL is set but the redis package is not installed; using in-process cache")
+
+        self.local_size = local_size
+        self._local = {}
+        self._local_counters = {}
+        self._local_sets = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        if self.redis_client is not None:
+            try:
+                payload = self.redis_client.get(key)
+                return pickle.loads(payload) if payload is not None else None
+            except Exception as e:
+                logging.error(f"Redis get failed for {key}: {e}")
+
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._local.pop(key, None)
+            return None
+        return value
+
+    def set(self, key, value, ttl=300):
+        """Store value under key for ttl seconds"""
+        if self.redis_client is not None:
+            try:
+                self.redis_client.set(key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), ex=ttl)
+                return
+            except Exception as e:
+                logging.error(f"Redis set failed for {key}: {e}")
+
+        with self._lock:
+            if key not in self._local and len(self._local) >= self.local_size:
+                self._local.pop(next(iter(self._local)), None)
+            self._local[key] = (time.monotonic() + ttl, value)
+
+    def delete(self, key):
+        """Drop key from the cache"""
+        if self.redis_client is not None:
+            try:
+                self.redis_client.delete(key)
+            except Exception as e:
+                logging.error(f"Redis delete failed for {key}: {e}")
+        self._local.pop(key, None)
+
+    def incr(self, key, amount=1):
+        """Add amount to an integer counter (INCRBY)"""
+        if self.redis_client is not None:
+            try:
+                self.redis_client.incrby(key, amount)
+                return
+            except Exception as e:
+                logging.error(f"Redis incr failed for {key}: {e}")
+        with self._lock:
+            counter = self._local_counters.setdefault(key, Counter())
+            counter[None] += amount
+
+    def get_count(self, key):
+        """Return an integer counter's value, or None if it doesn't exist"""
+        if self.redis_client is not None:
+            try:
+                value = self.redis_client.get(key)
+                return int(value) if value is not None else None
+            except Exception as e:
+                logging.error(f"Redis get failed for {key}: {e}")
+        counter = self._local_counters.get(key)
+        return counter[None] if counter is not None else None
+
+    def incr_members(self, key, amounts):
+        """Add per-member amounts to a ranked counter (ZINCRBY)"""
+        if not amounts:
+            return
+        if self.redis_client is not None:
+            try:
+                pipeline = self.redis_client.pipeline(transaction=False)
+                for member, amount in amounts.items():
+                    pipeline.zincrby(key, amount, member)
+                pipeline.execute()
+                return
+            except Exception as e:
+                logging.error(f"Redis zincrby failed for {key}: {e}")
+        with self._lock:
+            self._local_counters.setdefault(key, Counter()).update(amounts)
+
+    def member_count(self, key, member):
+        """Return one member's score in a ranked counter (ZSCORE)"""
+        if self.redis_client is not None:
+            try:
+                score = self.redis_client.zscore(key, member)
+                return int(score) if score is not None else 0
+            except Exception as e:
+                logging.error(f"Redis zscore failed for {key}: {e}")
+        counter = self._local_counters.get(key)
+        return counter[member] if counter is not None else 0
+
+    def top_members(self, key, limit):
+        """Return the highest-scoring (member, score) pairs (ZREVRANGE)"""
+        if self.redis_client is not None:
+            try:
+                return [
+                    (member.decode() if isinstance(member, bytes) else member, int(score))
+                    for member, score in self.redis_client.zrevrange(key, 0, limit - 1, withscores=True)
+                ]
+            except Exception as e:
+                logging.error(f"Redis zrevrange failed for {key}: {e}")
+        counter = self._local_counters.get(key)
+        return counter.most_common(limit) if counter is not None else []
+
+    def add_members(self, key, members):
+        """Add members to a set (SADD)"""
+        if not members:
+            return
+        if self.redis_client is not None:
+            try:
+                self.redis_client.sadd(key, *members)
+                return
+            except Exception as e:
+                logging.error(f"Redis sadd failed for {key}: {e}")
+        with self._lock:
+            self._local_sets.setdefault(key, set()).update(members)
+
+    def set_size(self, key):
+        """Return the number of members in a set (SCARD)"""
+        if self.redis_client is not None:
+            try:
+                return self.redis_client.scard(key)
+            except Exception as e:
+                logging.error(f"Redis scard failed for {key}: {e}")
+        return len(self._local_sets.get(key, ()))
+
+    def replace_counters(self, counts=None, sets=None, ranked=None):
+        """Atomically replace counters, sets and ranked counters with new values"""
+        counts = counts or {}
+        sets = sets or {}
+        ranked = ranked or {}
+        keys = list(counts) + list(sets) + list(ranked)
+        if self.redis_client is not None:
+            try:
+                pipeline = self.redis_client.pipeline(transaction=True)
+                pipeline.delete(*keys)
+                for key, value in counts.items():
+                    pipeline.set(key, value)
+                for key, members in sets.items():
+                    if members:
+                        pipeline.sadd(key, *members)
+                for key, amounts in ranked.items():
+                    if amounts:
+                        pipeline.zadd(key, amounts)
+                pipeline.execute()
+                return
+            except Exception as e:
+                logging.error(f"Redis counter replace failed: {e}")
+        with self._lock:
+            for key, value in counts.items():
+                self._local_counters[key] = Counter({None: value})
+            for key, members in sets.items():
+                self._local_sets[key] = set(members)
+            for key, amounts in ranked.items():
+                self._local_counters[key] = Counter(amounts)
+
+    def push_items(self, key, *items):
+        """Append items to a shared Redis list (RPUSH); False when Redis isn't available"""
+        if self.redis_client is None or not items:
+            return False
+        try:
+            self.redis_client.rpush(key, *(pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL) for item in items))
+            return True
+        except Exception as e:
+            logging.error(f"Redis rpush failed for {key}: {e}")
+            return False
+
+    def pop_items(self, key, count):
+        """Atomically remove and return up to count items from the front of a Redis list"""
+        if self.redis_client is None:
+            return []
+        try:
+            pipeline = self.redis_client.pipeline(transaction=True)
+            pipeline.lrange(key, 0, count - 1)
+            pipeline.ltrim(key, count, -1)
+            payloads, _ = pipeline.execute()
+            return [pickle.loads(payload) for payload in payloads]
+        except Exception as e:
+            logging.error(f"Redis list pop failed for {key}: {e}")
+            return []
+
+    def delete_counters(self, *keys):
+        """Drop counters, ranked counters and sets"""
+        if self.redis_client is not None:
+            try:
+                self.redis_client.delete(*keys)
+            except Exception as e:
+                logging.error(f"Redis delete failed for {keys}: {e}")
+        with self._lock:
+            for key in keys:
+                self._local_counters.pop(key, None)
+                self._local_sets.pop(key, None)
+                self._local.pop(key, None)
+
+# Global cache instance
+result_cache = ResultCache(os.environ.get('REDIS_URL'))
@@ -2,99 +2,433 @@
 Database utilities for advanced PostgreSQL operations
 """
 import os
+import re
 import logging
 from datetime import datetime, timedelta
 from flask import current_app
-from models import db, Content, UserInteraction
-from sqlalchemy import text, func
+from models import db, Content, UserInteraction, UserItemScore, CONTENT_SEARCH_VECTOR, CONTENT_TAGS_ARRAY, CONTENT_KEYWORDS_ARRAY
+from cache_utils import result_cache, INTERACTION_COUNTERS_SEEDED_KEY, SEARCH_EPOCH_KEY
+from sqlalchemy import text, func, bindparam, inspect
 import subprocess
+import tempfile
 import json
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+try:
+    import boto3
+except ImportError:
+    boto3 = None
+
+# Backups stream to BACKUP_S3_BUCKET when set (and boto3 is installed), else
+# are dumped in parallel under BACKUP_DIR
+BACKUP_DIR = os.environ.get('BACKUP_DIR', '/tmp')
+BACKUP_JOBS = int(os.environ.get('BACKUP_JOBS', os.cpu_count() or 4))
+
+# Built once so SQLAlchemy's compiled cache is hit on every search. The
+# tsvector expression matches idx_content_fts so the planner can use it.
+FULL_TEXT_SEARCH_QUERY = text(f"""
+    SELECT id, title, content, category, author,
+           ts_rank({CONTENT_SEARCH_VECTOR}, plainto_tsquery('english', :query)) as rank
+    FROM content
+    WHERE {CONTENT_SEARCH_VECTOR} @@ plainto_tsquery('english', :query)
+      AND status = 'Published'
+    ORDER BY rank DESC, created_at DESC
+    LIMIT :limit
+""").bindparams(bindparam('query'), bindparam('limit'))
+
+# Same search against the published_content_search materialized view, whose
+# rows are already restricted to published content
+SEARCH_VIEW_QUERY = text("""
+    SELECT id, title, content, category, author,
+           ts_rank(search_vector, plainto_tsquery('english', :query)) as rank
+    FROM published_content_search
+    WHERE search_vector @@ plainto_tsquery('english', :query)
+    ORDER BY rank DESC, created_at DESC
+    LIMIT :limit
+""").bindparams(bindparam('query'), bindparam('limit'))
+
+# Trigram match for partial and misspelled words. % and <% are the operators
+# the gin_trgm_ops indexes on lower(title) / lower(content) can answer.
+FUZZY_SEARCH_QUERY = text("""
+    SELECT id, title, content, category, author,
+           similarity(lower(title), :query) as rank
+    FROM content
+    WHERE (lower(title) % :query OR :query <% lower(content))
+      AND status = 'Published'
+    ORDER BY rank DESC, created_at DESC
+    LIMIT :limit
+""").bindparams(bindparam('query'), bindparam('limit'))
+
+# Independent queries behind get_database_statistics, keyed by result name
+DATABASE_STATISTICS_QUERIES = {
+    'table_sizes': text("""
+        SELECT 
+            schemaname,
+            tablename,
+            pg_size_pretty(pg_total_relation_size(schemaname||'.'||tablename)) as size,
+            pg_total_relation_size(schemaname||'.'||tablename) as size_bytes
+        FROM pg_tables 
+        WHERE schemaname = 'public'
+        ORDER BY pg_total_relation_size(schemaname||'.'||tablename) DESC
+    """),
+    'index_usage': text("""
+        SELECT 
+            schemaname,
+            relname as tablename,
+            indexrelname as indexname,
+            idx_scan,
+            idx_tup_read,
+            idx_tup_fetch
+        FROM pg_stat_user_indexes
+        ORDER BY idx_scan DESC
+    """),
+    'content_stats': text("""
+        SELECT 
+            status,
+            COUNT(*) as count,
+            AVG(LENGTH(content)) as avg_content_length
+        FROM content
+        GROUP BY status
+    """),
+    'interaction_stats': text("""
+        SELECT 
+            interaction_type,
+            COUNT(*) as count,
+            AVG(interaction_score) as avg_score
+        FROM user_interactions
+        GROUP BY interaction_type
+        ORDER BY count DESC
+    """),
+    'daily_activity': text("""
+        SELECT 
+            DATE(timestamp) as date,
+            COUNT(*) as interactions
+        FROM user_interactions
+        WHERE timestamp >= NOW() - INTERVAL '30 days'
+        GROUP BY DATE(timestamp)
+        ORDER BY date DESC
+    """),
+}
+
+# Pre-aggregated stand-ins served when the stats views exist (see create_stats_views)
+STATS_VIEW_QUERIES = {
+    'content_stats': text("SELECT status, count, avg_content_length FROM mv_content_stats"),
+    'interaction_stats': text(
+        "SELECT interaction_type, count, avg_score FROM mv_interaction_stats ORDER BY count DESC"
+    ),
+}
+
+# Dashboard aggregates served from materialized views (see create_analytics_views)
+TRENDING_TAGS_VIEW_QUERY = text(
+    "SELECT name, count FROM mv_trending_tags ORDER BY count DESC, name LIMIT :limit"
+).bindparams(bindparam('limit'))
+POPULAR_CONTENT_VIEW_QUERY = text(
+    "SELECT content_id, interaction_count FROM mv_popular_content "
+    "ORDER BY interaction_count DESC, content_id LIMIT :limit"
+).bindparams(bindparam('limit'))
+
+# How long create_database_indexes waits for a table lock before skipping an index
+INDEX_LOCK_TIMEOUT = '5s'
+
+# Indexes above this size (bytes) are rebuilt by optimize_database
+REINDEX_SIZE_THRESHOLD = 100 * 1024 * 1024
+
+# Monthly user_interactions partitions kept ready beyond the current month
+INTERACTION_PARTITION_MONTHS_AHEAD = 3
+
+def _month_start(value, months_after=0):
+    """First day of the month ``months_after`` months after ``value``'s month"""
+    month_index = value.year * 12 + value.month - 1 + months_after
+    return datetime(month_index // 12, month_index % 12 + 1, 1)
+
+def _interaction_partition_name(month):
+    return f"user_interactions_{month.year:04d}_{month.month:02d}"
+
+# One worker per statistics query
+_statistics_executor = ThreadPoolExecutor(max_workers=len(DATABASE_STATISTICS_QUERIES))
+
+# Search results are cached briefly; popular queries repeat within seconds.
+# Writes invalidate them by bumping a shared epoch, which only reaches other
+# workers through Redis, so without it searches are not cached at all
+SEARCH_CACHE_TTL = 60
+
+# Whether the optional materialized views exist is shared through result_cache
+# and re-checked every VIEW_CHECK_TTL seconds, so views created from one
+# worker's admin request are picked up by the others
+VIEW_CHECK_TTL = 30
+SEARCH_VIEW_READY_KEY = 'db:views:search'
+STATS_VIEWS_READY_KEY = 'db:views:stats'
+ANALYTICS_VIEWS_READY_KEY = 'db:views:analytics'
+
+def _relations_exist(cache_key, *relations):
+    """Whether all the named relations exist, cached under cache_key for VIEW_CHECK_TTL"""
+    if db.engine.dialect.name != 'postgresql':
+        return False
+    ready = result_cache.get(cache_key)
+    if ready is None:
+        ready = all(db.session.execute(
+            text("SELECT to_regclass(:name) IS NOT NULL"), {'name': f'public.{relation}'}
+        ).scalar() for relation in relations)
+        result_cache.set(cache_key, ready, ttl=VIEW_CHECK_TTL)
+    return ready
+
+# Advisory lock serializing user_item_scores rebuilds; every worker runs the
+# startup check, and concurrent rebuilds would double-insert the aggregates
+USER_ITEM_SCORES_LOCK_KEY = 7215310
+
+def _lock_user_item_scores():
+    """Hold the rebuild lock until the current transaction ends (PostgreSQL only)"""
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(text("SELECT pg_advisory_xact_lock(:key)"), {'key': USER_ITEM_SCORES_LOCK_KEY})
+
+def _search_cache_key(kind, query, limit):
+    """Cache key for a search; case and whitespace don't change tsquery/trigram results
+
+    Returns None when the search cache is disabled (no Redis).
+    """
+    if result_cache.redis_client is None:
+        return None
+    normalized = ' '.join(query.lower().split())
+    return f"search:{kind}:{result_cache.get_count(SEARCH_EPOCH_KEY) or 0}:{limit}:{normalized}"
 
 class DatabaseManager:
     """Advanced database management utilities"""
     
     @staticmethod
-    def create_full_text_search_triggers():
-        """Create PostgreSQL triggers for automatic full-text search vector updates"""
+    def migrate_search_vector_to_expression_index():
+        """Replace the trigger-maintained search_vector column with the idx_content_fts expression index"""
         try:
-            # Create function to update search vector
-            db.session.execute(text("""
-                CREATE OR REPLACE FUNCTION update_content_search_vector()
-                RETURNS TRIGGER AS $$
-                BEGIN
-                    NEW.search_vector := to_tsvector('english', 
-                        COALESCE(NEW.title, '') || ' ' || 
-                        COALESCE(NEW.content, '') || ' ' ||
-                        COALESCE(NEW.tags, '') || ' ' ||
-                        COALESCE(NEW.author, '')
-                    );
-                    RETURN NEW;
-                END;
-                $$ LANGUAGE plpgsql;
-            """))
+            # The search view selects search_vector, so it is rebuilt afterwards
+            had_search_view = DatabaseManager.search_view_exists()
+            db.session.execute(text("DROP MATERIALIZED VIEW IF EXISTS published_content_search"))
+            db.session.execute(text("DROP TRIGGER IF EXISTS content_search_vector_update ON content"))
+            db.session.execute(text("DROP FUNCTION IF EXISTS update_content_search_vector()"))
+            db.session.execute(text("DROP INDEX IF EXISTS idx_content_search"))
+            db.session.execute(text("ALTER TABLE content DROP COLUMN IF EXISTS search_vector"))
+            db.session.execute(text(
+                f"CREATE INDEX IF NOT EXISTS idx_content_fts ON content USING gin(({CONTENT_SEARCH_VECTOR}))"
+            ))
+            db.session.commit()
+            result_cache.set(SEARCH_VIEW_READY_KEY, False, ttl=VIEW_CHECK_TTL)
+            logging.info("Full-text search migrated to expression index")
             
-            # Create trigger
-            db.session.execute(text("""
-                DROP TRIGGER IF EXISTS content_search_vector_update ON content;
-                CREATE TRIGGER content_search_vector_update
-                    BEFORE INSERT OR UPDATE ON content
-                    FOR EACH ROW EXECUTE FUNCTION update_content_search_vector();
+            if had_search_view:
+                return DatabaseManager.create_search_view()
+            return True
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error migrating full-text search index: {e}")
+            return False
+    
+    @staticmethod
+    def add_content_keywords_column():
+        """Add content.keywords to databases created before the column existed"""
+        try:
+            columns = {column['name'] for column in inspect(db.engine).get_columns('content')}
+            if 'keywords' not in columns:
+                db.session.execute(text("ALTER TABLE content ADD COLUMN keywords TEXT"))
+                db.session.commit()
+                logging.info("Added content.keywords column")
+            return True
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error adding content keywords column: {e}")
+            return False
+    
+    @staticmethod
+    def search_view_exists():
+        """Check whether the published_content_search materialized view exists"""
+        return _relations_exist(SEARCH_VIEW_READY_KEY, 'published_content_search')
+    
+    @staticmethod
+    def create_search_view():
+        """Create the published_content_search materialized view and its indexes"""
+        try:
+            db.session.execute(text(f"""
+                CREATE MATERIALIZED VIEW IF NOT EXISTS published_content_search AS
+                SELECT id, title, content, category, author,
+                       {CONTENT_SEARCH_VECTOR} AS search_vector, created_at
+                FROM content
+                WHERE status = 'Published'
             """))
-            
+            db.session.execute(text(
+                "CREATE INDEX IF NOT EXISTS idx_published_search_vector ON published_content_search USING gin(search_vector)"
+            ))
+            db.session.execute(text(
+                "CREATE INDEX IF NOT EXISTS idx_published_search_created ON published_content_search(created_at DESC)"
+            ))
+            # Required for REFRESH ... CONCURRENTLY
+            db.session.execute(text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS idx_published_search_id ON published_content_search(id)"
+            ))
             db.session.commit()
-            logging.info("Full-text search triggers created successfully")
+            result_cache.set(SEARCH_VIEW_READY_KEY, True, ttl=VIEW_CHECK_TTL)
+            logging.info("Search materialized view created successfully")
             return True
         except Exception as e:
             db.session.rollback()
-            logging.error(f"Error creating full-text search triggers: {e}")
+            logging.error(f"Error creating search materialized view: {e}")
             return False
     
     @staticmethod
-    def update_all_search_vectors():
-        """Update search vectors for all existing content"""
+    def refresh_search_view():
+        """Refresh published_content_search without blocking concurrent searches"""
         try:
-            db.session.execute(text("""
-                UPDATE content SET search_vector = to_tsvector('english', 
-                    COALESCE(title, '') || ' ' || 
-                    COALESCE(content, '') || ' ' ||
-                    COALESCE(tags, '') || ' ' ||
-                    COALESCE(author, '')
-                )
-            """))
+            db.session.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY published_content_search"))
             db.session.commit()
-            logging.info("All search vectors updated successfully")
+            result_cache.incr(SEARCH_EPOCH_KEY)
+            logging.info("Search materialized view refreshed")
             return True
         except Exception as e:
             db.session.rollback()
-            logging.error(f"Error updating search vectors: {e}")
+            logging.error(f"Error refreshing search materialized view: {e}")
             return False
     
     @staticmethod
     def full_text_search(query, limit=10):
         """Perform full-text search on content"""
+        cache_key = _search_cache_key('fts', query, limit)
+        results = result_cache.get(cache_key) if cache_key else None
+        if results is not None:
+            return results
+        try:
+            search_query = SEARCH_VIEW_QUERY if DatabaseManager.search_view_exists() else FULL_TEXT_SEARCH_QUERY
+            result = db.session.execute(search_query, {'query': query, 'limit': limit})
+            results = [dict(row) for row in result.mappings()]
+        except Exception as e:
+            logging.error(f"Error in full-text search: {e}")
+            return []
+        if cache_key:
+            result_cache.set(cache_key, results, ttl=SEARCH_CACHE_TTL)
+        return results
+    
+    @staticmethod
+    def fuzzy_search(query, limit=10):
+        """Trigram search on title and content for substring and misspelled queries"""
+        if db.engine.dialect.name != 'postgresql':
+            return []
+        cache_key = _search_cache_key('fuzzy', query, limit)
+        results = result_cache.get(cache_key) if cache_key else None
+        if results is not None:
+            return results
+        try:
+            result = db.session.execute(FUZZY_SEARCH_QUERY, {'query': query.lower(), 'limit': limit})
+            results = [dict(row) for row in result.mappings()]
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error in fuzzy search: {e}")
+            return []
+        if cache_key:
+            result_cache.set(cache_key, results, ttl=SEARCH_CACHE_TTL)
+        return results
+    
+    @staticmethod
+    def find_similar_content_candidates(content_id, keywords, limit=50):
+        """Return the top full-text matches for any of the given keywords as similarity candidates"""
+        if not keywords or db.engine.dialect.name != 'postgresql':
+            return []
         try:
-            search_query = text("""
-                SELECT id, title, content, category, author, tags, image, created_at,
-                       ts_rank(search_vector, plainto_tsquery('english', :query)) as rank
+            # Keywords are lowercase alphanumeric tokens, so OR-joining them is a valid tsquery
+            candidate_query = text(f"""
+                SELECT id, category, author, tags, content, keywords, updated_at
                 FROM content
-                WHERE search_vector @@ plainto_tsquery('english', :query)
+                WHERE {CONTENT_SEARCH_VECTOR} @@ to_tsquery('english', :terms)
+                  AND id != :content_id
                   AND status = 'Published'
-                ORDER BY rank DESC, created_at DESC
+                ORDER BY ts_rank_cd({CONTENT_SEARCH_VECTOR}, to_tsquery('english', :terms)) DESC
                 LIMIT :limit
             """)
             
-            result = db.session.execute(search_query, {'query': query, 'limit': limit})
+            result = db.session.execute(candidate_query, {
+                'terms': ' | '.join(keywords),
+                'content_id': content_id,
+                'limit': limit
+            })
             return result.fetchall()
         except Exception as e:
-            logging.error(f"Error in full-text search: {e}")
+            db.session.rollback()
+            logging.error(f"Error finding similar content candidates: {e}")
             return []
     
+    @staticmethod
+    def find_similar_content(content_id, category, author, tags, keywords, limit=5):
+        """Score published content against one item in SQL and return the top (id, score) rows
+        
+        Same weights as app.calculate_content_similarity: category 0.4, tag
+        Jaccard 0.3, keyword Jaccard 0.2 (stored keywords), author 0.1. Only
+        rows sharing a category, author, tag or keyword can score, so the
+        WHERE clause lets the planner combine the category/author B-tree and
+        tag/keyword GIN indexes instead of scanning the table. Returns None
+        on databases other than PostgreSQL.
+        """
+        if db.engine.dialect.name != 'postgresql':
+            return None
+        try:
+            tags = sorted(set(tags))
+            keywords = sorted(set(keywords))
+            similar_query = text(f"""
+                SELECT c.id, s.score
+                FROM content c
+                CROSS JOIN LATERAL (
+                    SELECT count(DISTINCT tag) AS total,
+                           count(DISTINCT tag) FILTER (WHERE tag = ANY(CAST(:tags AS text[]))) AS shared
+                    FROM unnest({CONTENT_TAGS_ARRAY}) AS tag
+                ) t
+                CROSS JOIN LATERAL (
+                    SELECT count(DISTINCT keyword) AS total,
+                           count(DISTINCT keyword) FILTER (WHERE keyword = ANY(CAST(:keywords AS text[]))) AS shared
+                    FROM unnest({CONTENT_KEYWORDS_ARRAY}) AS keyword
+                    WHERE keyword <> ''
+                ) k
+                CROSS JOIN LATERAL (
+                    SELECT CASE WHEN c.category = :category THEN 0.4 ELSE 0 END
+                         + CASE WHEN t.total > 0 AND :num_tags > 0
+                                THEN 0.3 * t.shared / (t.total + :num_tags - t.shared) ELSE 0 END
+                         + CASE WHEN c.author = :author THEN 0.1 ELSE 0 END
+                         + CASE WHEN k.total > 0 AND :num_keywords > 0
+                                THEN 0.2 * k.shared / (k.total + :num_keywords - k.shared) ELSE 0 END
+                      AS score
+                ) s
+                WHERE c.status = 'Published'
+                  AND c.id != :content_id
+                  AND (c.category = :category
+                       OR c.author = :author
+                       OR {CONTENT_TAGS_ARRAY} && CAST(:tags AS text[])
+                       OR {CONTENT_KEYWORDS_ARRAY} && CAST(:keywords AS text[]))
+                ORDER BY s.score DESC, c.id
+                LIMIT :limit
+            """)
+            
+            result = db.session.execute(similar_query, {
+                'content_id': content_id,
+                'category': category,
+                'author': author,
+                'tags': tags,
+                'num_tags': len(tags),
+                'keywords': keywords,
+                'num_keywords': len(keywords),
+                'limit': limit
+            })
+            return [(row.id, float(row.score)) for row in result]
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error scoring similar content in SQL: {e}")
+            return None
+    
     @staticmethod
     def create_database_backup(backup_name=None):
-        """Create a database backup using pg_dump"""
+        """Create a database backup with pg_dump
+        
+        Local backups use directory format dumped by BACKUP_JOBS parallel
+        workers (each holds its own server connection, so max_connections
+        needs BACKUP_JOBS + 1 free). S3 backups stream a custom-format dump,
+        since directory format can't be written to a pipe. Restore either
+        with ``pg_restore -j N``.
+        """
         try:
             if not backup_name:
-                backup_name = f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.sql"
+                backup_name = f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
             
             database_url = os.environ.get('DATABASE_URL')
             if not database_url:
@@ -110,7 +444,6 @@ class DatabaseManager:
                 '-p', str(parsed.port),
                 '-U', parsed.username,
                 '-d', parsed.path[1:],  # Remove leading slash
-                '-f', f'/tmp/{backup_name}',
                 '--no-password'
             ]
             
@@ -118,131 +451,556 @@ class DatabaseManager:
             env = os.environ.copy()
             env['PGPASSWORD'] = parsed.password
             
-            result = subprocess.run(backup_command, env=env, capture_output=True, text=True)
+            bucket = os.environ.get('BACKUP_S3_BUCKET')
+            if bucket and boto3 is not None:
+                backup_name = f"{backup_name}.dump"
+                location = f"s3://{bucket}/{backup_name}"
+                returncode, stderr = DatabaseManager._stream_backup(
+                    backup_command + ['-Fc'], env, bucket, backup_name
+                )
+            else:
+                backup_name = f"{backup_name}.dir"
+                location = os.path.join(BACKUP_DIR, backup_name)
+                result = subprocess.run(
+                    backup_command + ['-Fd', '-j', str(BACKUP_JOBS), '-f', location],
+                    env=env, capture_output=True, text=True
+                )
+                returncode, stderr = result.returncode, result.stderr
             
-            if result.returncode == 0:
-                logging.info(f"Database backup created: {backup_name}")
+            if returncode == 0:
+                logging.info(f"Database backup created: {location}")
                 return True, backup_name
             else:
-                logging.error(f"Backup failed: {result.stderr}")
-                return False, result.stderr
+                logging.error(f"Backup failed: {stderr}")
+                return False, stderr
                 
         except Exception as e:
             logging.error(f"Error creating database backup: {e}")
             return False, str(e)
     
     @staticmethod
-    def get_database_statistics():
-        """Get comprehensive database statistics"""
+    def incremental_backup(since_ts, out_stream):
+        """Write user_interactions rows newer than since_ts to out_stream as binary COPY data
+        
+        Complements the full pg_dump from create_database_backup for the one
+        table that grows quickly; restore with ``COPY user_interactions FROM
+        STDIN WITH (FORMAT binary)``.
+        """
+        raw_conn = db.engine.raw_connection()
         try:
-            stats = {}
+            cursor = raw_conn.cursor()
+            copy_sql = cursor.mogrify(
+                "COPY (SELECT * FROM user_interactions WHERE timestamp > %s) TO STDOUT WITH (FORMAT binary)",
+                (since_ts,)
+            ).decode()
+            cursor.copy_expert(copy_sql, out_stream)
+            exported = cursor.rowcount
+            cursor.close()
+            raw_conn.rollback()
+            logging.info(f"Incremental backup exported {exported} interactions since {since_ts}")
+            return True, exported
+        except Exception as e:
+            raw_conn.rollback()
+            logging.error(f"Error creating incremental backup: {e}")
+            return False, str(e)
+        finally:
+            raw_conn.close()
+    
+    @staticmethod
+    def _stream_backup(backup_command, env, bucket, key):
+        """Pipe pg_dump's stdout straight into an S3 upload; returns (returncode, stderr)
+        
+        The dump is uploaded under a temporary key and only copied to ``key``
+        once pg_dump has exited cleanly, so a failed dump never leaves a
+        truncated object under the real backup name.
+        """
+        s3 = boto3.client('s3')
+        partial_key = f"{key}.partial"
+        # stderr goes to a temp file so a chatty pg_dump can't block on a full pipe
+        with tempfile.TemporaryFile() as stderr_file:
+            proc = subprocess.Popen(backup_command, env=env, stdout=subprocess.PIPE, stderr=stderr_file)
+            try:
+                s3.upload_fileobj(proc.stdout, bucket, partial_key)
+                proc.stdout.close()
+                returncode = proc.wait()
+                if returncode == 0:
+                    s3.copy({'Bucket': bucket, 'Key': partial_key}, bucket, key)
+            finally:
+                proc.stdout.close()
+                if proc.poll() is None:
+                    proc.kill()
+                    proc.wait()
+                try:
+                    s3.delete_object(Bucket=bucket, Key=partial_key)
+                except Exception as e:
+                    logging.error(f"Error removing partial backup s3://{bucket}/{partial_key}: {e}")
             
-            # Table sizes
-            table_sizes = db.session.execute(text("""
-                SELECT 
-                    schemaname,
-                    tablename,
-                    pg_size_pretty(pg_total_relation_size(schemaname||'.'||tablename)) as size,
-                    pg_total_relation_size(schemaname||'.'||tablename) as size_bytes
-                FROM pg_tables 
-                WHERE schemaname = 'public'
-                ORDER BY pg_total_relation_size(schemaname||'.'||tablename) DESC
-            """)).fetchall()
-            
-            stats['table_sizes'] = [dict(row._mapping) for row in table_sizes]
-            
-            # Index usage
-            index_usage = db.session.execute(text("""
-                SELECT 
-                    schemaname,
-                    relname as tablename,
-                    indexrelname as indexname,
-                    idx_scan,
-                    idx_tup_read,
-                    idx_tup_fetch
-                FROM pg_stat_user_indexes
-                ORDER BY idx_scan DESC
-            """)).fetchall()
-            
-            stats['index_usage'] = [dict(row._mapping) for row in index_usage]
-            
-            # Content statistics
-            content_stats = db.session.execute(text("""
-                SELECT 
-                    status,
-                    COUNT(*) as count,
-                    AVG(LENGTH(content)) as avg_content_length
-                FROM content
-                GROUP BY status
-            """)).fetchall()
+            stderr_file.seek(0)
+            return returncode, stderr_file.read().decode(errors='replace')
+    
+    # Column order expected by copy_bulk_load_content's CSV input
+    BULK_LOAD_CONTENT_COLUMNS = ('title', 'content', 'category', 'status', 'author', 'tags')
+    
+    @staticmethod
+    def copy_bulk_load_content(file_obj, user_id, keywords_for=None):
+        """Bulk-load content rows from CSV with COPY, then build the full-text index
+        
+        The CSV is copied into a temporary staging table and moved into content
+        with one INSERT ... SELECT that fills the columns the CSV doesn't carry:
+        the owning user_id, UTC timestamps, and keywords (via ``keywords_for``,
+        which maps a body to its keyword list) so imported rows are complete
+        for similarity and search as soon as they commit.
+        """
+        from psycopg2.extras import execute_values
+        
+        raw_conn = db.engine.raw_connection()
+        try:
+            cursor = raw_conn.cursor()
+            columns = ', '.join(DatabaseManager.BULK_LOAD_CONTENT_COLUMNS)
+            cursor.execute(f"""
+                CREATE TEMP TABLE content_import (
+                    import_id serial,
+                    title text, content text, category text, status text, author text, tags text,
+                    keywords text
+                ) ON COMMIT DROP
+            """)
+            cursor.copy_expert(f"COPY content_import({columns}) FROM STDIN WITH CSV", file_obj)
             
-            stats['content_stats'] = [dict(row._mapping) for row in content_stats]
+            if keywords_for is not None:
+                cursor.execute("SELECT import_id, content FROM content_import")
+                keyword_rows = [
+                    (import_id, ','.join(keywords_for(body or '')))
+                    for import_id, body in cursor.fetchall()
+                ]
+                if keyword_rows:
+                    execute_values(cursor, """
+                        UPDATE content_import SET keywords = v.keywords
+                        FROM (VALUES %s) AS v(import_id, keywords)
+                        WHERE content_import.import_id = v.import_id
+                    """, keyword_rows, page_size=1000)
             
-            # Interaction statistics
-            interaction_stats = db.session.execute(text("""
-                SELECT 
-                    interaction_type,
-                    COUNT(*) as count,
-                    AVG(interaction_score) as avg_score
+            cursor.execute(f"""
+                INSERT INTO content ({columns}, keywords, user_type, user_id, created_at, updated_at)
+                SELECT {columns}, keywords, 'mixed', %s, timezone('utc', now()), timezone('utc', now())
+                FROM content_import
+                ORDER BY import_id
+            """, (user_id,))
+            loaded = cursor.rowcount
+            raw_conn.commit()
+            result_cache.incr(SEARCH_EPOCH_KEY)
+            cursor.close()
+        except Exception as e:
+            raw_conn.rollback()
+            logging.error(f"Error bulk loading content: {e}")
+            return False, str(e)
+        finally:
+            raw_conn.close()
+        
+        # Index after load: one CONCURRENTLY build is cheaper than per-row maintenance.
+        # CONCURRENTLY can't run in a transaction block, hence AUTOCOMMIT.
+        try:
+            with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                conn.execute(text(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_content_fts ON content USING gin(({CONTENT_SEARCH_VECTOR}))"
+                ))
+        except Exception as e:
+            logging.warning(f"Full-text index creation after bulk load failed: {e}")
+        
+        logging.info(f"Bulk loaded {loaded} content rows")
+        return True, loaded
+    
+    @staticmethod
+    def stats_views_exist():
+        """Check whether the aggregated statistics views exist"""
+        return _relations_exist(STATS_VIEWS_READY_KEY, 'mv_content_stats', 'mv_interaction_stats')
+    
+    @staticmethod
+    def create_stats_views():
+        """Create materialized views aggregating content and interaction statistics"""
+        try:
+            db.session.execute(text("""
+                CREATE MATERIALIZED VIEW IF NOT EXISTS mv_content_stats AS
+                SELECT status, COUNT(*) AS count, AVG(LENGTH(content)) AS avg_content_length
+                FROM content
+                GROUP BY status
+            """))
+            db.session.execute(text("""
+                CREATE MATERIALIZED VIEW IF NOT EXISTS mv_interaction_stats AS
+                SELECT interaction_type, COUNT(*) AS count, AVG(interaction_score) AS avg_score
                 FROM user_interactions
                 GROUP BY interaction_type
-                ORDER BY count DESC
-            """)).fetchall()
-            
-            stats['interaction_stats'] = [dict(row._mapping) for row in interaction_stats]
-            
-            # Daily activity
-            daily_activity = db.session.execute(text("""
-                SELECT 
-                    DATE(timestamp) as date,
-                    COUNT(*) as interactions
-                FROM user_interactions
-                WHERE timestamp >= NOW() - INTERVAL '30 days'
-                GROUP BY DATE(timestamp)
-                ORDER BY date DESC
-            """)).fetchall()
-            
-            stats['daily_activity'] = [dict(row._mapping) for row in daily_activity]
+            """))
+            # Required for REFRESH ... CONCURRENTLY
+            db.session.execute(text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_content_stats_status ON mv_content_stats(status)"
+            ))
+            db.session.execute(text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_interaction_stats_type ON mv_interaction_stats(interaction_type)"
+            ))
+            db.session.commit()
+            result_cache.set(STATS_VIEWS_READY_KEY, True, ttl=VIEW_CHECK_TTL)
+            logging.info("Statistics materialized views created successfully")
+            return True
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error creating statistics materialized views: {e}")
+            return False
+    
+    @staticmethod
+    def refresh_stats_views():
+        """Refresh the statistics views; meant to run from a scheduled job"""
+        try:
+            db.session.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY mv_content_stats"))
+            db.session.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY mv_interaction_stats"))
+            db.session.commit()
+            logging.info("Statistics materialized views refreshed")
+            return True
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error refreshing statistics materialized views: {e}")
+            return False
+    
+    @staticmethod
+    def analytics_views_exist():
+        """Check whether the trending tag and popular content views exist"""
+        return _relations_exist(ANALYTICS_VIEWS_READY_KEY, 'mv_trending_tags', 'mv_popular_content')
+    
+    @staticmethod
+    def create_analytics_views():
+        """Create materialized views for the trading dashboard's tag and content rankings"""
+        try:
+            db.session.execute(text("""
+                CREATE MATERIALIZED VIEW IF NOT EXISTS mv_trending_tags AS
+                SELECT btrim(tag) AS name, COUNT(*) AS count
+                FROM content, unnest(string_to_array(tags, ',')) AS tag
+                WHERE tags IS NOT NULL AND tags <> '' AND btrim(tag) <> ''
+                GROUP BY btrim(tag)
+            """))
+            db.session.execute(text("""
+                CREATE MATERIALIZED VIEW IF NOT EXISTS mv_popular_content AS
+                SELECT c.id AS content_id, COUNT(ui.id) AS interaction_count
+                FROM content c
+                LEFT JOIN user_interactions ui ON ui.content_id = c.id
+                GROUP BY c.id
+            """))
+            # Unique indexes are required for REFRESH ... CONCURRENTLY
+            db.session.execute(text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_trending_tags_name ON mv_trending_tags(name)"
+            ))
+            db.session.execute(text(
+                "CREATE INDEX IF NOT EXISTS idx_mv_trending_tags_count ON mv_trending_tags(count DESC)"
+            ))
+            db.session.execute(text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_popular_content_id ON mv_popular_content(content_id)"
+            ))
+            db.session.execute(text(
+                "CREATE INDEX IF NOT EXISTS idx_mv_popular_content_count ON mv_popular_content(interaction_count DESC)"
+            ))
+            db.session.commit()
+            result_cache.set(ANALYTICS_VIEWS_READY_KEY, True, ttl=VIEW_CHECK_TTL)
+            logging.info("Analytics materialized views created successfully")
+            return True
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error creating analytics materialized views: {e}")
+            return False
+    
+    @staticmethod
+    def refresh_analytics_views():
+        """Refresh the trending tag and popular content views; meant to run from a scheduled job"""
+        try:
+            db.session.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY mv_trending_tags"))
+            db.session.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY mv_popular_content"))
+            db.session.commit()
+            logging.info("Analytics materialized views refreshed")
+            return True
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error refreshing analytics materialized views: {e}")
+            return False
+    
+    @staticmethod
+    def get_trending_tags(limit=10):
+        """Most used content tags as [{'name', 'count'}], from mv_trending_tags when it exists"""
+        try:
+            if DatabaseManager.analytics_views_exist():
+                result = db.session.execute(TRENDING_TAGS_VIEW_QUERY, {'limit': limit})
+                return [{'name': name, 'count': count} for name, count in result]
             
-            return stats
+            tag = func.btrim(func.unnest(func.string_to_array(Content.tags, ','))).label('tag')
+            rows = db.session.query(tag, func.count().label('count'))\
+                .filter(Content.tags.isnot(None))\
+                .filter(Content.tags != '')\
+                .group_by('tag')\
+                .order_by(db.desc('count'))\
+                .limit(limit + 1).all()
+            return [{'name': name, 'count': count} for name, count in rows if name][:limit]
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error getting trending tags: {e}")
+            return []
+    
+    @staticmethod
+    def get_popular_content_ids(limit=10):
+        """Top (content_id, interaction_count) pairs from mv_popular_content, or None without the view"""
+        if not DatabaseManager.analytics_views_exist():
+            return None
+        try:
+            result = db.session.execute(POPULAR_CONTENT_VIEW_QUERY, {'limit': limit})
+            return [(content_id, interaction_count) for content_id, interaction_count in result]
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error reading popular content view: {e}")
+            return None
+    
+    @staticmethod
+    def _run_statistics_query(engine, query):
+        """Run one statistics query on its own pooled connection"""
+        with engine.connect() as conn:
+            return [dict(row._mapping) for row in conn.execute(query)]
+    
+    @staticmethod
+    def get_database_statistics():
+        """Get comprehensive database statistics"""
+        try:
+            # The queries are independent, so run them side by side on separate
+            # connections; latency is the slowest query rather than the sum
+            engine = db.engine
+            queries = DATABASE_STATISTICS_QUERIES
+            if DatabaseManager.stats_views_exist():
+                queries = {**queries, **STATS_VIEW_QUERIES}
+            futures = {
+                name: _statistics_executor.submit(DatabaseManager._run_statistics_query, engine, query)
+                for name, query in queries.items()
+            }
+            return {name: future.result() for name, future in futures.items()}
             
         except Exception as e:
             logging.error(f"Error getting database statistics: {e}")
             return {}
     
     @staticmethod
-    def optimize_database():
-        """Run database optimization commands"""
+    def optimize_database(reindex_threshold=REINDEX_SIZE_THRESHOLD):
+        """Vacuum/analyze and rebuild large, in-use indexes"""
         try:
-            # Analyze tables for query planner
-            db.session.execute(text("ANALYZE;"))
+            # VACUUM and REINDEX CONCURRENTLY refuse to run inside a transaction block
+            with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                conn.execute(text("VACUUM (ANALYZE)"))
+                
+                # Only large indexes that queries actually use are worth rebuilding;
+                # unused ones are candidates for dropping, not reindexing
+                candidates = conn.execute(text("""
+                    SELECT format('%I.%I', schemaname, indexrelname) AS index_name,
+                           idx_scan
+                    FROM pg_stat_user_indexes
+                    WHERE pg_relation_size(indexrelid) > :threshold
+                """), {'threshold': reindex_threshold}).fetchall()
+                
+                for index_name, idx_scan in candidates:
+                    if not idx_scan:
+                        logging.info(f"Skipping reindex of unused index {index_name}")
+                        continue
+                    try:
+                        conn.execute(text(f"REINDEX INDEX CONCURRENTLY {index_name}"))
+                    except Exception as e:
+                        logging.warning(f"Reindex warning for {index_name}: {e}")
             
-            # Vacuum tables to reclaim space
-            db.session.execute(text("VACUUM;"))
+            logging.info("Database optimization completed")
+            return True
             
-            # Reindex for better performance
-            db.session.execute(text("REINDEX DATABASE CONCURRENTLY;"))
+        except Exception as e:
+            logging.error(f"Error optimizing database: {e}")
+            return False
+    
+    @staticmethod
+    def interactions_partitioned():
+        """Whether user_interactions is a partitioned table"""
+        if db.engine.dialect.name != 'postgresql':
+            return False
+        return bool(db.session.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+            "WHERE partrelid = to_regclass('public.user_interactions'))"
+        )).scalar())
+    
+    @staticmethod
+    def _create_interaction_partitions(first_month, last_month):
+        """Create monthly partitions from first_month through last_month (inclusive)"""
+        month = first_month
+        while month <= last_month:
+            next_month = _month_start(month, 1)
+            db.session.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {_interaction_partition_name(month)} "
+                f"PARTITION OF user_interactions "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')"
+            ))
+            month = next_month
+    
+    @staticmethod
+    def ensure_interaction_partitions(months_ahead=INTERACTION_PARTITION_MONTHS_AHEAD):
+        """Pre-create upcoming monthly partitions; meant to run from a scheduled job"""
+        try:
+            if not DatabaseManager.interactions_partitioned():
+                return False
+            now = datetime.utcnow()
+            DatabaseManager._create_interaction_partitions(_month_start(now), _month_start(now, months_ahead))
+            db.session.commit()
+            return True
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error creating interaction partitions: {e}")
+            return False
+    
+    @staticmethod
+    def partition_user_interactions():
+        """Convert user_interactions into a monthly RANGE-partitioned table on timestamp"""
+        try:
+            if db.engine.dialect.name != 'postgresql':
+                return False
+            if DatabaseManager.interactions_partitioned():
+                return True
+            
+            db.session.execute(text("ALTER TABLE user_interactions RENAME TO user_interactions_unpartitioned"))
+            # Unique keys on a partitioned table must include the partition key
+            db.session.execute(text("""
+                CREATE TABLE user_interactions (
+                    LIKE user_interactions_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS,
+                    PRIMARY KEY (id, timestamp),
+                    FOREIGN KEY (content_id) REFERENCES content(id) ON DELETE CASCADE
+                ) PARTITION BY RANGE (timestamp)
+            """))
+            # Rows outside the pre-created months land here instead of failing
+            db.session.execute(text(
+                "CREATE TABLE user_interactions_default PARTITION OF user_interactions DEFAULT"
+            ))
+            
+            oldest = db.session.execute(text(
+                "SELECT MIN(timestamp) FROM user_interactions_unpartitioned"
+            )).scalar()
+            now = datetime.utcnow()
+            DatabaseManager._create_interaction_partitions(
+                _month_start(min(oldest or now, now)),
+                _month_start(now, INTERACTION_PARTITION_MONTHS_AHEAD)
+            )
+            
+            db.session.execute(text(
+                "INSERT INTO user_interactions SELECT * FROM user_interactions_unpartitioned"
+            ))
+            # The id sequence belongs to the old table; keep it when that is dropped
+            db.session.execute(text("""
+                DO $$
+                BEGIN
+                    EXECUTE format('ALTER SEQUENCE %s OWNED BY user_interactions.id',
+                                   pg_get_serial_sequence('user_interactions_unpartitioned', 'id'));
+                END $$
+            """))
+            db.session.execute(text("DROP TABLE user_interactions_unpartitioned"))
+            
+            # Recreate the model's indexes; each partition gets its own local copy
+            connection = db.session.connection()
+            for index in UserInteraction.__table__.indexes:
+                index.create(bind=connection)
             
             db.session.commit()
-            logging.info("Database optimization completed")
+            logging.info("user_interactions converted to monthly partitions")
             return True
             
         except Exception as e:
             db.session.rollback()
-            logging.error(f"Error optimizing database: {e}")
+            logging.error(f"Error partitioning user_interactions: {e}")
             return False
     
+    @staticmethod
+    def _drop_interaction_partitions_before(cutoff_date):
+        """Detach and drop monthly partitions entirely older than cutoff_date; returns approximate rows removed"""
+        partitions = db.session.execute(text("""
+            SELECT child.relname, GREATEST(child.reltuples, 0)::bigint
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = 'user_interactions'::regclass
+              AND child.relname ~ '^user_interactions_[0-9]{4}_[0-9]{2}$'
+        """)).fetchall()
+        
+        dropped = 0
+        for name, estimated_rows in partitions:
+            month = datetime.strptime(name[-7:], '%Y_%m')
+            if _month_start(month, 1) > cutoff_date:
+                continue
+            # Plain DETACH: CONCURRENTLY is not allowed alongside a DEFAULT partition
+            db.session.execute(text(f"ALTER TABLE user_interactions DETACH PARTITION {name}"))
+            db.session.execute(text(f"DROP TABLE {name}"))
+            dropped += estimated_rows
+        return dropped
+    
+    @staticmethod
+    def rebuild_user_item_scores():
+        """Recompute user_item_scores from user_interactions"""
+        try:
+            _lock_user_item_scores()
+            day = func.date(UserInteraction.timestamp)
+            aggregate = db.session.query(
+                UserInteraction.user_id,
+                UserInteraction.content_id,
+                day,
+                func.sum(func.coalesce(UserInteraction.interaction_score, 0.0)),
+                func.count(UserInteraction.id),
+                func.max(UserInteraction.timestamp)
+            ).group_by(UserInteraction.user_id, UserInteraction.content_id, day)
+            
+            db.session.execute(UserItemScore.__table__.delete())
+            db.session.execute(UserItemScore.__table__.insert().from_select(
+                ['user_id', 'content_id', 'day', 'score', 'interaction_count', 'updated_at'],
+                aggregate.statement
+            ))
+            db.session.commit()
+            logging.info("Rebuilt user_item_scores")
+            return True
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error rebuilding user item scores: {e}")
+            return False
+    
+    @staticmethod
+    def ensure_user_item_scores():
+        """Populate user_item_scores on first run against existing interactions"""
+        try:
+            # Checked under the lock so workers that lose the race see the
+            # winner's rows and skip the rebuild
+            _lock_user_item_scores()
+            if (db.session.query(UserItemScore.user_id).first() is not None
+                    or db.session.query(UserInteraction.id).first() is None):
+                db.session.commit()
+                return True
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error checking user item scores: {e}")
+            return False
+        return DatabaseManager.rebuild_user_item_scores()
+    
     @staticmethod
     def cleanup_old_interactions(days=90):
         """Clean up old user interactions to maintain performance"""
         try:
             cutoff_date = datetime.utcnow() - timedelta(days=days)
             
-            deleted = UserInteraction.query.filter(
+            deleted = 0
+            if DatabaseManager.interactions_partitioned():
+                # Whole expired months go as metadata-only drops; the DELETE
+                # below then only touches the month straddling the cutoff
+                deleted += DatabaseManager._drop_interaction_partitions_before(cutoff_date)
+                now = datetime.utcnow()
+                DatabaseManager._create_interaction_partitions(
+                    _month_start(now), _month_start(now, INTERACTION_PARTITION_MONTHS_AHEAD)
+                )
+            
+            deleted += UserInteraction.query.filter(
                 UserInteraction.timestamp < cutoff_date
             ).delete()
+            # Whole days only: the bucket for the cutoff day still holds newer rows
+            UserItemScore.query.filter(UserItemScore.day < cutoff_date.date()).delete()
             
             db.session.commit()
+            # Interaction counters no longer match the table; re-seed on next read
+            result_cache.delete(INTERACTION_COUNTERS_SEEDED_KEY)
             logging.info(f"Cleaned up {deleted} old interactions")
             return deleted
             
@@ -251,24 +1009,53 @@ class DatabaseManager:
             logging.error(f"Error cleaning up old interactions: {e}")
             return 0
     
+    @staticmethod
+    def _drop_invalid_index(conn, index_sql):
+        """Drop the INVALID index a failed concurrent build leaves behind, so IF NOT EXISTS retries it"""
+        match = re.search(r'IF NOT EXISTS (\w+)', index_sql)
+        if not match:
+            return
+        invalid = conn.execute(text(
+            "SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"
+        ), {'name': match.group(1)}).scalar()
+        if invalid:
+            try:
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {match.group(1)}"))
+            except Exception as e:
+                logging.warning(f"Could not drop invalid index {match.group(1)}: {e}")
+    
     @staticmethod
     def create_database_indexes():
         """Create additional performance indexes"""
         try:
             indexes = [
+                "CREATE EXTENSION IF NOT EXISTS pg_trgm;",
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_content_title_trgm ON content USING gin (lower(title) gin_trgm_ops);",
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_content_content_trgm ON content USING gin (lower(content) gin_trgm_ops);",
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_content_fts ON content USING gin(({CONTENT_SEARCH_VECTOR}));",
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_content_tags_array ON content USING gin(({CONTENT_TAGS_ARRAY}));",
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_content_keywords_array ON content USING gin(({CONTENT_KEYWORDS_ARRAY}));",
                 "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_content_title_gin ON content USING gin(to_tsvector('english', title));",
                 "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_content_tags_gin ON content USING gin(to_tsvector('english', tags));",
                 "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_interactions_user_time ON user_interactions(user_id, timestamp DESC);",
                 "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_content_status_created ON content(status, created_at DESC) WHERE status = 'Published';",
             ]
             
-            for index_sql in indexes:
+            # CONCURRENTLY can't run in a transaction block, so use AUTOCOMMIT.
+            # lock_timeout makes a build give up instead of queueing writers
+            # behind it while it waits for a conflicting lock.
+            with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                conn.execute(text(f"SET lock_timeout = '{INDEX_LOCK_TIMEOUT}'"))
                 try:
-                    db.session.execute(text(index_sql))
-                    db.session.commit()
-                except Exception as e:
-                    db.session.rollback()
-                    logging.warning(f"Index creation warning: {e}")
+                    for index_sql in indexes:
+                        try:
+                            conn.execute(text(index_sql))
+                        except Exception as e:
+                            logging.warning(f"Index creation warning: {e}")
+                            DatabaseManager._drop_invalid_index(conn, index_sql)
+                finally:
+                    # The connection goes back to the pool; don't leak the setting
+                    conn.execute(text("RESET lock_timeout"))
             
             logging.info("Additional database indexes created")
             return True
@@ -277,6 +1064,41 @@ class DatabaseManager:
             logging.error(f"Error creating database indexes: {e}")
             return False
 
+def run_independent_queries(statements):
+    """Run independent SQL statements and return each one's rows as dicts
+    
+    With psycopg 3 (``postgresql+psycopg://``) the statements are sent in one
+    pipeline, so they cost a single round trip; other drivers run them one
+    after another on the same connection.
+    """
+    raw_conn = db.engine.raw_connection()
+    try:
+        driver_conn = raw_conn.driver_connection
+        pipeline = getattr(driver_conn, 'pipeline', None)
+        cursors = []
+        with (pipeline() if pipeline is not None else nullcontext()):
+            for sql in statements:
+                cursor = driver_conn.cursor()
+                cursor.execute(sql)
+                cursors.append(cursor)
+        
+        results = []
+        for cursor in cursors:
+            columns = [column[0] for column in cursor.description]
+            results.append([dict(zip(columns, row)) for row in cursor.fetchall()])
+            cursor.close()
+        raw_conn.rollback()
+        return results
+    finally:
+        raw_conn.close()
+
+# Constraints whose validity stands in for check_table_integrity's table scans
+INTEGRITY_CONSTRAINTS = ('user_interactions_content_id_fkey', 'content_status_check')
+
+# The admin dashboard and its health poll share one evaluation for this long
+HEALTH_STATUS_KEY = 'admin:db:health'
+HEALTH_STATUS_TTL = 10
+
 class DatabaseHealthChecker:
     """Database health monitoring utilities"""
     
@@ -289,32 +1111,53 @@ class DatabaseHealthChecker:
         except Exception as e:
             return False, f"Database connection failed: {e}"
     
+    @staticmethod
+    def _validated_constraints(names):
+        """Return which of the named constraints exist and are validated (empty off PostgreSQL)"""
+        if db.engine.dialect.name != 'postgresql':
+            return set()
+        return set(db.session.execute(text("""
+            SELECT conname
+            FROM pg_constraint
+            WHERE conrelid IN ('content'::regclass, 'user_interactions'::regclass)
+              AND conname = ANY(:names)
+              AND convalidated
+        """), {'names': list(names)}).scalars())
+    
     @staticmethod
     def check_table_integrity():
         """Check table integrity and constraints"""
         try:
             issues = []
             
-            # Check for orphaned interactions
-            orphaned = db.session.execute(text("""
-                SELECT COUNT(*) as count 
-                FROM user_interactions ui 
-                LEFT JOIN content c ON ui.content_id = c.id 
-                WHERE c.id IS NULL
-            """)).fetchone()
+            # A validated constraint already guarantees its invariant, so the
+            # table scans below only run when one is missing or NOT VALID
+            validated = DatabaseHealthChecker._validated_constraints(INTEGRITY_CONSTRAINTS)
+            
+            scans = []
             
-            if orphaned.count > 0:
-                issues.append(f"Found {orphaned.count} orphaned user interactions")
+            # Check for orphaned interactions
+            if 'user_interactions_content_id_fkey' not in validated:
+                scans.append(("""
+                    SELECT COUNT(*) as count 
+                    FROM user_interactions ui 
+                    LEFT JOIN content c ON ui.content_id = c.id 
+                    WHERE c.id IS NULL
+                """, "Found {count} orphaned user interactions"))
             
             # Check for invalid statuses
-            invalid_status = db.session.execute(text("""
-                SELECT COUNT(*) as count 
-                FROM content 
-                WHERE status NOT IN ('Draft', 'Published', 'Archived')
-            """)).fetchone()
+            if 'content_status_check' not in validated:
+                scans.append(("""
+                    SELECT COUNT(*) as count 
+                    FROM content 
+                    WHERE status NOT IN ('Draft', 'Published', 'Archived')
+                """, "Found {count} content items with invalid status"))
             
-            if invalid_status.count > 0:
-                issues.append(f"Found {invalid_status.count} content items with invalid status")
+            if scans:
+                results = run_independent_queries([sql for sql, _ in scans])
+                for (_, message), rows in zip(scans, results):
+                    if rows[0]['count'] > 0:
+                        issues.append(message.format(count=rows[0]['count']))
             
             return len(issues) == 0, issues
             
@@ -322,40 +1165,68 @@ class DatabaseHealthChecker:
             return False, [f"Error checking table integrity: {e}"]
     
     @staticmethod
-    def get_performance_metrics():
+    def get_health_status():
+        """Connection and integrity results, cached for HEALTH_STATUS_TTL seconds
+        
+        A failed connection isn't cached, so recovery shows on the next check.
+        """
+        health_status = result_cache.get(HEALTH_STATUS_KEY)
+        if health_status is not None:
+            return health_status
+        
+        connection_ok, connection_msg = DatabaseHealthChecker.check_connection()
+        integrity_ok, integrity_issues = DatabaseHealthChecker.check_table_integrity()
+        health_status = {
+            'connection': connection_ok,
+            'integrity': integrity_ok,
+            'connection_msg': connection_msg,
+            'integrity_issues': integrity_issues
+        }
+        if connection_ok:
+            result_cache.set(HEALTH_STATUS_KEY, health_status, ttl=HEALTH_STATUS_TTL)
+        return health_status
+    
+    @staticmethod
+    def get_performance_metrics(include_query_text=False):
         """Get database performance metrics"""
         try:
             metrics = {}
             
-            # Query performance
-            slow_queries = db.session.execute(text("""
+            # Query performance and connection stats are independent, so they
+            # go out together. The query text column can be large, so it is
+            # only fetched (for the slow rows) when asked for.
+            slow_queries, connections = run_independent_queries(["""
                 SELECT 
-                    query,
+                    queryid,
                     calls,
-                    total_time,
-                    mean_time,
+                    total_exec_time,
+                    mean_exec_time,
                     rows
                 FROM pg_stat_statements 
-                WHERE mean_time > 100
-                ORDER BY mean_time DESC 
+                WHERE mean_exec_time > 100
+                ORDER BY mean_exec_time DESC 
                 LIMIT 10
-            """)).fetchall()
-            
-            metrics['slow_queries'] = [dict(row._mapping) for row in slow_queries]
-            
-            # Connection stats
-            connections = db.session.execute(text("""
+            """, """
                 SELECT 
                     state,
                     COUNT(*) as count
                 FROM pg_stat_activity
                 GROUP BY state
-            """)).fetchall()
+            """])
+            
+            if include_query_text and slow_queries:
+                query_texts = dict(db.session.execute(
+                    text("SELECT queryid, query FROM pg_stat_statements WHERE queryid = ANY(:ids)"),
+                    {'ids': [row['queryid'] for row in slow_queries]}
+                ).all())
+                for row in slow_queries:
+                    row['query'] = query_texts.get(row['queryid'])
             
-            metrics['connections'] = [dict(row._mapping) for row in connections]
+            metrics['slow_queries'] = slow_queries
+            metrics['connections'] = connections
             
             return metrics
             
         except Exception as e:
             logging.error(f"Error getting performance metrics: {e}")
-            return {}
\ No newline at end of file
+            return {}
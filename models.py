@@ -1,7 +1,6 @@
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import Index, CheckConstraint, text, UniqueConstraint
-from sqlalchemy.dialects.postgresql import TSVECTOR
 from flask_dance.consumer.storage.sqla import OAuthConsumerMixin
 from flask_login import UserMixin
 
@@ -37,6 +36,20 @@ class OAuth(OAuthConsumerMixin, db.Model):
         name='uq_user_browser_session_key_provider',
     ),)
 
+# Full-text document for content. Indexed as an expression (idx_content_fts)
+# rather than stored, so writes don't maintain a tsvector column or trigger.
+CONTENT_SEARCH_VECTOR = (
+    "to_tsvector('english', COALESCE(title, '') || ' ' || COALESCE(content, '') || ' ' || "
+    "COALESCE(tags, '') || ' ' || COALESCE(author, ''))"
+)
+
+# Tags and stored keywords as text[] for array overlap (&&) lookups, each
+# backed by a GIN expression index; queries must repeat them verbatim
+CONTENT_TAGS_ARRAY = (
+    r"array_remove(regexp_split_to_array(btrim(COALESCE(tags, ''), E' \t\r\n'), E'\\s*,\\s*'), '')"
+)
+CONTENT_KEYWORDS_ARRAY = "string_to_array(keywords, ',')"
+
 class Content(db.Model):
     """Content model for storing dynamic content with images"""
     __tablename__ = 'content'
@@ -50,11 +63,11 @@ class Content(db.Model):
     user_id = db.Column(db.String, db.ForeignKey('users.id'), nullable=False, index=True)
 
     tags = db.Column(db.Text)  # Store tags as comma-separated string
+    keywords = db.Column(db.Text)  # Top content keywords, comma-separated; maintained on write
     image = db.Column(db.String(255))  # Store image filename
     user_type = db.Column(db.String(20), default='mixed', index=True)  # tech, business, mixed
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
-    search_vector = db.Column(TSVECTOR)  # Full-text search vector
     
     # Database constraints
     __table_args__ = (
@@ -62,7 +75,10 @@ class Content(db.Model):
         CheckConstraint("LENGTH(content) >= 1", name='content_body_length_check'),
         CheckConstraint("status IN ('Draft', 'Published', 'Archived')", name='content_status_check'),
         CheckConstraint("user_type IN ('tech', 'business', 'mixed')", name='content_user_type_check'),
-        Index('idx_content_search', 'search_vector', postgresql_using='gin'),
+        # Full-text search runs against this expression; queries must repeat it verbatim
+        Index('idx_content_fts', text(CONTENT_SEARCH_VECTOR), postgresql_using='gin').ddl_if(dialect='postgresql'),
+        Index('idx_content_tags_array', text(f"({CONTENT_TAGS_ARRAY})"), postgresql_using='gin').ddl_if(dialect='postgresql'),
+        Index('idx_content_keywords_array', text(f"({CONTENT_KEYWORDS_ARRAY})"), postgresql_using='gin').ddl_if(dialect='postgresql'),
         Index('idx_content_created_status', 'created_at', 'status'),
         Index('idx_content_category_status', 'category', 'status'),
         Index('idx_content_user_type', 'user_type'),
@@ -80,11 +96,28 @@ class Content(db.Model):
     def __repr__(self):
         return f'<Content {self.title}>'
     
+    @staticmethod
+    def parse_tags(tags):
+        """Split a comma-separated tags string into a list"""
+        if tags:
+            return [tag for tag in (tag.strip() for tag in tags.split(',')) if tag]
+        return []
+    
+    @staticmethod
+    def parse_keywords(keywords):
+        """Turn a stored keywords string into a frozenset (None if not computed yet)"""
+        if keywords is None:
+            return None
+        return frozenset(keyword for keyword in keywords.split(',') if keyword)
+    
     def get_tags_list(self):
         """Return tags as a list"""
-        if self.tags:
-            return [tag.strip() for tag in self.tags.split(',') if tag.strip()]
-        return []
+        # Templates call this several times per item; parse once per tags value
+        parsed = self.__dict__.get('_parsed_tags')
+        if parsed is None or parsed[0] != self.tags:
+            parsed = (self.tags, Content.parse_tags(self.tags))
+            self._parsed_tags = parsed
+        return list(parsed[1])
     
     def set_tags_list(self, tags_list):
         """Set tags from a list"""
@@ -141,6 +174,73 @@ class UserInteraction(db.Model):
     def __repr__(self):
         return f'<UserInteraction {self.user_id} -> {self.content_id} ({self.interaction_type})>'
 
+class UserItemScore(db.Model):
+    """Per-day sum of a user's interaction scores for one content item
+    
+    Maintained alongside user_interactions by the interaction flusher so
+    collaborative filtering reads one row per (user, item, day) instead of
+    every raw interaction.
+    """
+    __tablename__ = 'user_item_scores'
+    
+    user_id = db.Column(db.String(100), primary_key=True)
+    content_id = db.Column(db.Integer, db.ForeignKey('content.id', ondelete='CASCADE'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    score = db.Column(db.Float, nullable=False, default=0.0)
+    interaction_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    # Relationship
+    content = db.relationship('Content', backref=db.backref('item_scores', lazy=True, cascade='all, delete-orphan'))
+    
+    __table_args__ = (
+        Index('idx_user_item_scores_day', 'day'),
+        Index('idx_user_item_scores_content', 'content_id'),
+    )
+    
+    def __repr__(self):
+        return f'<UserItemScore {self.user_id} -> {self.content_id} ({self.day}: {self.score})>'
+    
+    @classmethod
+    def upsert_statement(cls):
+        """INSERT ... ON CONFLICT that adds to an existing bucket"""
+        if db.engine.dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        table = cls.__table__
+        statement = insert(table)
+        return statement.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.content_id, table.c.day],
+            set_={
+                'score': table.c.score + statement.excluded.score,
+                'interaction_count': table.c.interaction_count + statement.excluded.interaction_count,
+                'updated_at': statement.excluded.updated_at
+            }
+        )
+    
+    @classmethod
+    def add_interactions(cls, rows):
+        """Fold interaction rows into their daily buckets (caller commits)
+        
+        Rows carry user_id, content_id, timestamp and interaction_score, plus
+        an optional interaction_count (default 1; -1 takes a row back out).
+        """
+        buckets = {}
+        for row in rows:
+            key = (row['user_id'], row['content_id'], row['timestamp'].date())
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = {
+                    'user_id': key[0], 'content_id': key[1], 'day': key[2],
+                    'score': 0.0, 'interaction_count': 0, 'updated_at': row['timestamp']
+                }
+            bucket['score'] += row['interaction_score'] or 0.0
+            bucket['interaction_count'] += row.get('interaction_count', 1)
+            bucket['updated_at'] = max(bucket['updated_at'], row['timestamp'])
+        if buckets:
+            db.session.execute(cls.upsert_statement(), list(buckets.values()))
+
 class File(db.Model):
     """File attachment model for storing uploaded files"""
     __tablename__ = 'files'
@@ -275,8 +375,14 @@ class Story(db.Model):
     
     @classmethod
     def get_active_stories(cls, limit=10):
-        """Get active, non-expired stories ordered by priority and creation time"""
-        return cls.query.filter(
+        """Get active, non-expired stories ordered by priority and creation time
+        
+        Author and product are loaded in the same query since the story cards render both.
+        """
+        return cls.query.options(
+            db.joinedload(cls.author),
+            db.joinedload(cls.product)
+        ).filter(
             cls.is_active == True,
             cls.expires_at > datetime.utcnow()
         ).order_by(
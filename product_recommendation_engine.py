@@ -4,12 +4,14 @@ Recommends products based on user purchase behavior and interaction patterns
 """
 
 import logging
+import heapq
 from typing import List, Dict, Tuple
 from collections import defaultdict
 import numpy as np
 from sqlalchemy import text
 from app import db
 from models import Product, Order, OrderItem, CartItem, User
+from similarity_kernels import common_cosine_similarities
 import math
 
 class ProductRecommendationEngine:
@@ -18,6 +20,13 @@ class ProductRecommendationEngine:
     def __init__(self):
         self.user_product_matrix = {}
         self.product_similarity_cache = {}
+        # CSR views of user_product_matrix for vectorized similarity
+        self.user_ids = []
+        self.product_ids = []
+        self.user_index = {}
+        self.product_index = {}
+        self.user_rows = None
+        self.product_rows = None
         
     def build_user_product_matrix(self) -> Dict:
         """Build user-product interaction matrix from orders and cart data"""
@@ -53,6 +62,7 @@ class ProductRecommendationEngine:
                 user_matrix[row.user_id][row.product_id] += float(row.interaction_score)
             
             self.user_product_matrix = dict(user_matrix)
+            self._build_sparse_views()
             logging.info(f"Built user-product matrix for {len(self.user_product_matrix)} users")
             return self.user_product_matrix
             
@@ -60,6 +70,35 @@ class ProductRecommendationEngine:
             logging.error(f"Error building user-product matrix: {e}")
             return {}
     
+    def _build_sparse_views(self):
+        """Index user_product_matrix as users x products and products x users CSR matrices"""
+        from scipy.sparse import coo_matrix
+        
+        self.user_ids = list(self.user_product_matrix)
+        self.user_index = {user_id: row for row, user_id in enumerate(self.user_ids)}
+        self.product_index = {}
+        rows, columns, scores = [], [], []
+        for row, products in enumerate(self.user_product_matrix.values()):
+            for product_id, score in products.items():
+                rows.append(row)
+                columns.append(self.product_index.setdefault(product_id, len(self.product_index)))
+                scores.append(score)
+        self.product_ids = list(self.product_index)
+        
+        matrix = coo_matrix(
+            (np.asarray(scores, dtype=np.float64), (rows, columns)),
+            shape=(len(self.user_ids), len(self.product_ids))
+        )
+        self.user_rows = matrix.tocsr()
+        self.product_rows = matrix.T.tocsr()
+    
+    def _similarities(self, rows, target_row: int) -> np.ndarray:
+        """Common-column cosine of one row against all rows (self excluded), clamped at 0"""
+        target = rows[target_row].toarray().ravel()
+        similarities = np.maximum(common_cosine_similarities(target, rows), 0.0)
+        similarities[target_row] = 0.0
+        return similarities
+    
     def calculate_user_similarity(self, user1_products: Dict, user2_products: Dict) -> float:
         """Calculate cosine similarity between two users based on product interactions"""
         try:
@@ -76,7 +115,7 @@ class ProductRecommendationEngine:
             # Calculate cosine similarity
             dot_product = sum(u1 * u2 for u1, u2 in zip(user1_vector, user2_vector))
             magnitude1 = math.sqrt(sum(u1 ** 2 for u1 in user1_vector))
-            magnitude2 = math.sqrt(u2 ** 2 for u2 in user2_vector)
+            magnitude2 = math.sqrt(sum(u2 ** 2 for u2 in user2_vector))
             
             if magnitude1 == 0 or magnitude2 == 0:
                 return 0.0
@@ -98,18 +137,16 @@ class ProductRecommendationEngine:
                 return self.get_popular_products(limit)
             
             target_user_products = self.user_product_matrix[target_user_id]
-            user_similarities = []
             
-            # Calculate similarities with other users
-            for user_id, user_products in self.user_product_matrix.items():
-                if user_id != target_user_id:
-                    similarity = self.calculate_user_similarity(target_user_products, user_products)
-                    if similarity > 0.1:  # Only consider users with meaningful similarity
-                        user_similarities.append((user_id, similarity))
+            # Calculate similarities with all other users in one kernel call
+            similarities = self._similarities(self.user_rows, self.user_index[target_user_id])
+            similar_rows = np.flatnonzero(similarities > 0.1)  # Only consider users with meaningful similarity
             
-            # Sort by similarity and get top similar users
-            user_similarities.sort(key=lambda x: x[1], reverse=True)
-            top_similar_users = user_similarities[:10]  # Top 10 similar users
+            # Select and sort the top 10 similar users without sorting the rest
+            if len(similar_rows) > 10:
+                similar_rows = similar_rows[np.argpartition(-similarities[similar_rows], 9)[:10]]
+            similar_rows = similar_rows[np.argsort(-similarities[similar_rows], kind='stable')]
+            top_similar_users = [(self.user_ids[row], float(similarities[row])) for row in similar_rows]
             
             if not top_similar_users:
                 return self.get_popular_products(limit)
@@ -127,13 +164,12 @@ class ProductRecommendationEngine:
                     if product_id not in target_user_products:
                         product_scores[product_id] += score * weight
             
-            # Sort recommendations by score
-            sorted_recommendations = sorted(product_scores.items(), 
-                                          key=lambda x: x[1], reverse=True)
+            # Top recommendations by score
+            top_recommendations = heapq.nlargest(limit, product_scores.items(), key=lambda x: x[1])
             
             # Get product details
             recommended_products = []
-            for product_id, score in sorted_recommendations[:limit]:
+            for product_id, score in top_recommendations:
                 product = Product.query.get(product_id)
                 if product and product.is_active:
                     recommended_products.append({
@@ -154,31 +190,22 @@ class ProductRecommendationEngine:
             if not self.user_product_matrix:
                 self.build_user_product_matrix()
             
-            # Build product similarity matrix
-            product_users = defaultdict(dict)
-            for user_id, products in self.user_product_matrix.items():
-                for pid, score in products.items():
-                    product_users[pid][user_id] = score
-            
-            if product_id not in product_users:
+            if product_id not in self.product_index:
                 return self.get_popular_products(limit)
             
-            target_product_users = product_users[product_id]
-            product_similarities = []
-            
-            # Calculate similarities with other products
-            for pid, pid_users in product_users.items():
-                if pid != product_id:
-                    similarity = self.calculate_user_similarity(target_product_users, pid_users)
-                    if similarity > 0.1:
-                        product_similarities.append((pid, similarity))
+            # Calculate similarities with all other products in one kernel call
+            similarities = self._similarities(self.product_rows, self.product_index[product_id])
+            similar_rows = np.flatnonzero(similarities > 0.1)
             
-            # Sort by similarity
-            product_similarities.sort(key=lambda x: x[1], reverse=True)
+            # Select and sort the top products by similarity
+            if len(similar_rows) > limit:
+                similar_rows = similar_rows[np.argpartition(-similarities[similar_rows], limit - 1)[:limit]]
+            similar_rows = similar_rows[np.argsort(-similarities[similar_rows], kind='stable')]
+            product_similarities = [(self.product_ids[row], float(similarities[row])) for row in similar_rows]
             
             # Get product details
             recommended_products = []
-            for pid, similarity in product_similarities[:limit]:
+            for pid, similarity in product_similarities:
                 product = Product.query.get(pid)
                 if product and product.is_active:
                     recommended_products.append({
@@ -4,13 +4,11 @@ Provides intelligent content suggestions based on user behavior, preferences, an
 """
 
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.decomposition import TruncatedSVD
 from collections import defaultdict, Counter
 from datetime import datetime, timedelta
 import re
-from models import db, Content, UserInteraction, User
+import heapq
+from models import db, Content, UserInteraction, UserItemScore, User
 from sqlalchemy import func, desc
 import logging
 
@@ -18,17 +16,25 @@ class PersonalizedRecommendationEngine:
     """Advanced recommendation engine with multiple algorithms"""
     
     def __init__(self):
-        self.tfidf_vectorizer = TfidfVectorizer(
-            max_features=5000,
-            stop_words='english',
-            ngram_range=(1, 2),
-            min_df=2,
-            max_df=0.8
-        )
+        # scikit-learn models are created on first use to keep worker start-up light
+        self.tfidf_vectorizer = None
         self.content_features = None
         self.content_matrix = None
-        self.svd_model = TruncatedSVD(n_components=50, random_state=42)
+        self.svd_model = None
         self.user_profiles = {}
+    
+    def _get_tfidf_vectorizer(self):
+        """Create the TF-IDF vectorizer on first use"""
+        if self.tfidf_vectorizer is None:
+            from sklearn.feature_extraction.text import TfidfVectorizer
+            self.tfidf_vectorizer = TfidfVectorizer(
+                max_features=5000,
+                stop_words='english',
+                ngram_range=(1, 2),
+                min_df=2,
+                max_df=0.8
+            )
+        return self.tfidf_vectorizer
         
     def build_content_features(self):
         """Build TF-IDF features for all content"""
@@ -50,7 +56,7 @@ class PersonalizedRecommendationEngine:
                 content_ids.append(content.id)
             
             # Build TF-IDF matrix
-            self.content_matrix = self.tfidf_vectorizer.fit_transform(content_texts)
+            self.content_matrix = self._get_tfidf_vectorizer().fit_transform(content_texts)
             self.content_features = dict(zip(content_ids, range(len(content_ids))))
             
             logging.info(f"Built content features for {len(contents)} items")
@@ -169,6 +175,7 @@ class PersonalizedRecommendationEngine:
                 user_vector = user_vector / np.linalg.norm(user_vector)
             
             # Calculate similarities with all content
+            from sklearn.metrics.pairwise import cosine_similarity
             similarities = cosine_similarity([user_vector], self.content_matrix).flatten()
             
             # Get content recommendations
@@ -177,11 +184,11 @@ class PersonalizedRecommendationEngine:
                 if content_id not in interacted_content_ids:  # Don't recommend already seen content
                     content_similarities.append((content_id, similarities[content_idx]))
             
-            # Sort by similarity and return top recommendations
-            content_similarities.sort(key=lambda x: x[1], reverse=True)
-            recommended_ids = [content_id for content_id, _ in content_similarities[:num_recommendations]]
+            # Top recommendations by similarity
+            top_similarities = heapq.nlargest(num_recommendations, content_similarities, key=lambda x: x[1])
+            recommended_ids = [content_id for content_id, _ in top_similarities]
             
-            return Content.query.filter(Content.id.in_(recommended_ids)).all()
+            return self._fetch_content_in_order(recommended_ids)
             
         except Exception as e:
             logging.error(f"Error generating content-based recommendations: {e}")
@@ -190,64 +197,70 @@ class PersonalizedRecommendationEngine:
     def get_collaborative_filtering_recommendations(self, user_id, num_recommendations=10):
         """Generate recommendations using collaborative filtering"""
         try:
-            # Build user-item interaction matrix
-            users = db.session.query(UserInteraction.user_id).distinct().all()
-            contents = db.session.query(UserInteraction.content_id).distinct().all()
-            
-            if len(users) < 2 or len(contents) < 2:
+            # scipy/scikit-learn are imported on first use to keep worker start-up light
+            from scipy.sparse import coo_matrix
+            from sklearn.preprocessing import normalize
+            
+            interactions = db.session.query(
+                UserInteraction.user_id,
+                UserInteraction.content_id,
+                UserInteraction.interaction_score
+            ).yield_per(10000)
+            
+            # Factorize ids into contiguous row/column indices
+            user_id_to_idx = {}
+            content_id_to_idx = {}
+            user_rows = []
+            content_columns = []
+            scores = []
+            for interaction_user_id, content_id, score in interactions:
+                user_rows.append(user_id_to_idx.setdefault(interaction_user_id, len(user_id_to_idx)))
+                content_columns.append(content_id_to_idx.setdefault(content_id, len(content_id_to_idx)))
+                scores.append(score or 0.0)
+            
+            if len(user_id_to_idx) < 2 or len(content_id_to_idx) < 2:
                 return self._get_trending_recommendations(num_recommendations)
             
-            user_ids = [u[0] for u in users]
-            content_ids = [c[0] for c in contents]
-            
-            # Create user-content interaction matrix
-            interaction_matrix = np.zeros((len(user_ids), len(content_ids)))
-            
-            user_id_to_idx = {user_id: idx for idx, user_id in enumerate(user_ids)}
-            content_id_to_idx = {content_id: idx for idx, content_id in enumerate(content_ids)}
-            
-            interactions = UserInteraction.query.all()
-            for interaction in interactions:
-                if interaction.user_id in user_id_to_idx and interaction.content_id in content_id_to_idx:
-                    user_idx = user_id_to_idx[interaction.user_id]
-                    content_idx = content_id_to_idx[interaction.content_id]
-                    interaction_matrix[user_idx, content_idx] += interaction.interaction_score
-            
             # Find similar users
             if user_id not in user_id_to_idx:
                 return self._get_trending_recommendations(num_recommendations)
             
-            target_user_idx = user_id_to_idx[user_id]
-            user_similarities = cosine_similarity([interaction_matrix[target_user_idx]], interaction_matrix).flatten()
-            
-            # Get top similar users (excluding self)
-            similar_users = []
-            for idx, similarity in enumerate(user_similarities):
-                if idx != target_user_idx and similarity > 0.1:  # Minimum similarity threshold
-                    similar_users.append((user_ids[idx], similarity))
-            
-            similar_users.sort(key=lambda x: x[1], reverse=True)
-            top_similar_users = similar_users[:10]  # Top 10 similar users
+            # Sparse user-content matrix; repeated (user, content) interactions are summed
+            interaction_matrix = coo_matrix(
+                (scores, (user_rows, content_columns)),
+                shape=(len(user_id_to_idx), len(content_id_to_idx))
+            ).tocsr()
             
-            # Generate recommendations based on similar users' preferences
-            content_scores = defaultdict(float)
-            target_user_interactions = set([i.content_id for i in UserInteraction.query.filter_by(user_id=user_id).all()])
-            
-            for similar_user_id, similarity in top_similar_users:
-                similar_user_interactions = UserInteraction.query.filter_by(user_id=similar_user_id).all()
-                
-                for interaction in similar_user_interactions:
-                    if interaction.content_id not in target_user_interactions:  # Don't recommend seen content
-                        content_scores[interaction.content_id] += similarity * interaction.interaction_score
-            
-            # Sort and get top recommendations
-            sorted_recommendations = sorted(content_scores.items(), key=lambda x: x[1], reverse=True)
-            recommended_ids = [content_id for content_id, _ in sorted_recommendations[:num_recommendations]]
-            
-            return Content.query.filter(
-                Content.id.in_(recommended_ids),
-                Content.status == 'Published'
-            ).all()
+            # Cosine similarity of the target user against everyone in one sparse product
+            target_user_idx = user_id_to_idx[user_id]
+            normalized = normalize(interaction_matrix, norm='l2', axis=1)
+            user_similarities = (normalized @ normalized[target_user_idx].T).toarray().ravel()
+            user_similarities[target_user_idx] = 0
+            
+            # Top 10 similar users above the minimum similarity threshold
+            similar_rows = np.flatnonzero(user_similarities > 0.1)
+            if len(similar_rows) > 10:
+                similar_rows = similar_rows[np.argpartition(-user_similarities[similar_rows], 9)[:10]]
+            
+            # Similarity-weighted scores of everything those users interacted with
+            similar_matrix = interaction_matrix[similar_rows]
+            content_scores = np.asarray(similar_matrix.T @ user_similarities[similar_rows]).ravel()
+            candidates = np.unique(similar_matrix.indices)
+            
+            # Don't recommend seen content
+            seen = interaction_matrix.indices[
+                interaction_matrix.indptr[target_user_idx]:interaction_matrix.indptr[target_user_idx + 1]
+            ]
+            candidates = np.setdiff1d(candidates, seen, assume_unique=True)
+            
+            # Get top recommendations
+            if len(candidates) > num_recommendations:
+                candidates = candidates[np.argpartition(-content_scores[candidates], num_recommendations - 1)[:num_recommendations]]
+            candidates = candidates[np.argsort(-content_scores[candidates], kind='stable')]
+            content_ids = list(content_id_to_idx)
+            recommended_ids = [content_ids[column] for column in candidates]
+            
+            return self._fetch_content_in_order(recommended_ids, Content.status == 'Published')
             
         except Exception as e:
             logging.error(f"Error generating collaborative filtering recommendations: {e}")
@@ -294,11 +307,11 @@ class PersonalizedRecommendationEngine:
                 elif content.id in recommendation_scores:
                     recommendation_scores[content.id] += 0.3 * (1.0 - i * 0.05)
             
-            # Sort by final scores
-            sorted_recommendations = sorted(recommendation_scores.items(), key=lambda x: x[1], reverse=True)
-            final_content_ids = [content_id for content_id, _ in sorted_recommendations[:num_recommendations]]
+            # Top recommendations by final score
+            top_recommendations = heapq.nlargest(num_recommendations, recommendation_scores.items(), key=lambda x: x[1])
+            final_content_ids = [content_id for content_id, _ in top_recommendations]
             
-            return Content.query.filter(Content.id.in_(final_content_ids)).all()
+            return self._fetch_content_in_order(final_content_ids)
             
         except Exception as e:
             logging.error(f"Error generating hybrid recommendations: {e}")
@@ -344,14 +357,24 @@ class PersonalizedRecommendationEngine:
                 
                 content_scores.append((content, score))
             
-            # Sort by score and return top recommendations
-            content_scores.sort(key=lambda x: x[1], reverse=True)
-            return [content for content, _ in content_scores[:num_recommendations]]
+            # Return top recommendations by score
+            top_scores = heapq.nlargest(num_recommendations, content_scores, key=lambda x: x[1])
+            return [content for content, _ in top_scores]
             
         except Exception as e:
             logging.error(f"Error generating preference-based recommendations: {e}")
             return []
     
+    def _fetch_content_in_order(self, content_ids, *criteria):
+        """Fetch content by id in one query, returned in the order of content_ids"""
+        if not content_ids:
+            return []
+        contents_by_id = {
+            content.id: content
+            for content in Content.query.filter(Content.id.in_(content_ids), *criteria).all()
+        }
+        return [contents_by_id[content_id] for content_id in content_ids if content_id in contents_by_id]
+    
     def _get_trending_recommendations(self, num_recommendations=10):
         """Fallback to trending content for new users"""
         try:
@@ -376,7 +399,12 @@ class PersonalizedRecommendationEngine:
             return Content.query.filter_by(status='Published').order_by(desc(Content.created_at)).limit(num_recommendations).all()
     
     def track_recommendation_feedback(self, user_id, content_id, action):
-        """Track user feedback on recommendations for improvement"""
+        """Track user feedback on recommendations for improvement
+
+        Returns the new interaction row as a dict when one was inserted, so
+        callers can fold it into the interaction counters; None otherwise.
+        """
+        created = None
         try:
             # Map actions to interaction types and scores
             action_mapping = {
@@ -389,6 +417,7 @@ class PersonalizedRecommendationEngine:
             
             if action in action_mapping:
                 interaction_type, score = action_mapping[action]
+                content_id = int(content_id)
                 
                 # Create or update interaction
                 existing_interaction = UserInteraction.query.filter_by(
@@ -397,24 +426,43 @@ class PersonalizedRecommendationEngine:
                     interaction_type=interaction_type
                 ).first()
                 
+                # user_item_scores follows the row: it leaves its old day's
+                # bucket and joins today's with its new score
+                now = datetime.utcnow()
+                score_rows = []
                 if existing_interaction:
-                    existing_interaction.interaction_score += score
-                    existing_interaction.timestamp = datetime.utcnow()
+                    score_rows.append({
+                        'user_id': user_id, 'content_id': content_id,
+                        'timestamp': existing_interaction.timestamp,
+                        'interaction_score': -(existing_interaction.interaction_score or 0.0),
+                        'interaction_count': -1
+                    })
+                    existing_interaction.interaction_score = (existing_interaction.interaction_score or 0.0) + score
+                    existing_interaction.timestamp = now
                 else:
-                    new_interaction = UserInteraction(
+                    existing_interaction = UserInteraction(
                         user_id=user_id,
                         content_id=content_id,
                         interaction_type=interaction_type,
                         interaction_score=score
                     )
-                    db.session.add(new_interaction)
+                    existing_interaction.timestamp = now
+                    db.session.add(existing_interaction)
+                    created = {'user_id': user_id, 'content_id': content_id}
+                score_rows.append({
+                    'user_id': user_id, 'content_id': content_id,
+                    'timestamp': now, 'interaction_score': existing_interaction.interaction_score
+                })
+                UserItemScore.add_interactions(score_rows)
                 
                 db.session.commit()
                 logging.info(f"Tracked recommendation feedback: {user_id} -> {content_id} ({action})")
+                return created
                 
         except Exception as e:
             logging.error(f"Error tracking recommendation feedback: {e}")
             db.session.rollback()
+        return None
 
 # Global recommendation engine instance
 recommendation_engine = PersonalizedRecommendationEngine()
\ No newline at end of file
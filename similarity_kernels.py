@@ -0,0 +1,155 @@
+"""
+Similarity kernels for interaction data: bitsets for binary data, CSR rows for weighted data
+"""
+import os
+import logging
+from functools import cache
+import numpy as np
+
+try:
+    import simsimd
+    SIMSIMD_AVAILABLE = True
+except ImportError:
+    SIMSIMD_AVAILABLE = False
+
+# simsimd picks its SIMD kernels at runtime; DISABLE_SIMSIMD opts out entirely
+USE_SIMSIMD = SIMSIMD_AVAILABLE and not os.environ.get('DISABLE_SIMSIMD')
+
+# Upper bound on the packed bitset size (bytes) kept alongside the CF matrix
+BITSET_MAX_BYTES = 64 * 1024 * 1024
+
+def pack_rows(matrix):
+    """Pack the non-zero pattern of a CSR matrix into uint64 bitsets, one row per user"""
+    num_rows, num_columns = matrix.shape
+    num_lanes = max(1, (num_columns + 63) // 64)
+    bits = np.zeros((num_rows, num_lanes * 8), dtype=np.uint8)
+    # Bits are set straight from the CSR structure (same layout as
+    # np.packbits), so nothing dense beyond the packed result is allocated
+    stored = matrix.data != 0
+    rows = np.repeat(np.arange(num_rows), np.diff(matrix.indptr))[stored]
+    columns = matrix.indices[stored]
+    np.bitwise_or.at(bits, (rows, columns >> 3), (0x80 >> (columns & 7)).astype(np.uint8))
+    return bits.view(np.uint64)
+
+def _bitset_intersections_numpy(target, bits):
+    """Count shared bits between one packed row and every packed row"""
+    return np.bitwise_count(bits & target).sum(axis=1, dtype=np.int64)
+
+@cache
+def _get_numba_kernel():
+    """Compile the Numba popcount kernel on first use; None when numba is missing"""
+    try:
+        from numba import njit, prange
+    except ImportError:
+        return None
+    # The app logs at DEBUG; keep the compiler's bytecode dumps out of it
+    logging.getLogger('numba').setLevel(logging.WARNING)
+
+    @njit(cache=True, inline='always')
+    def popcount64(word):
+        word = word - ((word >> np.uint64(1)) & np.uint64(0x5555555555555555))
+        word = (word & np.uint64(0x3333333333333333)) + ((word >> np.uint64(2)) & np.uint64(0x3333333333333333))
+        word = (word + (word >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+        return (word * np.uint64(0x0101010101010101)) >> np.uint64(56)
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def bitset_intersections_numba(target, bits):
+        counts = np.empty(bits.shape[0], dtype=np.int64)
+        for row in prange(bits.shape[0]):
+            shared = np.uint64(0)
+            for lane in range(bits.shape[1]):
+                shared += popcount64(target[lane] & bits[row, lane])
+            counts[row] = shared
+        return counts
+
+    return bitset_intersections_numba
+
+def _bitset_intersections_simsimd(target, bits, target_count, row_counts):
+    """Derive shared bits from simsimd's Hamming distance: |a & b| = (|a| + |b| - |a ^ b|) / 2"""
+    distances = simsimd.cdist(
+        target.view(np.uint8)[np.newaxis, :], bits.view(np.uint8),
+        metric='hamming', dtype='bin8'
+    )
+    hamming = np.asarray(distances, dtype=np.int64).ravel()
+    return (row_counts + target_count - hamming) // 2
+
+def bitset_intersections(target, bits, target_count=None, row_counts=None):
+    """Count shared bits between ``target`` and each row of ``bits``"""
+    if USE_SIMSIMD and row_counts is not None:
+        try:
+            return _bitset_intersections_simsimd(target, bits, target_count, row_counts)
+        except Exception as e:
+            logging.error(f"simsimd bitset kernel failed: {e}")
+    numba_kernel = _get_numba_kernel()
+    if numba_kernel is not None:
+        try:
+            return numba_kernel(target, bits)
+        except Exception as e:
+            logging.error(f"Numba bitset kernel failed, using numpy: {e}")
+    return _bitset_intersections_numpy(target, bits)
+
+def bitset_cosine_similarities(bits, row_counts, target_row):
+    """Cosine similarity of one binary row against all rows: |a & b| / sqrt(|a| |b|)"""
+    intersections = bitset_intersections(bits[target_row], bits, row_counts[target_row], row_counts)
+    denominators = np.sqrt(row_counts.astype(np.float64) * row_counts[target_row])
+    return np.divide(
+        intersections, denominators,
+        out=np.zeros(len(row_counts), dtype=np.float64),
+        where=denominators > 0
+    )
+
+def _common_cosine_numpy(target, indptr, indices, data):
+    """Cosine of one dense vector against each CSR row over the columns both are non-zero in"""
+    num_rows = len(indptr) - 1
+    row_ids = np.repeat(np.arange(num_rows), np.diff(indptr))
+    target_values = target[indices]
+    shared = (target_values != 0) & (data != 0)
+    dots = np.bincount(row_ids, weights=data * target_values, minlength=num_rows)
+    row_norms = np.bincount(row_ids, weights=np.where(shared, data * data, 0.0), minlength=num_rows)
+    target_norms = np.bincount(row_ids, weights=np.where(shared, target_values * target_values, 0.0), minlength=num_rows)
+    denominators = np.sqrt(row_norms * target_norms)
+    return np.divide(dots, denominators, out=np.zeros(num_rows, dtype=np.float64), where=denominators > 0)
+
+@cache
+def _get_common_cosine_kernel():
+    """Compile the Numba common-column cosine kernel on first use; None when numba is missing"""
+    try:
+        from numba import njit, prange
+    except ImportError:
+        return None
+    logging.getLogger('numba').setLevel(logging.WARNING)
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def common_cosine_numba(target, indptr, indices, data):
+        num_rows = indptr.shape[0] - 1
+        similarities = np.zeros(num_rows, dtype=np.float64)
+        for row in prange(num_rows):
+            dot = 0.0
+            row_norm = 0.0
+            target_norm = 0.0
+            for position in range(indptr[row], indptr[row + 1]):
+                value = data[position]
+                target_value = target[indices[position]]
+                if value != 0.0 and target_value != 0.0:
+                    dot += value * target_value
+                    row_norm += value * value
+                    target_norm += target_value * target_value
+            denominator = (row_norm * target_norm) ** 0.5
+            if denominator > 0.0:
+                similarities[row] = dot / denominator
+        return similarities
+
+    return common_cosine_numba
+
+def common_cosine_similarities(target, matrix):
+    """Cosine similarity of ``target`` (dense) against every row of CSR ``matrix``,
+    each pair measured only over the columns where both are non-zero"""
+    target = np.asarray(target, dtype=np.float64)
+    data = matrix.data.astype(np.float64, copy=False)
+    numba_kernel = _get_common_cosine_kernel()
+    if numba_kernel is not None:
+        try:
+            return numba_kernel(target, matrix.indptr, matrix.indices, data)
+        except Exception as e:
+            logging.error(f"Numba cosine kernel failed, using numpy: {e}")
+    return _common_cosine_numpy(target, matrix.indptr, matrix.indices, data)
@@ -0,0 +1,63 @@
+"""Near-duplicate relevance score reuse"""
+import os
+import random
+
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+
+import pytest
+
+import ai_relevance
+
+
+CATEGORY = 'Blog Post'
+TAGS = 'news, updates'
+
+
+def _analysis_text(body):
+    return f"""
+        Title: Weekly update
+        Category: {CATEGORY}
+        Tags: {TAGS}
+        Content: {body}
+        """
+
+
+def _zipf_article(rng, words):
+    vocabulary = [f'word{i}' for i in range(5000)]
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    return ' '.join(rng.choices(vocabulary, weights, k=words))
+
+
+@pytest.fixture(autouse=True)
+def empty_simhash_index():
+    ai_relevance._simhash_index.clear()
+    ai_relevance._simhash_order.clear()
+    yield
+    ai_relevance._simhash_index.clear()
+    ai_relevance._simhash_order.clear()
+
+
+@pytest.mark.parametrize('words', [300, 800])
+def test_unrelated_texts_do_not_reuse_scores(words):
+    rng = random.Random(words)
+    for i in range(200):
+        ai_relevance._store_relevance_scores(
+            _analysis_text(_zipf_article(rng, words)), CATEGORY, TAGS,
+            {'relevance': {'score': i % 10, 'explanation': 'indexed'}}
+        )
+
+    matches = sum(
+        ai_relevance._near_duplicate_scores(_analysis_text(_zipf_article(rng, words)), CATEGORY, TAGS) is not None
+        for _ in range(200)
+    )
+    assert matches == 0
+
+
+def test_near_duplicate_reuses_scores():
+    text = _analysis_text(_zipf_article(random.Random(1), 800))
+    ai_relevance._store_relevance_scores(text, CATEGORY, TAGS, {'relevance': {'score': 7, 'explanation': 'indexed'}})
+
+    words = text.split()
+    words[-1] = 'edited'
+    scores = ai_relevance._cached_relevance_scores(' '.join(words), CATEGORY, TAGS)
+    assert scores['relevance']['score'] == 7
@@ -1,6 +1,7 @@
 """
 Internationalization and localization support for the content management system
 """
+from types import MappingProxyType
 
 # Korean translations for the website interface
 TRANSLATIONS = {
@@ -178,6 +179,14 @@ TRANSLATIONS = {
 # Default language
 DEFAULT_LANGUAGE = 'en'
 
+# Language codes and display names offered in the language switcher
+AVAILABLE_LANGUAGES = MappingProxyType({
+    'en': 'English',
+    'ko': '한국어'
+})
+
+_NO_TRANSLATIONS = MappingProxyType({})
+
 def get_translation(key, language='en'):
     """
     Get translation for a given key and language
@@ -189,9 +198,7 @@ def get_translation(key, language='en'):
     Returns:
         Translated string or original key if not found
     """
-    if language in TRANSLATIONS and key in TRANSLATIONS[language]:
-        return TRANSLATIONS[language][key]
-    return key
+    return TRANSLATIONS.get(language, _NO_TRANSLATIONS).get(key, key)
 
 def get_available_languages():
     """
@@ -200,10 +207,7 @@ def get_available_languages():
     Returns:
         Dictionary of language codes and names
     """
-    return {
-        'en': 'English',
-        'ko': '한국어'
-    }
+    return AVAILABLE_LANGUAGES
 
 def translate_dict(data, language='en'):
     """